@@ -291,3 +291,40 @@ SWAGGER_SETTINGS = {
 # should be a integer representing a number of days
 # GREEN_ASSESSMENT_DEFAULT_VALIDITY_DURATION=5 * 365
 GREEN_ASSESSMENT_DEFAULT_VALIDITY_DURATION = None
+
+# Data importing
+# send the position of each chunk of a CSV import file to the raw save tasks instead of
+# the rows. Each task then reads its own rows out of the stored file.
+SEED_STREAM_RAW_DATA_IMPORT = True
+
+# number of records processed per task in each stage of an import
+SEED_CHUNK_SIZES = {
+    'save_raw_data': 100,
+    'map_data': 100,
+    'check_data': 100,
+}
+# grow the chunk sizes based on the measured duration of previous chunks so that each
+# task takes about SEED_CHUNK_TARGET_SECONDS, up to SEED_MAX_CHUNK_SIZE records.
+SEED_ADAPTIVE_CHUNK_SIZE = False
+SEED_CHUNK_TARGET_SECONDS = 30
+SEED_MAX_CHUNK_SIZE = 5000
+
+# Backend for the progress of the background tasks. 'redis_hash' stores the progress in a Redis
+# hash that is incremented atomically, 'cache' stores it as a single value in the Django cache.
+SEED_PROGRESS_BACKEND = 'redis_hash'
+# seconds that the progress of a task is kept in the 'redis_hash' backend after it was last updated
+# or read. None keeps the progress until it is deleted.
+SEED_PROGRESS_TIMEOUT = 86400
+
+# check the data quality rules that can be expressed in SQL in the database, so that only the
+# records that may have a result are loaded into the data quality tasks
+SEED_DATA_QUALITY_SQL_CHECKS = True
+
+# Inventory lists
+# number of seconds that the exact count of an inventory list is cached for in the cursor
+# pagination mode of the filter endpoints (count=exact)
+SEED_INVENTORY_COUNT_CACHE_TIMEOUT = 60
+# extra data keys of the states that are searched along with the address and ids by the inventory
+# search, by inventory type, e.g. {'property': ['Building Name'], 'taxlot': []}. Run the
+# create_search_indexes command after changing the keys so that the searches use trigram indexes.
+SEED_SEARCH_EXTRA_DATA_KEYS = {}
@@ -2,8 +2,8 @@ from django.http import JsonResponse
 from rest_framework import viewsets
 
 from seed.decorators import ajax_request_class
+from seed.lib.progress_data.backends import get_progress_backend
 from seed.utils.api import api_endpoint_class
-from seed.utils.cache import get_cache
 
 import logging
 _log = logging.getLogger(__name__)
@@ -25,8 +25,9 @@ class ProgressViewSetV2(viewsets.ViewSet):
             }
         """
         progress_key = pk
-        if get_cache(progress_key):
-            return JsonResponse(get_cache(progress_key))
+        progress_data = get_progress_backend().get(progress_key)
+        if progress_data:
+            return JsonResponse(progress_data)
         else:
             return JsonResponse({
                 'progress_key': progress_key,
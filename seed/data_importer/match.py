@@ -32,6 +32,7 @@ from seed.models import (
     MERGE_STATE_MERGED,
     MERGE_STATE_NEW,
     MERGE_STATE_UNKNOWN,
+    BuildingFile,
     Column,
     PropertyAuditLog,
     PropertyState,
@@ -41,11 +42,13 @@ from seed.models import (
     TaxLotView,
 )
 from seed.models.auditlog import AUDIT_IMPORT
+from seed.utils.address import normalize_address_str
 from seed.utils.match import (
     empty_criteria_filter,
-    match_merge_link,
-    matching_filter_criteria,
+    match_merge_link_views,
     matching_criteria_column_names,
+    matching_criteria_key,
+    states_by_matching_criteria,
 )
 from seed.utils.merge import merge_states_with_views
 
@@ -255,22 +258,22 @@ def inclusive_match_and_merge(unmatched_state_ids, org, StateClass):
 
     # Collapse groups of matches found in the previous step into 1 -State per group
     merges_within_file = 0
-    priorities = Column.retrieve_priorities(org)
+    merge_id_groups = []
     for ids in matched_id_groups:
         if len(ids) == 1:
             # If there's only 1, no merging is needed, so just promote the ID.
             promoted_ids += ids
         else:
-            states = [s for s in StateClass.objects.filter(pk__in=ids).order_by('-id')]
-            merge_state = states.pop()
-
-            merges_within_file += len(states)
-
-            while len(states) > 0:
-                newer_state = states.pop()
-                merge_state = save_state_match(merge_state, newer_state, priorities)
-
-            promoted_ids.append(merge_state.id)
+            merges_within_file += len(ids) - 1
+            merge_id_groups.append(sorted(ids))
+
+    if merge_id_groups:
+        states_by_id = StateClass.objects.in_bulk([i for ids in merge_id_groups for i in ids])
+        priorities = Column.retrieve_priorities(org)
+        merged_states = save_state_match_groups(
+            [[states_by_id[i] for i in ids] for ids in merge_id_groups], priorities
+        )
+        promoted_ids += [merged_state.id for merged_state in merged_states]
 
     # Flag the soon to be promoted ID -States as having gone through matching
     StateClass.objects.filter(pk__in=promoted_ids).update(data_state=DATA_STATE_MATCHING)
@@ -338,26 +341,41 @@ def states_to_views(unmatched_state_ids, org, cycle, StateClass):
     # If one match is found, pass that along.
     # If multiple matches are found, merge them together, pass along the resulting record.
     # Otherwise, add current -State to be promoted as is.
+    #
+    # The matching criteria of all the -States attached to -Views are loaded once and grouped by
+    # their values so that each incoming -State is matched with a dictionary lookup instead of a
+    # query per -State.
+    column_names = sorted(column_names)
+    existing_matches = states_by_matching_criteria(existing_states, column_names) if column_names else {}
+
     merged_between_existing_count = 0
-    merge_state_pairs = []
+    merge_id_pairs = []
+    promote_ids = []
     for state in unmatched_states:
-        matching_criteria = matching_filter_criteria(state, column_names)
-        existing_state_matches = StateClass.objects.filter(
-            pk__in=Subquery(existing_cycle_views.values('state_id')),
-            **matching_criteria
-        )
-        count = existing_state_matches.count()
+        matching_key = matching_criteria_key(state, column_names)
+        existing_state_ids = existing_matches.get(matching_key, [])
+        count = len(existing_state_ids)
 
         if count > 1:
             merged_between_existing_count += count
-            existing_state_ids = list(existing_state_matches.order_by('updated').values_list('id', flat=True))
+            existing_state_ids = list(
+                StateClass.objects.filter(pk__in=existing_state_ids).order_by('updated').values_list('id', flat=True)
+            )
             # The following merge action ignores merge protection and prioritizes -States by most recent AuditLog
             merged_state = merge_states_with_views(existing_state_ids, org.id, 'System Match', StateClass)
-            merge_state_pairs.append((merged_state, state))
+            # Later incoming -States with the same criteria match the merged -State
+            existing_matches[matching_key] = [merged_state.id]
+            merge_id_pairs.append((merged_state.id, state))
         elif count == 1:
-            merge_state_pairs.append((existing_state_matches.first(), state))
+            merge_id_pairs.append((existing_state_ids[0], state))
         else:
-            promote_states = promote_states | StateClass.objects.filter(pk=state.id)
+            promote_ids.append(state.id)
+
+    if promote_ids:
+        promote_states = promote_states | StateClass.objects.filter(pk__in=promote_ids)
+
+    existing_states_by_id = StateClass.objects.in_bulk([existing_id for existing_id, _ in merge_id_pairs])
+    merge_state_pairs = [(existing_states_by_id[existing_id], state) for existing_id, state in merge_id_pairs]
 
     # Process -States into -Views either directly (promoted_ids) or post-merge (merge_state_pairs).
     _log.debug("There are %s merge_state_pairs and %s promote_states" % (len(merge_state_pairs), promote_states.count()))
@@ -379,10 +397,9 @@ def states_to_views(unmatched_state_ids, org, cycle, StateClass):
                 processed_views.append(existing_view)
                 merged_state_ids.append(merged_state.id)
 
-            for state in promote_states:
-                promoted_ids.append(state.id)
-                created_view = state.promote(cycle)
-                processed_views.append(created_view)
+            promote_states = list(promote_states)
+            promoted_ids += [state.id for state in promote_states]
+            processed_views += StateClass.promote_states(promote_states, cycle)
     except IntegrityError as e:
         raise IntegrityError("Could not merge results with error: %s" % (e))
 
@@ -401,26 +418,46 @@ def states_to_views(unmatched_state_ids, org, cycle, StateClass):
 
 def link_views(merged_views, ViewClass):
     """
-    Run each of the given -Views through a linking round.
+    Run the given -Views through a linking round together.
 
     For details on the actual linking logic, please refer to the the
-    match_merge_link() method.
+    match_merge_link() and match_merge_link_views() methods.
     """
     if ViewClass == PropertyView:
         state_class_name = "PropertyState"
     else:
         state_class_name = "TaxLotState"
 
-    processed_views = []
-    for view in merged_views:
-        _merge_count, _link_count, view_id = match_merge_link(view.id, state_class_name)
+    target_view_ids = match_merge_link_views([view.id for view in merged_views], state_class_name)
+    target_views = ViewClass.objects.in_bulk(
+        [view_id for view_id in target_view_ids.values() if view_id is not None]
+    )
 
-        if view_id is not None:
-            processed_views.append(ViewClass.objects.get(pk=view_id))
-        else:
-            processed_views.append(view)
+    return [target_views.get(target_view_ids[view.id], view) for view in merged_views]
 
-    return processed_views
+
+def _first_audit_logs(AuditLogClass, states):
+    """
+    Return the first audit log of each of the states that are merged. Every state that is merged
+    must have an audit log, since the audit log of the merged state links to them as its parents.
+
+    :param AuditLogClass: PropertyAuditLog or TaxLotAuditLog
+    :param states: list, PropertyStates or TaxLotStates
+    :return: dict, {state id: audit log}
+    :raises ValueError: if a state has no audit log
+    """
+    audit_logs = {}
+    for audit_log in AuditLogClass.objects.filter(
+        state_id__in=[state.id for state in states]
+    ).order_by('-id'):
+        audit_logs[audit_log.state_id] = audit_log
+
+    missing_ids = sorted({state.id for state in states if state.id not in audit_logs})
+    if missing_ids:
+        raise ValueError(
+            'Cannot merge states without an audit log: {}'.format(', '.join(str(i) for i in missing_ids))
+        )
+    return audit_logs
 
 
 def save_state_match(state1, state2, priorities):
@@ -432,25 +469,22 @@ def save_state_match(state1, state2, priorities):
     :param priorities: dict, column names and the priorities of the merging of data. This includes
     all of the priorites for the columns, not just the priorities for the selected taxlotstate.
     :return: state1, after merge
+    :raises ValueError: if state1 or state2 has no audit log, nothing is saved then
     """
+    AuditLogClass = PropertyAuditLog if isinstance(state1, PropertyState) else TaxLotAuditLog
+
+    # NJACHECK - is this logic correct?
+    audit_logs = _first_audit_logs(AuditLogClass, [state1, state2])
+
     merged_state = type(state1).objects.create(organization=state1.organization)
 
     merged_state = merging.merge_state(
         merged_state, state1, state2, priorities[merged_state.__class__.__name__]
     )
 
-    AuditLogClass = PropertyAuditLog if isinstance(merged_state, PropertyState) else TaxLotAuditLog
-
-    assert AuditLogClass.objects.filter(state=state1).count() >= 1
-    assert AuditLogClass.objects.filter(state=state2).count() >= 1
-
-    # NJACHECK - is this logic correct?
-    state_1_audit_log = AuditLogClass.objects.filter(state=state1).first()
-    state_2_audit_log = AuditLogClass.objects.filter(state=state2).first()
-
     AuditLogClass.objects.create(organization=state1.organization,
-                                 parent1=state_1_audit_log,
-                                 parent2=state_2_audit_log,
+                                 parent1=audit_logs[state1.id],
+                                 parent2=audit_logs[state2.id],
                                  parent_state1=state1,
                                  parent_state2=state2,
                                  state=merged_state,
@@ -459,8 +493,123 @@ def save_state_match(state1, state2, priorities):
                                  import_filename=None,
                                  record_type=AUDIT_IMPORT)
 
-    # If the two states being merged were just imported from the same import file, carry the import_file_id into the new
-    # state. Also merge the lot_number fields so that pairing can work correctly on the resulting merged record
+    _merge_import_file_fields(merged_state, state1, state2)
+
+    # Set the merged_state to merged
+    merged_state.merge_state = MERGE_STATE_MERGED
+    merged_state.save()
+
+    return merged_state
+
+
+def save_state_match_groups(state_groups, priorities):
+    """
+    Merge each group of states into one state. This gives the same states and audit logs as
+    merging the states of each group one by one with save_state_match, oldest first, but the
+    groups are folded in memory and the states and audit logs are created with bulk queries.
+
+    The intermediate states of the folds are still saved because the audit logs, which history()
+    and unmerging walk, link two parent states at a time.
+
+    :param state_groups: list, lists of PropertyStates or TaxLotStates, each in the order to merge
+    :param priorities: dict, column names and the priorities of the merging of data
+    :return: list, the merged state of each group
+    :raises ValueError: if one of the states has no audit log, as save_state_match, nothing is
+                        saved then
+    """
+    if not state_groups:
+        return []
+
+    StateClass = type(state_groups[0][0])
+    AuditLogClass = PropertyAuditLog if StateClass == PropertyState else TaxLotAuditLog
+
+    audit_logs = _first_audit_logs(AuditLogClass, [state for states in state_groups for state in states])
+    state_to_state = merging.get_state_to_state_tuple(StateClass.__name__)
+    class_priorities = priorities[StateClass.__name__]
+
+    # fold each group, [[state1, state2, merged_state], ...] for each step of each group
+    steps = []
+    for states in state_groups:
+        group_steps = []
+        merged_state = states[0]
+        for newer_state in states[1:]:
+            state1 = merged_state
+            merged_state = StateClass(organization_id=state1.organization_id)
+            merging.merge_state_attributes(
+                merged_state, state1, newer_state, class_priorities, state_to_state
+            )
+            _merge_import_file_fields(merged_state, state1, newer_state)
+            merged_state.merge_state = MERGE_STATE_MERGED
+            _sync_new_state_coordinates(merged_state)
+            group_steps.append([state1, newer_state, merged_state])
+        steps.append(group_steps)
+
+    # the work of save() and of the hash of the states
+    from seed.data_importer.tasks import hash_state_objects
+    new_states = [step[2] for group_steps in steps for step in group_steps]
+    for state in new_states:
+        if state.address_line_1 is not None:
+            state.normalized_address = normalize_address_str(state.address_line_1)
+        else:
+            state.normalized_address = None
+    for state, hash_object in zip(new_states, hash_state_objects(new_states)):
+        state.hash_object = hash_object
+    StateClass.objects.bulk_create(new_states)
+
+    if StateClass == PropertyState:
+        # merge measures, scenarios, simulations of the states that have any
+        from seed.models.property_measures import PropertyMeasure
+        from seed.models.scenarios import Scenario
+        from seed.models.simulations import Simulation
+
+        newer_ids = [step[1].id for group_steps in steps for step in group_steps]
+        related_ids = set()
+        for RelatedClass in [Scenario, BuildingFile, Simulation, PropertyMeasure]:
+            related_ids.update(
+                RelatedClass.objects.filter(property_state_id__in=newer_ids).values_list(
+                    'property_state_id', flat=True)
+            )
+        for group_steps in steps:
+            for state1, newer_state, merged_state in group_steps:
+                if newer_state.id in related_ids:
+                    PropertyState.merge_relationships(merged_state, state1, newer_state)
+
+    # each step needs the audit log of the previous step, so the audit logs are created one step
+    # of every group at a time
+    for index in range(max(len(group_steps) for group_steps in steps)):
+        new_audit_logs = []
+        for group_steps in steps:
+            if index >= len(group_steps):
+                continue
+            state1, newer_state, merged_state = group_steps[index]
+            new_audit_logs.append(AuditLogClass(
+                organization_id=state1.organization_id,
+                parent1=audit_logs[state1.id],
+                parent2=audit_logs[newer_state.id],
+                parent_state1=state1,
+                parent_state2=newer_state,
+                state=merged_state,
+                name='System Match',
+                description='Automatic Merge',
+                import_filename=None,
+                record_type=AUDIT_IMPORT
+            ))
+        for audit_log in AuditLogClass.objects.bulk_create(new_audit_logs):
+            audit_logs[audit_log.state_id] = audit_log
+
+    return [group_steps[-1][2] for group_steps in steps]
+
+
+def _merge_import_file_fields(merged_state, state1, state2):
+    """
+    If the two states being merged were just imported from the same import file, carry the
+    import_file_id into the merged state. Also merge the lot_number fields so that pairing can
+    work correctly on the resulting merged record.
+
+    :param merged_state: PropertyState or TaxLotState
+    :param state1: PropertyState or TaxLotState
+    :param state2: PropertyState or TaxLotState
+    """
     # Possible conditions:
     # state1.data_state = 2, state1.merge_state = 0 and state2.data_state = 2, state2.merge_state = 0
     # state1.data_state = 0, state1.merge_state = 2 and state2.data_state = 2, state2.merge_state = 0
@@ -482,8 +631,20 @@ def save_state_match(state1, state2, priorities):
                 if joined_lots:
                     merged_state.lot_number = ';'.join(joined_lots)
 
-    # Set the merged_state to merged
-    merged_state.merge_state = MERGE_STATE_MERGED
-    merged_state.save()
 
-    return merged_state
+def _sync_new_state_coordinates(state):
+    """
+    Sync the latitude, longitude and long_lat of a new state like the pre_save signal of the
+    states does when a state that was created empty is saved with its data, for states that are
+    created with bulk_create.
+
+    :param state: PropertyState or TaxLotState, not saved
+    """
+    lat_or_long_set = state.latitude is not None or state.longitude is not None
+    lat_and_long_both_populated = state.latitude is not None and state.longitude is not None
+    if lat_or_long_set and lat_and_long_both_populated and state.long_lat is None:
+        state.long_lat = f"POINT ({state.longitude} {state.latitude})"
+        state.geocoding_confidence = "Manually geocoded (N/A)"
+    elif lat_or_long_set and not lat_and_long_both_populated:
+        state.long_lat = None
+        state.geocoding_confidence = None
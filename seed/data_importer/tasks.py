@@ -12,16 +12,18 @@ import copy
 import hashlib
 import json
 import os
+import time
 import traceback
 from _csv import Error
 from builtins import str
 from collections import namedtuple
 from datetime import date, datetime
-from itertools import chain
+from itertools import chain, islice
 from math import ceil
 
 from celery import chord, shared_task
 from celery.utils.log import get_task_logger
+from django.conf import settings
 from django.contrib.gis.geos import GEOSGeometry
 from django.db import IntegrityError, DataError
 from django.db import connection, transaction
@@ -41,7 +43,11 @@ from seed.data_importer.models import (
     ImportRecord,
     STATUS_READY_TO_MERGE,
 )
-from seed.data_importer.utils import usage_point_id
+from seed.data_importer.utils import (
+    get_chunk_size,
+    record_chunk_duration,
+    usage_point_id,
+)
 from seed.lib.mcm import cleaners, mapper, reader
 from seed.lib.mcm.mapper import expand_rows
 from seed.lib.mcm.utils import batch
@@ -73,7 +79,9 @@ from seed.models.data_quality import (
     DataQualityCheck,
     Rule,
 )
+from seed.utils.address import normalize_address_str
 from seed.utils.buildings import get_source_type
+from seed.utils.cache import get_cache_raw, make_key, set_cache_raw
 from seed.utils.geocode import geocode_buildings
 from seed.utils.ubid import decode_unique_ids
 
@@ -83,9 +91,21 @@ _log = get_task_logger(__name__)
 
 STR_TO_CLASS = {'TaxLotState': TaxLotState, 'PropertyState': PropertyState}
 
+# Version of the mapping context stored in the cache. Increment when the format changes.
+MAPPING_CONTEXT_VERSION = 1
+MAPPING_CONTEXT_TIMEOUT = 86400  # 24 hours
+
+# Send only the position of each chunk in a CSV import file to the raw save tasks instead of the rows
+STREAM_RAW_DATA_IMPORT = getattr(settings, 'SEED_STREAM_RAW_DATA_IMPORT', True)
+
+# Check the data quality rules that can be expressed in SQL in the database before chunking the
+# rows that may have a result into tasks
+DATA_QUALITY_SQL_CHECKS = getattr(settings, 'SEED_DATA_QUALITY_SQL_CHECKS', True)
+
 
 @shared_task(ignore_result=True)
 def check_data_chunk(model, ids, dq_id):
+    start_time = time.time()
     if model == 'PropertyState':
         qs = PropertyState.objects.filter(id__in=ids)
     elif model == 'TaxLotState':
@@ -95,9 +115,11 @@ def check_data_chunk(model, ids, dq_id):
     super_org = qs.first().organization
 
     d = DataQualityCheck.retrieve(super_org.get_parent().id)
-    d.check_data(model, qs.iterator())
+    d.check_data_values(model, ids)
     d.save_to_cache(dq_id)
 
+    record_chunk_duration('check_data', len(ids), time.time() - start_time)
+
 
 @shared_task(ignore_result=True)
 def finish_checking(progress_key):
@@ -112,9 +134,63 @@ def finish_checking(progress_key):
     return progress_data.result()
 
 
+@shared_task(ignore_result=True)
+def _check_data_create_tasks(org_id, propertystate_ids, taxlotstate_ids, import_file_id, dq_id, progress_key):
+    """
+    Worker method for the data quality checks. Find the rows to check, check the rules that can be
+    expressed in SQL in the database and create the tasks that check the remaining rows in Python.
+
+    :param org_id: int, ID of the organization that owns the rules
+    :param propertystate_ids: list, IDs of the property states to check, ignored with import_file_id
+    :param taxlotstate_ids: list, IDs of the tax lot states to check, ignored with import_file_id
+    :param import_file_id: int, if present, find the data to check by the import file id
+    :param dq_id: identifier of the results in the cache
+    :param progress_key: string, Progress Key to append progress
+    :return: None
+    """
+    progress_data = ProgressData.from_key(progress_key)
+
+    if import_file_id:
+        excluded_data_states = [DATA_STATE_UNKNOWN, DATA_STATE_IMPORT, DATA_STATE_DELETE]
+        property_states = PropertyState.objects.filter(import_file=import_file_id).exclude(
+            data_state__in=excluded_data_states)
+        taxlot_states = TaxLotState.objects.filter(import_file=import_file_id).exclude(
+            data_state__in=excluded_data_states)
+    else:
+        property_states = PropertyState.objects.filter(id__in=propertystate_ids or [])
+        taxlot_states = TaxLotState.objects.filter(id__in=taxlotstate_ids or [])
+
+    if DATA_QUALITY_SQL_CHECKS:
+        # only the rows that may have a result need to be checked in the chunked tasks
+        dq = DataQualityCheck.retrieve(org_id)
+        property_states = dq.check_data_sql('PropertyState', property_states)
+        taxlot_states = dq.check_data_sql('TaxLotState', taxlot_states)
+
+    chunk_size = get_chunk_size('check_data')
+    tasks = _data_quality_check_create_tasks(
+        org_id,
+        list(property_states.order_by('id').values_list('id', flat=True)),
+        list(taxlot_states.order_by('id').values_list('id', flat=True)),
+        dq_id,
+        chunk_size
+    )
+    if import_file_id:
+        import_file = ImportFile.objects.get(pk=import_file_id)
+        _record_chunk_size(import_file, 'check_data', chunk_size)
+        import_file.save()
+    progress_data.total = len(tasks)
+    progress_data.save()
+    if tasks:
+        # specify the chord as an immutable with .si
+        chord(tasks, interval=15)(finish_checking.si(progress_data.key))
+    else:
+        finish_checking(progress_data.key)
+
+
 def do_checks(org_id, propertystate_ids, taxlotstate_ids, import_file_id=None):
     """
-    Run the dq checks on the data
+    Run the dq checks on the data. The rows are checked in the background, this only queues the
+    tasks up.
 
     :param org_id:
     :param propertystate_ids:
@@ -129,28 +205,11 @@ def do_checks(org_id, propertystate_ids, taxlotstate_ids, import_file_id=None):
     progress_data = ProgressData(func_name='check_data', unique_id=dq_id)
     progress_data.delete()
 
-    if import_file_id:
-        propertystate_ids = list(
-            PropertyState.objects.filter(import_file=import_file_id).exclude(
-                data_state__in=[DATA_STATE_UNKNOWN, DATA_STATE_IMPORT,
-                                DATA_STATE_DELETE]).values_list('id', flat=True)
-        )
-        taxlotstate_ids = list(
-            TaxLotState.objects.filter(import_file=import_file_id).exclude(
-                data_state__in=[DATA_STATE_UNKNOWN, DATA_STATE_IMPORT,
-                                DATA_STATE_DELETE]).values_list('id', flat=True)
-        )
-
-    tasks = _data_quality_check_create_tasks(
-        org_id, propertystate_ids, taxlotstate_ids, dq_id
-    )
-    progress_data.total = len(tasks)
-    progress_data.save()
-    if tasks:
-        # specify the chord as an immutable with .si
-        chord(tasks, interval=15)(finish_checking.si(progress_data.key))
-    else:
-        finish_checking.s(progress_data.key)
+    # the rules belong to the parent organization, the same as in check_data_chunk
+    parent_org_id = Organization.objects.get(pk=org_id).get_parent().id
+    _check_data_create_tasks.s(
+        parent_org_id, propertystate_ids, taxlotstate_ids, import_file_id, dq_id, progress_data.key
+    ).delay()
 
     # always return something so that the code works with always eager
     return progress_data.result()
@@ -192,6 +251,15 @@ def _build_cleaner(org):
 
     :param org: organization instance
     :returns: cleaner instance
+    """
+    return cleaners.Cleaner(_build_cleaner_ontology(org))
+
+
+def _build_cleaner_ontology(org):
+    """Return the ontology for the cleaner of an organization
+
+    :param org: organization instance
+    :returns: dict, ontology with the types of the columns
 
     This tells us how to try to cast types during cleaning, based on the Column
     definition in the database.
@@ -233,25 +301,23 @@ def _build_cleaner(org):
             column_type = _translate_unit_to_type(column.unit.get_unit_type_display())
             ontology['types'][column.column_name] = column_type
 
-    return cleaners.Cleaner(ontology)
+    return ontology
 
 
-@shared_task(ignore_result=True)
-def map_row_chunk(ids, file_pk, source_type, prog_key, **kwargs):
-    """Does the work of matching a mapping to a source type and saving
+def _mapping_context_key(import_file_id):
+    return make_key('SEED:map_data:CONTEXT:{0}'.format(import_file_id))
 
-    :param ids: list of PropertyState IDs to map.
-    :param file_pk: int, the PK for an ImportFile obj.
-    :param source_type: int, represented by either ASSESSED_RAW or PORTFOLIO_RAW.
-    :param prog_key: string, key of the progress key
+
+def _build_mapping_context(import_file):
     """
-    progress_data = ProgressData.from_key(prog_key)
-    import_file = ImportFile.objects.get(pk=file_pk)
-    save_type = PORTFOLIO_BS
-    if source_type == ASSESSED_RAW:
-        save_type = ASSESSED_BS
+    Build everything that map_row_chunk needs to know about the mappings of an import file:
+    the table mappings of the organization pruned to the columns of the file, the delimited
+    fields and the ontology of the cleaner.
 
-    org = Organization.objects.get(pk=import_file.import_record.super_organization.pk)
+    :param import_file: ImportFile object
+    :return: dict, the mapping context
+    """
+    org = import_file.import_record.super_organization
 
     # get all the table_mappings that exist for the organization
     table_mappings = ColumnMapping.get_column_mappings_by_table_name(org)
@@ -271,9 +337,6 @@ def map_row_chunk(ids, file_pk, source_type, prog_key, **kwargs):
             if not table_mappings[table]:
                 del table_mappings[table]
 
-    map_cleaner = _build_cleaner(org)
-
-    # *** BREAK OUT INTO SEPARATE METHOD ***
     # figure out which import field is defined as the unique field that may have a delimiter of
     # individual values (e.g. tax lot ids). The definition of the delimited field is currently
     # hard coded
@@ -293,9 +356,6 @@ def map_row_chunk(ids, file_pk, source_type, prog_key, **kwargs):
         delimited_fields = {}
         # field does not exist in mapping list, so ignoring
 
-    # _log.debug("my table mappings are {}".format(table_mappings))
-    # _log.debug("delimited_field that will be expanded and normalized: {}".format(delimited_fields))
-
     # If a single file is being imported into both the tax lot and property table, then add
     # an extra custom mapping for the cross-related data. If the data are not being imported into
     # the property table then make sure to skip this so that superfluous property entries are
@@ -305,8 +365,68 @@ def map_row_chunk(ids, file_pk, source_type, prog_key, **kwargs):
             table_mappings['PropertyState'][
                 delimited_fields['jurisdiction_tax_lot_id']['from_field']] = (
                 'PropertyState', 'lot_number', 'Lot Number', False)
-    # *** END BREAK OUT ***
 
+    return {
+        'version': MAPPING_CONTEXT_VERSION,
+        'table_mappings': table_mappings,
+        'delimited_fields': delimited_fields,
+        'ontology': _build_cleaner_ontology(org),
+    }
+
+
+def _cache_mapping_context(import_file):
+    """
+    Build the mapping context of the import file and store it in the cache for the
+    map_row_chunk tasks.
+
+    :param import_file: ImportFile object
+    :return: dict, the mapping context
+    """
+    context = _build_mapping_context(import_file)
+    set_cache_raw(_mapping_context_key(import_file.id), context, MAPPING_CONTEXT_TIMEOUT)
+    return context
+
+
+def _get_mapping_context(import_file):
+    """
+    Return the mapping context of the import file from the cache. The context is rebuilt if it
+    has expired or was stored by a different version of the code.
+
+    :param import_file: ImportFile object
+    :return: dict, the mapping context
+    """
+    context = get_cache_raw(_mapping_context_key(import_file.id))
+    if not context or context.get('version') != MAPPING_CONTEXT_VERSION:
+        context = _cache_mapping_context(import_file)
+    return context
+
+
+@shared_task(ignore_result=True)
+def map_row_chunk(ids, file_pk, source_type, prog_key, **kwargs):
+    """Does the work of matching a mapping to a source type and saving
+
+    :param ids: list of PropertyState IDs to map.
+    :param file_pk: int, the PK for an ImportFile obj.
+    :param source_type: int, represented by either ASSESSED_RAW or PORTFOLIO_RAW.
+    :param prog_key: string, key of the progress key
+    """
+    start_time = time.time()
+    progress_data = ProgressData.from_key(prog_key)
+    import_file = ImportFile.objects.select_related('import_record__super_organization').get(pk=file_pk)
+    save_type = PORTFOLIO_BS
+    if source_type == ASSESSED_RAW:
+        save_type = ASSESSED_BS
+
+    org = import_file.import_record.super_organization
+
+    # The mappings, delimited fields and cleaner are the same for every chunk of the file, so
+    # they are built once by map_data and read out of the cache
+    mapping_context = _get_mapping_context(import_file)
+    table_mappings = mapping_context['table_mappings']
+    delimited_fields = mapping_context['delimited_fields']
+    map_cleaner = cleaners.Cleaner(mapping_context['ontology'])
+
+    mapped_count = 0
     try:
         with transaction.atomic():
             # yes, there are three cascading for loops here. sorry :(
@@ -333,10 +453,11 @@ def map_row_chunk(ids, file_pk, source_type, prog_key, **kwargs):
                 data = PropertyState.objects.filter(id__in=ids).only('extra_data',
                                                                      'bounding_box').iterator()
 
-                # Since we are importing CSV, then each extra_data field will have the same fields.
-                # So save the map_model_obj outside of for loop to pass into the `save_column_names`
-                # methods
-                map_model_obj = None
+                # The hash of a state with no data is the same for every row
+                empty_hash = empty_state_hash(STR_TO_CLASS[table])
+
+                # Collect all of the mapped objects for the table and bulk create them at the end
+                map_model_objs = []
 
                 # Loop over all the rows
                 for original_row in data:
@@ -385,10 +506,7 @@ def map_row_chunk(ids, file_pk, source_type, prog_key, **kwargs):
                         # make sure that the object hasn't already been created. For example, in
                         # the test data the tax lot id is the same for many rows. Make sure
                         # to only create/save the object if it hasn't been created before.
-                        if hash_state_object(map_model_obj, include_extra_data=False) == \
-                            hash_state_object(
-                                STR_TO_CLASS[table](organization=map_model_obj.organization),
-                                include_extra_data=False):
+                        if hash_state_object(map_model_obj, include_extra_data=False) == empty_hash:
                             # Skip this object as it has no data...
                             _log.warn(
                                 "Skipping property or taxlot during mapping because it is identical to another row")
@@ -402,26 +520,16 @@ def map_row_chunk(ids, file_pk, source_type, prog_key, **kwargs):
                                 _store_raw_footprint_and_create_rule(footprint_details, table, org, import_file,
                                                                      original_row, map_model_obj)
 
-                        # There was an error with a field being too long [> 255 chars].
-                        map_model_obj.save()
+                        map_model_objs.append(map_model_obj)
 
-                        # Create an audit log record for the new map_model_obj that was created.
-
-                        AuditLogClass = PropertyAuditLog if isinstance(
-                            map_model_obj, PropertyState) else TaxLotAuditLog
-                        AuditLogClass.objects.create(
-                            organization=org,
-                            state=map_model_obj,
-                            name='Import Creation',
-                            description='Creation from Import file.',
-                            import_filename=import_file,
-                            record_type=AUDIT_IMPORT
-                        )
+                if map_model_objs:
+                    # There was an error with a field being too long [> 255 chars].
+                    _bulk_create_mapped_states(map_model_objs, org, import_file)
+                    mapped_count += len(map_model_objs)
 
-                # Make sure that we've saved all of the extra_data column names from the first item
-                # in list
-                if map_model_obj:
-                    Column.save_column_names(map_model_obj)
+                    # Make sure that we've saved all of the extra_data column names from the first item
+                    # in list
+                    Column.save_column_names(map_model_objs[-1])
     except IntegrityError as e:
         progress_data.finish_with_error('Could not map_row_chunk with error', str(e))
         raise IntegrityError("Could not map_row_chunk with error: %s" % str(e))
@@ -434,11 +542,64 @@ def map_row_chunk(ids, file_pk, source_type, prog_key, **kwargs):
         progress_data.finish_with_error('Invalid type found while mapping data', str(e))
         raise DataError("Invalid type found while mapping data: %s" % str(e))
 
-    progress_data.step()
+    elapsed = time.time() - start_time
+    record_chunk_duration('map_data', len(ids), elapsed)
+    rows_per_second = mapped_count / elapsed if elapsed > 0 else mapped_count
+    _log.debug("Mapped %s rows in %.2f seconds (%.0f rows/sec)" % (mapped_count, elapsed, rows_per_second))
+    progress_data.step('Mapped %s rows (%.0f rows/sec)' % (mapped_count, rows_per_second))
 
     return True
 
 
+def _record_chunk_size(import_file, stage, chunk_size):
+    """
+    Keep the chunk size used for a stage of the import with the import file's results so that it
+    is reported in the import summary. The import file still needs to be saved.
+    """
+    import_file.matching_results_data.setdefault('chunk_sizes', {})[stage] = chunk_size
+
+
+def _bulk_create_mapped_states(map_model_objs, org, import_file):
+    """
+    Insert the mapped -States and their 'Import Creation' audit logs with one bulk insert each.
+
+    bulk_create does not call the model's save() method, so the normalized address and the hash
+    of each -State are calculated here before the insert.
+
+    :param map_model_objs: list, unsaved PropertyStates or TaxLotStates of the same class
+    :param org: Organization object
+    :param import_file: ImportFile object
+    :return: list, the saved -States
+    """
+    StateClass = type(map_model_objs[0])
+    AuditLogClass = PropertyAuditLog if StateClass == PropertyState else TaxLotAuditLog
+
+    for map_model_obj in map_model_objs:
+        if map_model_obj.address_line_1 is not None:
+            map_model_obj.normalized_address = normalize_address_str(map_model_obj.address_line_1)
+        else:
+            map_model_obj.normalized_address = None
+
+    for map_model_obj, hash_object in zip(map_model_objs, hash_state_objects(map_model_objs)):
+        map_model_obj.hash_object = hash_object
+
+    # PostgreSQL returns the primary keys from the bulk insert which are needed for the audit logs
+    states = StateClass.objects.bulk_create(map_model_objs)
+
+    AuditLogClass.objects.bulk_create([
+        AuditLogClass(
+            organization=org,
+            state=state,
+            name='Import Creation',
+            description='Creation from Import file.',
+            import_filename=import_file,
+            record_type=AUDIT_IMPORT
+        ) for state in states
+    ])
+
+    return states
+
+
 def _store_raw_footprint_and_create_rule(footprint_details, table, org, import_file, original_row, map_model_obj):
     column_name = footprint_details['raw_field'] + ' (Invalid Footprint)'
 
@@ -503,7 +664,11 @@ def _map_data_create_tasks(import_file_id, progress_key):
         data_state=DATA_STATE_IMPORT,
     ).only('id').iterator()
 
-    id_chunks = [[obj.id for obj in chunk] for chunk in batch(qs, 100)]
+    chunk_size = get_chunk_size('map_data')
+    id_chunks = [[obj.id for obj in chunk] for chunk in batch(qs, chunk_size)]
+
+    _record_chunk_size(import_file, 'map_data', chunk_size)
+    import_file.save()
 
     progress_data.total = len(id_chunks)
     progress_data.save()
@@ -513,7 +678,7 @@ def _map_data_create_tasks(import_file_id, progress_key):
     return tasks
 
 
-def _data_quality_check_create_tasks(org_id, property_state_ids, taxlot_state_ids, dq_id):
+def _data_quality_check_create_tasks(org_id, property_state_ids, taxlot_state_ids, dq_id, chunk_size=100):
     """
     Entry point into running data quality checks.
 
@@ -526,6 +691,7 @@ def _data_quality_check_create_tasks(org_id, property_state_ids, taxlot_state_id
     :param property_state_ids: list, list of property state IDs to check
     :param taxlot_state_ids: list, list of tax lot state IDs to check
     :param dq_id: str, for retrieving progress status
+    :param chunk_size: int, number of states to check per task
     """
     # Initialize the data quality checks with the organization here. It is important to do it here
     # since the .retrieve method in the check_data_chunk method will result in a race condition if celery is
@@ -534,12 +700,12 @@ def _data_quality_check_create_tasks(org_id, property_state_ids, taxlot_state_id
 
     tasks = []
     if property_state_ids:
-        id_chunks = [[obj for obj in chunk] for chunk in batch(property_state_ids, 100)]
+        id_chunks = [[obj for obj in chunk] for chunk in batch(property_state_ids, chunk_size)]
         for ids in id_chunks:
             tasks.append(check_data_chunk.s("PropertyState", ids, dq_id))
 
     if taxlot_state_ids:
-        id_chunks_tl = [[obj for obj in chunk] for chunk in batch(taxlot_state_ids, 100)]
+        id_chunks_tl = [[obj for obj in chunk] for chunk in batch(taxlot_state_ids, chunk_size)]
         for ids in id_chunks_tl:
             tasks.append(check_data_chunk.s("TaxLotState", ids, dq_id))
 
@@ -599,6 +765,9 @@ def map_data(import_file_id, remap=False, mark_as_done=True):
     progress_data = ProgressData(func_name='map_data', unique_id=import_file_id)
     progress_data.delete()
 
+    # build the mappings and cleaner once for all of the map_row_chunk tasks
+    _cache_mapping_context(import_file)
+
     tasks = _map_data_create_tasks(import_file_id, progress_data.key)
     if tasks:
         chord(tasks)(finish_mapping.si(import_file_id, mark_as_done, progress_data.key))
@@ -609,50 +778,107 @@ def map_data(import_file_id, remap=False, mark_as_done=True):
     return progress_data.result()
 
 
-@shared_task(ignore_result=True)
-def _save_raw_data_chunk(chunk, file_pk, progress_key):
+def _save_raw_data(chunk, import_file):
     """
     Save the raw data to the database
 
-    :param chunk: list, ids to process
-    :param file_pk: ImportFile Primary Key
-    :param progress_key: string, Progress Key to append progress
-    :return: Bool, Always true
+    The raw rows only hold extra_data (and possibly a bounding_box), so the PropertyStates are
+    created with a single multi-row INSERT via bulk_create. This skips PropertyState.save() and the
+    address normalization and hashing, which are only needed once the rows have been mapped.
+
+    :param chunk: list, rows to save
+    :param import_file: ImportFile object
     """
-    import_file = ImportFile.objects.get(pk=file_pk)
+    organization = import_file.import_record.super_organization
 
     # Save our "column headers" and sample rows for F/E.
     source_type = get_source_type(import_file)
+    raw_properties = []
+    for c in chunk:
+        raw_property = PropertyState(
+            organization=organization,
+            import_file=import_file,
+            source_type=source_type,
+            data_state=DATA_STATE_IMPORT,
+        )
+
+        # sanitize c and remove any diacritics
+        new_chunk = {}
+        for k, v in c.items():
+            # remove extra spaces surrounding keys.
+            key = k.strip()
+
+            if key == "bounding_box":  # capture bounding_box GIS field on raw record
+                raw_property.bounding_box = v
+            elif isinstance(v, basestring):
+                new_chunk[key] = unidecode(v)
+            elif isinstance(v, (datetime, date)):
+                raise TypeError(
+                    "Datetime class not supported in Extra Data. Needs to be a string.")
+            else:
+                new_chunk[key] = v
+        raw_property.extra_data = new_chunk
+        raw_properties.append(raw_property)
+
     try:
         with transaction.atomic():
-            for c in chunk:
-                raw_property = PropertyState(
-                    organization=import_file.import_record.super_organization)
-                raw_property.import_file = import_file
-
-                # sanitize c and remove any diacritics
-                new_chunk = {}
-                for k, v in c.items():
-                    # remove extra spaces surrounding keys.
-                    key = k.strip()
-
-                    if key == "bounding_box":  # capture bounding_box GIS field on raw record
-                        raw_property.bounding_box = v
-                    elif isinstance(v, basestring):
-                        new_chunk[key] = unidecode(v)
-                    elif isinstance(v, (datetime, date)):
-                        raise TypeError(
-                            "Datetime class not supported in Extra Data. Needs to be a string.")
-                    else:
-                        new_chunk[key] = v
-                raw_property.extra_data = new_chunk
-                raw_property.source_type = source_type
-                raw_property.data_state = DATA_STATE_IMPORT
-                raw_property.organization = import_file.import_record.super_organization
-                raw_property.save()
+            PropertyState.objects.bulk_create(raw_properties)
     except IntegrityError as e:
         raise IntegrityError("Could not save_raw_data_chunk with error: %s" % (e))
 
+
+@shared_task(ignore_result=True)
+def _save_raw_data_chunk(chunk, file_pk, progress_key):
+    """
+    Save the raw data to the database
+
+    :param chunk: list, rows to process
+    :param file_pk: ImportFile Primary Key
+    :param progress_key: string, Progress Key to append progress
+    :return: Bool, Always true
+    """
+    start_time = time.time()
+    import_file = ImportFile.objects.get(pk=file_pk)
+    _save_raw_data(chunk, import_file)
+    record_chunk_duration('save_raw_data', len(chunk), time.time() - start_time)
+
+    # Indicate progress
+    progress_data = ProgressData.from_key(progress_key)
+    progress_data.step()
+
+    return True
+
+
+def _open_stored_csv(import_file):
+    """
+    Open the stored CSV import file as text in place, without the temporary copy of
+    ImportFile.local_file
+
+    :param import_file: ImportFile
+    :return: file
+    """
+    return open(import_file.file.path, 'r')
+
+
+@shared_task(ignore_result=True)
+def _save_raw_data_chunk_from_file(position, num_rows, file_pk, progress_key):
+    """
+    Read a chunk of rows out of the import file and save the raw data to the database
+
+    :param position: position of the first row of the chunk, from MCMParser.positioned_rows
+    :param num_rows: int, number of rows in the chunk
+    :param file_pk: ImportFile Primary Key
+    :param progress_key: string, Progress Key to append progress
+    :return: Bool, Always true
+    """
+    start_time = time.time()
+    import_file = ImportFile.objects.get(pk=file_pk)
+    with _open_stored_csv(import_file) as csv_file:
+        parser = reader.MCMParser(csv_file)
+        chunk = list(islice(parser.rows_from_position(position), num_rows))
+    _save_raw_data(chunk, import_file)
+    record_chunk_duration('save_raw_data', num_rows, time.time() - start_time)
+
     # Indicate progress
     progress_data = ProgressData.from_key(progress_key)
     progress_data.step()
@@ -970,19 +1196,31 @@ def _save_raw_data_create_tasks(file_pk, progress_key):
     import_file.num_rows = 0
     import_file.num_columns = parser.num_columns()
 
-    chunks = []
-    for batch_chunk in batch(parser.data, 100):
-        import_file.num_rows += len(batch_chunk)
-        chunks.append(batch_chunk)
-    import_file.save()
-
-    progress_data.total = len(chunks)
-    progress_data.save()
+    chunk_size = get_chunk_size('save_raw_data')
+    _record_chunk_size(import_file, 'save_raw_data', chunk_size)
 
     # Add in the save raw data chunks to the background tasks
     tasks = []
-    for chunk in chunks:
-        tasks.append(_save_raw_data_chunk.s(chunk, file_pk, progress_data.key))
+    if STREAM_RAW_DATA_IMPORT and isinstance(parser, reader.MCMParser) and \
+            isinstance(parser.reader, reader.CSVParser):
+        # Only the position of the first row and the number of rows of each chunk are sent to the
+        # tasks, each task reads its own rows out of the stored file. The positions are read from
+        # the stored file as well so that they match the file the tasks read. Excel workbooks
+        # would have to be parsed in full by every task, so their rows are still sent.
+        with _open_stored_csv(import_file) as csv_file:
+            for positioned_chunk in batch(reader.MCMParser(csv_file).positioned_rows(), chunk_size):
+                import_file.num_rows += len(positioned_chunk)
+                tasks.append(_save_raw_data_chunk_from_file.s(
+                    positioned_chunk[0][0], len(positioned_chunk), file_pk, progress_data.key
+                ))
+    else:
+        for batch_chunk in batch(parser.data, chunk_size):
+            import_file.num_rows += len(batch_chunk)
+            tasks.append(_save_raw_data_chunk.s(batch_chunk, file_pk, progress_data.key))
+    import_file.save()
+
+    progress_data.total = len(tasks)
+    progress_data.save()
 
     return chord(tasks, interval=15)(finish_raw_save.s(file_pk, progress_data.key))
 
@@ -1092,7 +1330,11 @@ def finish_matching(result, import_file_id, progress_key):
     import_file.matching_done = True
     import_file.mapping_completion = 100
     if isinstance(result, list) and len(result) == 1:
+        # keep the chunk sizes of the previous stages of the import
+        chunk_sizes = import_file.matching_results_data.get('chunk_sizes')
         import_file.matching_results_data = result[0]
+        if chunk_sizes:
+            import_file.matching_results_data['chunk_sizes'] = chunk_sizes
     else:
         raise Exception('there are more than one results for matching_results, need to merge')
     import_file.save()
@@ -1100,31 +1342,64 @@ def finish_matching(result, import_file_id, progress_key):
     return progress_data.finish_with_success()
 
 
-def hash_state_object(obj, include_extra_data=True):
-    def add_dictionary_repr_to_hash(hash_obj, dict_obj):
-        assert isinstance(dict_obj, dict)
+# Names of the fields that are used in the hash of the -State objects. The names only depend on
+# the models, so they are looked up once per process the first time a hash is calculated (after
+# the apps have been loaded) instead of on every call.
+_HASH_FIELD_NAMES = None
 
-        for (key, value) in sorted(dict_obj.items(), key=lambda x_y: x_y[0]):
-            if isinstance(value, dict):
-                add_dictionary_repr_to_hash(hash_obj, value)
-            else:
-                hash_obj.update(str(unidecode(key)).encode('utf-8'))
-                if isinstance(value, basestring):
-                    hash_obj.update(unidecode(value).encode('utf-8'))
-                else:
-                    hash_obj.update(str(value).encode('utf-8'))
-        return hash_obj
-
-    def _get_field_from_obj(field_obj, field):
-        if not hasattr(field_obj, field):
-            return 'FOO'  # Return a random value so we can distinguish between this and None.
+# Hash of a -State object with no data, by class name
+_EMPTY_STATE_HASHES = {}
+
+
+def hash_field_names():
+    """
+    Return the names of the fields used in the hash of the -State objects along with their
+    utf-8 encoded names.
+
+    :return: list of tuples, [(field name, encoded field name), ...]
+    """
+    global _HASH_FIELD_NAMES
+    if _HASH_FIELD_NAMES is None:
+        _HASH_FIELD_NAMES = [
+            (f, f.encode('utf-8')) for f in Column.retrieve_db_field_name_for_hash_comparison()
+        ]
+    return _HASH_FIELD_NAMES
+
+
+def empty_state_hash(state_class):
+    """
+    Return the hash (without the extra_data) of a -State object of the class that has no data.
+
+    :param state_class: class, PropertyState or TaxLotState
+    :return: str, hash
+    """
+    key = state_class.__name__
+    if key not in _EMPTY_STATE_HASHES:
+        _EMPTY_STATE_HASHES[key] = hash_state_object(state_class(), include_extra_data=False)
+    return _EMPTY_STATE_HASHES[key]
+
+
+def _add_dictionary_repr_to_hash(hash_obj, dict_obj):
+    assert isinstance(dict_obj, dict)
+
+    for (key, value) in sorted(dict_obj.items(), key=lambda x_y: x_y[0]):
+        if isinstance(value, dict):
+            _add_dictionary_repr_to_hash(hash_obj, value)
         else:
-            return getattr(field_obj, field)
+            hash_obj.update(str(unidecode(key)).encode('utf-8'))
+            if isinstance(value, basestring):
+                hash_obj.update(unidecode(value).encode('utf-8'))
+            else:
+                hash_obj.update(str(value).encode('utf-8'))
+    return hash_obj
+
 
+def _hash_state_object(obj, field_names, include_extra_data):
     m = hashlib.md5()
-    for f in Column.retrieve_db_field_name_for_hash_comparison():
-        obj_val = _get_field_from_obj(obj, f)
-        m.update(f.encode('utf-8'))
+    for f, encoded_f in field_names:
+        # Use a random value so we can distinguish between a missing field and None.
+        obj_val = getattr(obj, f, 'FOO')
+        m.update(encoded_f)
         if isinstance(obj_val, datetime):
             # if this is a datetime, then make sure to save the string as a naive datetime.
             # Somehow, somewhere the data are being saved in mapping with a timezone,
@@ -1136,11 +1411,28 @@ def hash_state_object(obj, include_extra_data=True):
             m.update(str(obj_val).encode('utf-8'))
 
     if include_extra_data:
-        add_dictionary_repr_to_hash(m, obj.extra_data)
+        _add_dictionary_repr_to_hash(m, obj.extra_data)
 
     return m.hexdigest()
 
 
+def hash_state_object(obj, include_extra_data=True):
+    return _hash_state_object(obj, hash_field_names(), include_extra_data)
+
+
+def hash_state_objects(objs, include_extra_data=True):
+    """
+    Hash a batch of -State objects. This returns the same hashes as calling hash_state_object
+    on each of the objects.
+
+    :param objs: iterable of PropertyState or TaxLotState objects
+    :param include_extra_data: bool, include the extra_data in the hash
+    :return: list, hashes in the order of the objects
+    """
+    field_names = hash_field_names()
+    return [_hash_state_object(obj, field_names, include_extra_data) for obj in objs]
+
+
 def list_canonical_property_states(org_id):
     """
     Return a QuerySet of the property states that are part of the inventory
@@ -1262,53 +1554,77 @@ def pair_new_states(merged_property_views, merged_taxlot_views):
     # property_comparison_keys = {property_m2m_keygen.calculate_comparison_key_key(p): p.pk for p in property_objects}
     # property_canonical_keys = {property_m2m_keygen.calculate_canonical_key(p): p.pk for p in property_objects}
 
-    possible_merges = []  # List of prop.id, tl.id merges.
+    # Two keys are equivalent if any of the positions they have in common hold the same value
+    # (see EquivalencePartitioner.calculate_key_equivalence), so index the pks by the value at
+    # each position to find the equivalent views with dictionary lookups.
+    key_length = min(len(prop_cmp_fmt), len(tax_cmp_fmt))
+    taxlot_index = [collections.defaultdict(set) for _ in range(key_length)]
+    for tlk, tl_pk in taxlot_keys.items():
+        for position, value in enumerate(tlk[:key_length]):
+            if value is not None:
+                taxlot_index[position][value].add(tl_pk)
 
-    for pv in merged_property_views:
-        # if pv.state.lot_number and ";" in pv.state.lot_number:
-        #     pdb.set_trace()
+    property_index = [collections.defaultdict(set) for _ in range(key_length)]
+    for pk_key, p_pk in property_keys.items():
+        for position, value in enumerate(pk_key[:key_length]):
+            if value is not None:
+                property_index[position][value].add(p_pk)
 
+    possible_merges = set()  # Set of prop.id, tl.id merges.
+
+    for pv in merged_property_views:
         pv_key = property_m2m_keygen.calculate_comparison_key(pv.state)
-        # TODO: Refactor pronto.  Iterating over the tax lot is bad implementation.
-        for tlk in taxlot_keys:
-            if pv_key[0] and ";" in pv_key[0]:
-                for lotnum in map(lambda x: x.strip(), pv_key[0].split(";")):
-                    pv_key_copy = list(copy.deepcopy(pv_key))
-                    pv_key_copy[0] = lotnum
-                    pv_key_copy = tuple(pv_key_copy)
-                    if property_m2m_keygen.calculate_key_equivalence(pv_key_copy, tlk):
-                        possible_merges.append((property_keys[pv_key_copy], taxlot_keys[tlk]))
-            else:
-                if property_m2m_keygen.calculate_key_equivalence(pv_key, tlk):
-                    possible_merges.append((property_keys[pv_key], taxlot_keys[tlk]))
+        if pv_key[0] and ";" in pv_key[0]:
+            pv_keys = []
+            for lotnum in map(lambda x: x.strip(), pv_key[0].split(";")):
+                pv_key_copy = list(pv_key)
+                pv_key_copy[0] = lotnum
+                pv_keys.append(tuple(pv_key_copy))
+        else:
+            pv_keys = [pv_key]
+
+        for key in pv_keys:
+            if key not in property_keys:
+                continue
+            for position, value in enumerate(key[:key_length]):
+                if value is not None:
+                    for tl_pk in taxlot_index[position].get(value, ()):
+                        possible_merges.add((property_keys[key], tl_pk))
 
     for tlv in merged_taxlot_views:
         tlv_key = taxlot_m2m_keygen.calculate_comparison_key(tlv.state)
-        for pv_key in property_keys:
-            if property_m2m_keygen.calculate_key_equivalence(tlv_key, pv_key):
-                possible_merges.append((property_keys[pv_key], taxlot_keys[tlv_key]))
-
-    for m2m in set(possible_merges):
-        pv_pk, tlv_pk = m2m
-
-        # PropertyView.objects.get(pk=pv_pk)
-        # TaxLotView.objects.get(pk=tlv_pk)
-
-        count = TaxLotProperty.objects.filter(
-            property_view_id=pv_pk,
-            taxlot_view_id=tlv_pk
-        ).count()
-
-        if count:
+        if tlv_key not in taxlot_keys:
             continue
+        for position, value in enumerate(tlv_key[:key_length]):
+            if value is not None:
+                for p_pk in property_index[position].get(value, ()):
+                    possible_merges.add((p_pk, taxlot_keys[tlv_key]))
+
+    if not possible_merges:
+        return
 
-        is_primary = TaxLotProperty.objects.filter(property_view_id=pv_pk).count() == 0
-        m2m_join = TaxLotProperty(
-            property_view_id=pv_pk,
-            taxlot_view_id=tlv_pk,
-            cycle=cycle,
-            primary=is_primary
+    # Resolve the existing links of the property views in one query
+    existing_links = set()
+    linked_property_view_ids = set()
+    for pv_pk, tlv_pk in TaxLotProperty.objects.filter(
+        property_view_id__in={pv_pk for pv_pk, _ in possible_merges}
+    ).values_list('property_view_id', 'taxlot_view_id'):
+        existing_links.add((pv_pk, tlv_pk))
+        linked_property_view_ids.add(pv_pk)
+
+    # The first link of a property view is its primary link
+    m2m_joins = []
+    for pv_pk, tlv_pk in sorted(possible_merges - existing_links):
+        m2m_joins.append(
+            TaxLotProperty(
+                property_view_id=pv_pk,
+                taxlot_view_id=tlv_pk,
+                cycle=cycle,
+                primary=pv_pk not in linked_property_view_ids
+            )
         )
-        m2m_join.save()
+        linked_property_view_ids.add(pv_pk)
+
+    TaxLotProperty.objects.bulk_create(m2m_joins)
 
     return
@@ -18,6 +18,8 @@ from seed.data_importer.tests.util import (
 from seed.models import (
     Column,
     PropertyState,
+    PropertyView,
+    TaxLotProperty,
     TaxLotState,
     TaxLotView,
     DATA_STATE_MAPPING,
@@ -84,3 +86,15 @@ class TestCaseB(DataMappingBaseTestCase):
         tlv = tlv[0]
         properties = tlv.property_states()
         self.assertEqual(len(properties), 3)
+
+        # the property with three tax lots only has one primary link
+        pv = PropertyView.objects.get(state__pm_property_id='5233255', cycle=self.cycle)
+        links = TaxLotProperty.objects.filter(property_view=pv)
+        self.assertEqual(links.count(), 3)
+        self.assertEqual(links.filter(primary=True).count(), 1)
+
+        # matching again does not create duplicate links
+        link_count = TaxLotProperty.objects.filter(cycle=self.cycle).count()
+        tasks.pair_new_states(list(PropertyView.objects.filter(cycle=self.cycle)),
+                              list(TaxLotView.objects.filter(cycle=self.cycle)))
+        self.assertEqual(TaxLotProperty.objects.filter(cycle=self.cycle).count(), link_count)
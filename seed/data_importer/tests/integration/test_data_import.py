@@ -29,6 +29,7 @@ from seed.models import (
     ASSESSED_RAW,
     ASSESSED_BS,
     DATA_STATE_IMPORT,
+    DATA_STATE_MATCHING,
     PORTFOLIO_RAW,
     Column,
     PropertyState,
@@ -87,6 +88,10 @@ class TestDataImport(DataMappingBaseTestCase):
 
         self.assertDictEqual(raw_saved.extra_data, self.fake_extra_data)
         self.assertEqual(raw_saved.organization, self.org)
+        self.assertEqual(raw_saved.data_state, DATA_STATE_IMPORT)
+
+        # raw records are bulk inserted without being hashed, that happens once they are mapped
+        self.assertIsNone(raw_saved.hash_object)
 
     def test_map_data(self):
         """Save mappings based on user specifications."""
@@ -210,6 +215,29 @@ class TestMappingExampleData(DataMappingBaseTestCase):
         props = PropertyView.objects.all()
         self.assertEqual(len(props), 2)
 
+    def test_promote_states(self):
+        """Test if promoting a list of states gives the same views as promoting each state"""
+        tasks.save_raw_data(self.import_file.pk)
+        Column.create_mappings(self.fake_mappings, self.org, self.user, self.import_file.pk)
+        tasks.map_data(self.import_file.pk)
+
+        states = list(PropertyState.objects.filter(import_file=self.import_file).order_by('id'))
+        self.assertGreater(len(states), 2)
+        pv1 = states[0].promote(self.cycle)
+
+        views = PropertyState.promote_states(states, self.cycle)
+        self.assertEqual(len(views), len(states))
+        self.assertEqual(views[0], pv1)
+        self.assertEqual([view.state_id for view in views], [state.id for state in states])
+        self.assertEqual(len(set(view.property_id for view in views)), len(states))
+
+        for state in PropertyState.objects.filter(pk__in=[state.id for state in states]):
+            self.assertEqual(state.data_state, DATA_STATE_MATCHING)
+
+        # promoting again returns the same views
+        self.assertEqual(PropertyState.promote_states(states, self.cycle), views)
+        self.assertEqual(PropertyView.objects.filter(cycle=self.cycle).count(), len(states))
+
 
 # For some reason if you comment out the next two test cases (TestMappingPropertiesOnly and
 # TestMappingTaxLotsOnly), the test_views_matching.py file will fail. I cannot figure out
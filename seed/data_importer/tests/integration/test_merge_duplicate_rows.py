@@ -82,6 +82,25 @@ class TestCaseMultipleDuplicateMatching(DataMappingBaseTestCase):
         hash_res = tasks.hash_state_object(ps6)
         self.assertEqual(len(hash_res), 32)
 
+    def test_hash_state_objects(self):
+        states = [
+            PropertyState(address_line_1='123 fake st', extra_data={"a": "100"}),
+            PropertyState(extra_data={"a": "200"}),
+            TaxLotState(jurisdiction_tax_lot_id='1234', extra_data={"a": "100"}),
+        ]
+        self.assertEqual(tasks.hash_state_objects(states),
+                         [tasks.hash_state_object(state) for state in states])
+        self.assertEqual(tasks.hash_state_objects(states, include_extra_data=False),
+                         [tasks.hash_state_object(state, include_extra_data=False) for state in states])
+
+        self.assertEqual(tasks.empty_state_hash(PropertyState),
+                         tasks.hash_state_object(PropertyState(organization=self.org),
+                                                 include_extra_data=False))
+        self.assertEqual(tasks.empty_state_hash(TaxLotState),
+                         tasks.hash_state_object(TaxLotState(), include_extra_data=False))
+        self.assertNotEqual(tasks.empty_state_hash(PropertyState),
+                            tasks.empty_state_hash(TaxLotState))
+
     def test_hash_various_states(self):
         """The hashing should not affect the data_state, source, type and various other states"""
         ps1 = PropertyState.objects.create(
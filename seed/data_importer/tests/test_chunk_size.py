@@ -0,0 +1,49 @@
+# !/usr/bin/env python
+# encoding: utf-8
+"""
+:copyright (c) 2014 - 2020, The Regents of the University of California, through Lawrence Berkeley National Laboratory (subject to receipt of any required approvals from the U.S. Department of Energy) and contributors. All rights reserved.  # NOQA
+:author
+"""
+import mock
+from django.core.cache import cache
+from django.test import TestCase
+
+from seed.data_importer import utils
+from seed.data_importer.utils import get_chunk_size, record_chunk_duration
+
+
+class TestChunkSize(TestCase):
+    def setUp(self):
+        cache.delete(utils._chunk_timing_key('test_stage'))
+
+    def test_default_chunk_size(self):
+        self.assertEqual(get_chunk_size('test_stage'), 100)
+
+    def test_configured_chunk_size(self):
+        with mock.patch.object(utils, 'CHUNK_SIZES', {'test_stage': 250}):
+            self.assertEqual(get_chunk_size('test_stage'), 250)
+
+    def test_adaptive_chunk_size(self):
+        with mock.patch.object(utils, 'ADAPTIVE_CHUNK_SIZE', True), \
+                mock.patch.object(utils, 'CHUNK_TARGET_SECONDS', 30), \
+                mock.patch.object(utils, 'MAX_CHUNK_SIZE', 5000):
+            # no timings yet, so use the configured size
+            self.assertEqual(get_chunk_size('test_stage'), 100)
+
+            # 100 rows in 2 seconds is 0.02 seconds per row, so 1500 rows take 30 seconds
+            record_chunk_duration('test_stage', 100, 2.0)
+            self.assertEqual(get_chunk_size('test_stage'), 1500)
+
+            # very fast chunks are capped at the max chunk size
+            for _ in range(50):
+                record_chunk_duration('test_stage', 100, 0.001)
+            self.assertEqual(get_chunk_size('test_stage'), 5000)
+
+            # slow chunks never shrink the size below the configured size
+            for _ in range(50):
+                record_chunk_duration('test_stage', 100, 600)
+            self.assertEqual(get_chunk_size('test_stage'), 100)
+
+    def test_timings_not_recorded_unless_adaptive(self):
+        record_chunk_duration('test_stage', 100, 2.0)
+        self.assertIsNone(cache.get(utils._chunk_timing_key('test_stage')))
@@ -19,6 +19,7 @@ from seed.models import (
     ASSESSED_RAW,
     DATA_STATE_IMPORT,
     Column,
+    PropertyAuditLog,
 )
 from seed.models.column_mappings import get_column_mapping
 from seed.test_helpers.fake import (
@@ -27,6 +28,8 @@ from seed.test_helpers.fake import (
     FakePropertyViewFactory,
 )
 from seed.tests.util import DataMappingBaseTestCase
+from seed.utils.address import normalize_address_str
+from seed.utils.cache import get_cache_raw, set_cache_raw
 
 logger = logging.getLogger(__name__)
 
@@ -94,6 +97,71 @@ class TestMapping(DataMappingBaseTestCase):
         # for p in props:
         #     pp(p)
 
+    def test_mapping_bulk_creates_audit_logs_and_hashes(self):
+        """Test that the bulk mapping path stores the hash and an audit log for each new state"""
+        self.property_state_factory.get_property_state_as_extra_data(
+            import_file_id=self.import_file.id,
+            source_type=ASSESSED_RAW,
+            data_state=DATA_STATE_IMPORT,
+            address_line_1='742 Evergreen Terrace',
+        )
+        self.import_file.raw_save_done = True
+        self.import_file.save()
+
+        mappings = [
+            {
+                "from_field": 'address_line_1',
+                "from_units": None,
+                "to_table_name": 'PropertyState',
+                "to_field": 'address_line_1',
+                "to_field_display_name": 'Address Line 1',
+            },
+        ]
+        Column.create_mappings(mappings, self.org, self.user, self.import_file.id)
+
+        tasks.map_data(self.import_file.id)
+
+        props = self.import_file.find_unmatched_property_states()
+        self.assertEqual(len(props), 1)
+        prop = props.first()
+        self.assertEqual(prop.normalized_address, normalize_address_str('742 Evergreen Terrace'))
+        self.assertEqual(prop.hash_object, tasks.hash_state_object(prop))
+        self.assertEqual(
+            PropertyAuditLog.objects.filter(state=prop, name='Import Creation').count(), 1
+        )
+
+    def test_mapping_context_is_cached_for_chunks(self):
+        """Test that map_data builds the mapping context once and the chunks read it back"""
+        mappings = [
+            {
+                "from_field": 'address_line_1',
+                "from_units": None,
+                "to_table_name": 'PropertyState',
+                "to_field": 'address_line_1',
+                "to_field_display_name": 'Address Line 1',
+            },
+        ]
+        Column.create_mappings(mappings, self.org, self.user, self.import_file.id)
+        self.import_file.first_row_columns = ['address_line_1']
+        self.import_file.save()
+
+        tasks._cache_mapping_context(self.import_file)
+        context = get_cache_raw(tasks._mapping_context_key(self.import_file.id))
+        self.assertEqual(context['version'], tasks.MAPPING_CONTEXT_VERSION)
+        self.assertEqual(
+            context['table_mappings']['PropertyState']['address_line_1'],
+            ('PropertyState', 'address_line_1', 'Address Line 1', False)
+        )
+        self.assertEqual(context['ontology'], tasks._build_cleaner_ontology(self.org))
+
+        # stale versions of the context are rebuilt
+        context['version'] = tasks.MAPPING_CONTEXT_VERSION - 1
+        context['table_mappings'] = {}
+        set_cache_raw(tasks._mapping_context_key(self.import_file.id), context)
+        context = tasks._get_mapping_context(self.import_file)
+        self.assertEqual(context['version'], tasks.MAPPING_CONTEXT_VERSION)
+        self.assertIn('PropertyState', context['table_mappings'])
+
 
 class TestDuplicateFileHeaders(DataMappingBaseTestCase):
     def setUp(self):
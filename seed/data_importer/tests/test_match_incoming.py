@@ -11,6 +11,7 @@ from seed.data_importer.tasks import match_buildings
 from seed.data_importer.match import (
     filter_duplicate_states,
     save_state_match,
+    save_state_match_groups,
 )
 from seed.models import (
     ASSESSED_RAW,
@@ -35,6 +36,11 @@ from seed.test_helpers.fake import (
     FakeTaxLotStateFactory,
 )
 from seed.tests.util import DataMappingBaseTestCase
+from seed.utils.match import (
+    matching_criteria_column_names,
+    matching_criteria_key,
+    states_by_matching_criteria,
+)
 
 
 class TestMatchingInImportFile(DataMappingBaseTestCase):
@@ -1012,6 +1018,68 @@ class TestMatchingHelperMethods(DataMappingBaseTestCase):
         self.assertEqual(pal.parent_state2, ps_2)
         self.assertEqual(pal.description, 'Automatic Merge')
 
+    def test_save_state_match_groups(self):
+        priorities = Column.retrieve_priorities(self.org.pk)
+
+        def make_states():
+            return [
+                self.property_state_factory.get_property_state(
+                    no_default_data=True, import_file_id=self.import_file.id, data_state=DATA_STATE_MAPPING,
+                    pm_property_id='1234', city=city, lot_number=lot_number, latitude=latitude,
+                    longitude=-105.2, extra_data=extra_data)
+                for city, lot_number, latitude, extra_data in [
+                    ('Philadelphia', '11', None, {'a': 1}),
+                    ('Arvada', None, 39.8, {'b': 2}),
+                    ('Golden', '12', None, {'a': 3}),
+                ]
+            ]
+
+        # merging a group at once is the same as merging the states one by one
+        expected_states = make_states()
+        expected = expected_states[0]
+        for state in expected_states[1:]:
+            expected = save_state_match(expected, state, priorities)
+
+        states = make_states()
+        merged_state, = save_state_match_groups([states], priorities)
+        merged_state.refresh_from_db()
+        self.assertEqual(merged_state.city, 'Golden')
+        self.assertEqual(merged_state.merge_state, MERGE_STATE_MERGED)
+        self.assertEqual(merged_state.import_file_id, self.import_file.id)
+        self.assertEqual(merged_state.extra_data, {'a': 3, 'b': 2})
+        self.assertEqual(sorted(merged_state.lot_number.split(';')), ['11', '12'])
+        self.assertEqual(merged_state.long_lat, expected.long_lat)
+        self.assertEqual(merged_state.hash_object, expected.hash_object)
+
+        # 2 steps, each with its own state and audit log
+        pal = PropertyAuditLog.objects.get(state=merged_state)
+        self.assertEqual(pal.name, 'System Match')
+        self.assertEqual(pal.parent_state2, states[2])
+        self.assertEqual(pal.parent1.parent_state1, states[0])
+        self.assertEqual(pal.parent1.parent_state2, states[1])
+
+        history, master = merged_state.history()
+        expected_history, _master = expected.history()
+        self.assertEqual(
+            [record['state_id'] for record in history],
+            [states[expected_states.index(record['state_data'])].id for record in expected_history]
+        )
+        self.assertEqual(len(history), 3)
+
+    def test_save_state_match_requires_audit_logs(self):
+        priorities = Column.retrieve_priorities(self.org.pk)
+        states = [self.property_state_factory.get_property_state() for _ in range(3)]
+        PropertyAuditLog.objects.filter(state=states[1]).delete()
+        state_count = PropertyState.objects.count()
+
+        # both ways of merging refuse a state without an audit log and save nothing
+        with self.assertRaisesRegexp(ValueError, str(states[1].id)):
+            save_state_match(states[0], states[1], priorities)
+        with self.assertRaisesRegexp(ValueError, str(states[1].id)):
+            save_state_match_groups([states], priorities)
+        self.assertEqual(PropertyState.objects.count(), state_count)
+        self.assertFalse(PropertyAuditLog.objects.filter(name='System Match').exists())
+
     def test_filter_duplicate_states(self):
         for i in range(10):
             self.property_state_factory.get_property_state(
@@ -1033,3 +1101,23 @@ class TestMatchingHelperMethods(DataMappingBaseTestCase):
         # There should be 6 uniq states. 5 from the second call, and one of 'The Same Address'
         self.assertEqual(len(uniq_state_ids), 6)
         self.assertEqual(dup_state_count, 9)
+
+    def test_states_by_matching_criteria(self):
+        ps_1 = self.property_state_factory.get_property_state(
+            no_default_data=True, pm_property_id='1234', address_line_1='1 Main St')
+        ps_2 = self.property_state_factory.get_property_state(
+            no_default_data=True, pm_property_id='1234', address_line_1='1 Main St')
+        ps_3 = self.property_state_factory.get_property_state(no_default_data=True, pm_property_id='5678')
+
+        column_names = sorted(matching_criteria_column_names(self.org.id, 'PropertyState'))
+        states = PropertyState.objects.filter(pk__in=[ps_1.id, ps_2.id, ps_3.id])
+        grouped = states_by_matching_criteria(states, column_names)
+
+        self.assertEqual(len(grouped), 2)
+        self.assertCountEqual(grouped[matching_criteria_key(ps_1, column_names)], [ps_1.id, ps_2.id])
+        self.assertEqual(grouped[matching_criteria_key(ps_3, column_names)], [ps_3.id])
+
+        # the groups are the same as filtering on the matching criteria of each state
+        for key, state_ids in grouped.items():
+            criteria = dict(zip(column_names, key))
+            self.assertCountEqual(states.filter(**criteria).values_list('id', flat=True), state_ids)
@@ -9,11 +9,69 @@ Utility methods pertaining to data import tasks (save, mapping, matching).
 """
 from collections import defaultdict
 
+from django.conf import settings
 from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
 
+DEFAULT_CHUNK_SIZE = 100
+CHUNK_SIZES = getattr(settings, 'SEED_CHUNK_SIZES', {})
+ADAPTIVE_CHUNK_SIZE = getattr(settings, 'SEED_ADAPTIVE_CHUNK_SIZE', False)
+CHUNK_TARGET_SECONDS = getattr(settings, 'SEED_CHUNK_TARGET_SECONDS', 30)
+MAX_CHUNK_SIZE = getattr(settings, 'SEED_MAX_CHUNK_SIZE', 5000)
+
+# weight of the most recent chunk in the moving average of the seconds per row
+CHUNK_TIMING_WEIGHT = 0.2
+
+
+def _chunk_timing_key(stage):
+    return 'SEED:{0}:CHUNK_TIMING'.format(stage)
+
+
+def get_chunk_size(stage):
+    """
+    Return the number of records to process per task for a stage of the import
+    (e.g. 'save_raw_data', 'map_data', 'check_data').
+
+    The size defaults to the stage's entry in SEED_CHUNK_SIZES. If SEED_ADAPTIVE_CHUNK_SIZE is
+    set, the size is grown from the measured seconds per row of previous chunks so that a task
+    takes about SEED_CHUNK_TARGET_SECONDS, but never beyond SEED_MAX_CHUNK_SIZE.
+
+    :param stage: str, name of the stage
+    :return: int, chunk size
+    """
+    chunk_size = CHUNK_SIZES.get(stage, DEFAULT_CHUNK_SIZE)
+
+    if ADAPTIVE_CHUNK_SIZE:
+        seconds_per_row = cache.get(_chunk_timing_key(stage))
+        if seconds_per_row:
+            target_size = int(CHUNK_TARGET_SECONDS / seconds_per_row)
+            chunk_size = max(chunk_size, min(target_size, MAX_CHUNK_SIZE))
+
+    return chunk_size
+
+
+def record_chunk_duration(stage, num_rows, seconds):
+    """
+    Record how long a task took to process a chunk so that the adaptive chunk size can be
+    calculated. The timing is stored as a moving average of the seconds per row in the cache.
+
+    :param stage: str, name of the stage
+    :param num_rows: int, number of rows in the chunk
+    :param seconds: float, duration of the task
+    """
+    if not ADAPTIVE_CHUNK_SIZE or not num_rows:
+        return
+
+    seconds_per_row = seconds / num_rows
+    previous = cache.get(_chunk_timing_key(stage))
+    if previous:
+        seconds_per_row = CHUNK_TIMING_WEIGHT * seconds_per_row + (1 - CHUNK_TIMING_WEIGHT) * previous
+
+    cache.set(_chunk_timing_key(stage), seconds_per_row, None)
+
+
 def get_core_pk_column(table_column_mappings, primary_field):
     for tcm in table_column_mappings:
         if tcm.destination_field == primary_field:
@@ -1180,6 +1180,7 @@ class ImportFileViewSet(viewsets.ViewSet):
         return {
             'status': 'success',
             'import_file_records': import_file.matching_results_data.get('import_file_records', None),
+            'chunk_sizes': import_file.matching_results_data.get('chunk_sizes', {}),
             'properties': {
                 'initial_incoming': import_file.matching_results_data.get('property_initial_incoming', None),
                 'duplicates_against_existing': import_file.matching_results_data.get('property_duplicates_against_existing', None),
@@ -7,6 +7,7 @@
 import re
 import string
 from datetime import datetime, date
+from functools import lru_cache
 
 import dateutil
 import dateutil.parser
@@ -30,15 +31,26 @@ BOOL_SYNONYMS = (
     ('_', 'y'),
     ('_', '1'),
 )
+# Number of distinct values whose NONE_SYNONYMS check is remembered by each Cleaner
+NONE_SYNONYM_CACHE_SIZE = 4096
 PUNCT_REGEX = re.compile('[{0}]'.format(
     re.escape(string.punctuation.replace('.', '').replace('-', '')))
 )
 
 
+def is_none_synonym(value):
+    """Return True if the string value is fuzzy matched to one of the NONE_SYNONYMS."""
+    return fuzzy_in_set(value.lower(), NONE_SYNONYMS)
+
+
 def default_cleaner(value, *args):
     """Pass-through validation for strings we don't know about."""
+    return _default_cleaner(value, is_none_synonym)
+
+
+def _default_cleaner(value, none_synonym_check):
     if isinstance(value, basestring):
-        if fuzzy_in_set(value.lower(), NONE_SYNONYMS):
+        if none_synonym_check(value):
             return None
         # guard against `''` coming in from an Excel empty cell
         if value == '':
@@ -177,6 +189,18 @@ def geometry_cleaner(value):
             return None
 
 
+# Cleaner to use for each of the column types in the ontology. Quantity columns are handled
+# separately by the pint_column_map of the Cleaner.
+TYPE_CLEANERS = {
+    'float': float_cleaner,
+    'datetime': date_time_cleaner,
+    'date': date_cleaner,
+    'string': str,
+    'integer': int_cleaner,
+    'geometry': geometry_cleaner,
+}
+
+
 class Cleaner(object):
     """Cleans values for a given ontology."""
 
@@ -184,25 +208,16 @@ class Cleaner(object):
 
         self.ontology = ontology
         self.schema = self.ontology.get('types', {})
-        self.float_columns = list(filter(
-            lambda x: self.schema[x] == 'float', self.schema
-        ))
-        self.date_columns = list(filter(
-            lambda x: self.schema[x] == 'date', self.schema
-        ))
-        self.date_time_columns = list(filter(
-            lambda x: self.schema[x] == 'datetime', self.schema
-        ))
-        self.string_columns = list(filter(
-            lambda x: self.schema[x] == 'string', self.schema
-        ))
-        self.int_columns = list(filter(
-            lambda x: self.schema[x] == 'integer', self.schema
-        ))
-        self.geometry_columns = list(filter(
-            lambda x: self.schema[x] == 'geometry', self.schema
-        ))
+        # map each column name to the cleaner of its type so that a value is cleaned with a
+        # single dict lookup
+        self.column_cleaners = {}
+        for column_name, column_type in self.schema.items():
+            if isinstance(column_type, basestring) and column_type in TYPE_CLEANERS:
+                self.column_cleaners[column_name] = TYPE_CLEANERS[column_type]
         self.pint_column_map = self._build_pint_column_map()
+        # Imported files repeat the same strings over and over, so remember the result of the
+        # fuzzy NONE_SYNONYMS check for the values this cleaner has already seen.
+        self.is_none_synonym = lru_cache(maxsize=NONE_SYNONYM_CACHE_SIZE)(is_none_synonym)
 
     def _build_pint_column_map(self):
         """
@@ -230,25 +245,11 @@ class Cleaner(object):
 
     def clean_value(self, value, column_name, is_extra_data=True):
         """Clean the value, based on characteristics of its column_name."""
-        value = default_cleaner(value)
+        value = _default_cleaner(value, self.is_none_synonym)
         if value is not None:
-            if column_name in self.float_columns:
-                return float_cleaner(value)
-
-            if column_name in self.date_time_columns:
-                return date_time_cleaner(value)
-
-            if column_name in self.date_columns:
-                return date_cleaner(value)
-
-            if column_name in self.string_columns:
-                return str(value)
-
-            if column_name in self.int_columns:
-                return int_cleaner(value)
-
-            if column_name in self.geometry_columns:
-                return geometry_cleaner(value)
+            column_cleaner = self.column_cleaners.get(column_name)
+            if column_cleaner is not None:
+                return column_cleaner(value)
 
             if not is_extra_data:
                 # If the object is not extra data, then check if the data are in the
@@ -258,3 +259,17 @@ class Cleaner(object):
                     return pint_cleaner(value, units)
 
         return value
+
+    def clean_row(self, row, is_extra_data=True):
+        """
+        Clean all of the values of a row, based on the characteristics of their column names.
+
+        :param row: dict, {column_name: value}
+        :param is_extra_data: bool, are the columns extra_data
+        :return: dict, {column_name: cleaned value}
+        """
+        clean_value = self.clean_value
+        return {
+            column_name: clean_value(value, column_name, is_extra_data)
+            for column_name, value in row.items()
+        }
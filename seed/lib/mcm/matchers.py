@@ -9,6 +9,31 @@ from functools import cmp_to_key
 
 import jellyfish
 
+# Jaro-Winkler boosts the Jaro similarity by up to 4 matching prefix characters with a scaling
+# factor of 0.1, so the final similarity is at most 0.6 + 0.4 * jaro.
+MAX_PREFIX_BOOST = 4 * 0.1
+
+
+def _normalize(value):
+    """Normalize a string the same way for every comparison done by best_match"""
+    return str(value.encode('ascii', 'replace').lower())
+
+
+def max_jaro_winkler(len_a, len_b):
+    """
+    Return the highest Jaro-Winkler similarity that two strings of the given lengths can
+    reach. The Jaro similarity can not exceed (2 + shorter / longer) / 3 because at most the
+    length of the shorter string can match.
+
+    :param len_a: int, length of the first string
+    :param len_b: int, length of the second string
+    :return: float
+    """
+    if not len_a or not len_b:
+        return 0.0
+    jaro = (2.0 + float(min(len_a, len_b)) / max(len_a, len_b)) / 3.0
+    return jaro + MAX_PREFIX_BOOST * (1.0 - jaro)
+
 
 def sort_scores(a, b):
     """
@@ -72,10 +97,7 @@ def best_match(s, categories, top_n=5):
             (
                 table_name,
                 category,
-                jellyfish.jaro_winkler(
-                    str(s.encode('ascii', 'replace').lower()),
-                    str(category.encode('ascii', 'replace').lower())
-                )
+                jellyfish.jaro_winkler(_normalize(s), _normalize(category))
             )
         )
 
@@ -94,7 +116,25 @@ def best_match(s, categories, top_n=5):
 
 
 def fuzzy_in_set(column_name, ontology, percent_confidence=95):
-    """Return True if column_name is in the ontology."""
-    table, match, percent = best_match(column_name, ontology, top_n=1)[0]
+    """
+    Return True if column_name is in the ontology.
+
+    This returns the same result as checking the top score of best_match, but exact matches
+    return right away and categories whose length is too different to reach the
+    percent_confidence are not scored.
+    """
+    value = _normalize(column_name)
+    for cat in ontology:
+        category = _normalize(cat[1] if isinstance(cat, tuple) else cat)
+        if value == category:
+            if percent_confidence < 100:
+                return True
+            continue
+
+        if max_jaro_winkler(len(value), len(category)) * 100 <= percent_confidence:
+            continue
+
+        if int(jellyfish.jaro_winkler(value, category) * 100) > percent_confidence:
+            return True
 
-    return percent > percent_confidence
+    return False
@@ -17,7 +17,7 @@ import re
 import xmltodict
 
 from builtins import str
-from csv import DictReader, Sniffer
+from csv import DictReader, Sniffer, reader as csv_reader
 
 from past.builtins import basestring
 from seed.data_importer.utils import kbtu_thermal_conversion_factors
@@ -341,12 +341,13 @@ class ExcelParser(object):
 
         return item.value
 
-    def XLSDictReader(self, sheet, header_row=0):
+    def XLSDictReader(self, sheet, header_row=0, skip_rows=0):
         """returns a generator yeilding a dict per row from the XLS/XLSX file
         https://gist.github.com/mdellavo/639082
 
         :param sheet: xlrd Sheet
         :param header_row: the row index to start with
+        :param skip_rows: number of data rows after the header row to skip
         :returns: Generator yeilding a row as Dict
         """
 
@@ -369,7 +370,7 @@ class ExcelParser(object):
         # ExcelReader for csv files
         return (
             dict(item(i, j) for j in range(sheet.ncols))
-            for i in range(header_row + 1, sheet.nrows)
+            for i in range(header_row + 1 + skip_rows, sheet.nrows)
         )
 
     def seek_to_beginning(self):
@@ -381,6 +382,18 @@ class ExcelParser(object):
         self.excel_file.seek(0)
         self.excelreader = self.XLSDictReader(self.sheet, self.header_row)
 
+    def positioned_rows(self):
+        """returns a generator yielding (position, row) tuples for each data row of the sheet
+
+        The position is the index of the data row and can be passed to ``rows_from_position``.
+        """
+        for position, row in enumerate(self.XLSDictReader(self.sheet, self.header_row)):
+            yield position, row
+
+    def rows_from_position(self, position):
+        """returns a generator yielding a dict per row, starting at the given data row index"""
+        return self.XLSDictReader(self.sheet, self.header_row, skip_rows=position)
+
     def num_columns(self):
         """gets the number of columns for the file"""
         return self.sheet.ncols
@@ -447,6 +460,37 @@ class CSVParser(object):
         # skip header row
         self.csvfile.__next__()
 
+    def _line_reader(self):
+        """
+        returns a DictReader that pulls the file one line at a time with readline so that the
+        position of the file can still be read with ``tell`` between rows.
+        """
+        return DictReader(iter(self.csvfile.readline, ''), fieldnames=self.csvreader.fieldnames)
+
+    def positioned_rows(self):
+        """returns a generator yielding (position, row) tuples for each data row of the file
+
+        The position is the file position of the start of the row and can be passed to
+        ``rows_from_position``. Rows with quoted line breaks are handled by the csv module.
+        """
+        self.csvfile.seek(0)
+        # skip header row, which may span more than one line
+        next(csv_reader(iter(self.csvfile.readline, '')))
+
+        line_reader = self._line_reader()
+        while True:
+            position = self.csvfile.tell()
+            try:
+                row = next(line_reader)
+            except StopIteration:
+                return
+            yield position, row
+
+    def rows_from_position(self, position):
+        """returns a generator yielding a dict per row, starting at the given file position"""
+        self.csvfile.seek(position)
+        return self._line_reader()
+
     def num_columns(self):
         """gets the number of columns for the file"""
         return len(self.csvreader.fieldnames)
@@ -518,6 +562,17 @@ class MCMParser(object):
 
         return self.reader.seek_to_beginning()
 
+    def positioned_rows(self):
+        """
+        Generator of (position, row) tuples for the rows of the file. The position can be stored
+        and handed to ``rows_from_position`` to read the file again starting at that row.
+        """
+        return self.reader.positioned_rows()
+
+    def rows_from_position(self, position):
+        """returns a generator of the rows of the file starting at the position"""
+        return self.reader.rows_from_position(position)
+
     def num_columns(self):
         """returns the number of columns of the file"""
         return self.reader.num_columns()
@@ -0,0 +1,93 @@
+# !/usr/bin/env python
+# encoding: utf-8
+"""
+:copyright (c) 2014 - 2020, The Regents of the University of California, through Lawrence Berkeley National Laboratory (subject to receipt of any required approvals from the U.S. Department of Energy) and contributors. All rights reserved.  # NOQA
+:author
+"""
+from django.test import TestCase
+
+from seed.lib.mcm import cleaners, matchers
+
+
+class FuzzyInSetTest(TestCase):
+    def test_fuzzy_in_set_matches_best_match(self):
+        values = [
+            'not available', 'Not Available', 'not availabl', 'n/a', 'N/A', 'na', 'n.a.',
+            'not applicable', 'not applicable!', 'nothing', '', 'a', '123 main st', 'true',
+            'yes', 'y', 'yess', '1', "it's", 'café',
+        ]
+        for synonyms in [cleaners.NONE_SYNONYMS, cleaners.BOOL_SYNONYMS]:
+            for value in values:
+                for percent in [50, 80, 95, 100]:
+                    expected = matchers.best_match(value.lower(), synonyms, top_n=1)[0][2] > percent
+                    self.assertEqual(
+                        matchers.fuzzy_in_set(value.lower(), synonyms, percent),
+                        expected,
+                        '{} with {}% confidence'.format(value, percent)
+                    )
+
+    def test_max_jaro_winkler(self):
+        self.assertEqual(matchers.max_jaro_winkler(0, 5), 0.0)
+        self.assertAlmostEqual(matchers.max_jaro_winkler(5, 5), 1.0)
+        self.assertLess(matchers.max_jaro_winkler(4, 16), 0.95)
+
+
+class CleanerTest(TestCase):
+    def test_none_synonyms_are_cached(self):
+        cleaner = cleaners.Cleaner({'types': {}})
+        for _ in range(3):
+            self.assertIsNone(cleaner.clean_value('Not Available', 'site_eui'))
+            self.assertEqual(cleaner.clean_value('Office', 'use'), 'Office')
+
+        info = cleaner.is_none_synonym.cache_info()
+        self.assertEqual(info.misses, 2)
+        self.assertEqual(info.hits, 4)
+
+        # each cleaner keeps its own cache
+        self.assertEqual(cleaners.Cleaner({}).is_none_synonym.cache_info().currsize, 0)
+        self.assertIsNone(cleaners.default_cleaner('n/a'))
+
+    def test_clean_row(self):
+        cleaner = cleaners.Cleaner({
+            'types': {
+                'site_eui': 'float',
+                'year_built': 'integer',
+                'custom_id_1': 'string',
+                'gross_floor_area': ('quantity', 'ft**2'),
+            }
+        })
+        row = {
+            'site_eui': '1,123.45',
+            'year_built': '1990',
+            'custom_id_1': 12,
+            'gross_floor_area': '100',
+            'use': 'n/a',
+        }
+        self.assertEqual(
+            cleaner.clean_row(row),
+            {'site_eui': 1123.45, 'year_built': 1990, 'custom_id_1': '12', 'gross_floor_area': '100',
+             'use': None}
+        )
+        cleaned = cleaner.clean_row(row, is_extra_data=False)
+        self.assertEqual(cleaned['gross_floor_area'], cleaners.pint_cleaner('100', 'ft**2'))
+
+
+class CleanerManyColumnsTest(TestCase):
+    """Clean a row of a large ontology, see the benchmark_cleaner command for the timings"""
+
+    def setUp(self):
+        types = {}
+        for column_type in ['float', 'integer', 'string', 'date', 'datetime']:
+            for i in range(40):
+                types['{}_column_{}'.format(column_type, i)] = column_type
+        self.cleaner = cleaners.Cleaner({'types': types})
+        self.row = {
+            name: '1' for name, column_type in types.items()
+            if column_type in ('float', 'integer', 'string')
+        }
+
+    def test_clean_row_with_many_columns(self):
+        cleaned = self.cleaner.clean_row(self.row)
+        self.assertEqual(cleaned['float_column_0'], 1.0)
+        self.assertEqual(cleaned['integer_column_39'], 1)
+        self.assertEqual(cleaned['string_column_20'], '1')
@@ -0,0 +1,36 @@
+# !/usr/bin/env python
+# encoding: utf-8
+
+import os
+from itertools import islice
+
+from django.test import TestCase
+
+from seed.lib.mcm.reader import MCMParser
+
+
+class MCMParserPositionTest(TestCase):
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_data')
+
+    def _open(self, filename):
+        f = open(os.path.join(self.test_data_dir, filename), 'r')
+        self.addCleanup(f.close)
+        return f
+
+    def _assert_rows_from_position(self, filename):
+        all_rows = list(MCMParser(self._open(filename)).data)
+        positioned_rows = list(MCMParser(self._open(filename)).positioned_rows())
+
+        self.assertEqual([row for _position, row in positioned_rows], all_rows)
+
+        for index in [0, 1, len(positioned_rows) - 1]:
+            parser = MCMParser(self._open(filename))
+            rows = list(islice(parser.rows_from_position(positioned_rows[index][0]), 2))
+            self.assertEqual(rows, all_rows[index:index + 2])
+
+    def test_csv_rows_from_position(self):
+        self._assert_rows_from_position('test_espm.csv')
+
+    def test_xlsx_rows_from_position(self):
+        self._assert_rows_from_position('test_espm.xlsx')
@@ -121,24 +121,59 @@ def merge_state(merged_state, state1, state2, priorities, ignore_merge_protectio
     :param priorities: dict, column names with favor new or existing
     :return: inst(``merged_state``), updated.
     """
-    # Calculate the difference between the two states and save into a dictionary
-    can_attrs = get_state_attrs([state1, state2])
+    merge_state_attributes(merged_state, state1, state2, priorities,
+                           ignore_merge_protection=ignore_merge_protection)
+
+    # merge measures, scenarios, simulations
+    if isinstance(merged_state, PropertyState):
+        PropertyState.merge_relationships(merged_state, state1, state2)
+
+    return merged_state
+
+
+def merge_state_attributes(merged_state, state1, state2, priorities, state_to_state=None,
+                           ignore_merge_protection=False):
+    """
+    Set the attributes and the extra data of the merged state from the two states, without merging
+    the relationships. None of the states need to be saved, so a group of states can be merged in
+    memory.
+
+    :param merged_state: PropertyState/TaxLotState model inst.
+    :param state1: PropertyState/TaxLotState model inst. Left parent.
+    :param state2: PropertyState/TaxLotState model inst. Right parent.
+    :param priorities: dict, column names with favor new or existing
+    :param state_to_state: tuple, the result of get_state_to_state_tuple for the class of the
+                           states, looked up if None
+    :return: inst(``merged_state``), updated.
+    """
+    if state_to_state is None:
+        if isinstance(state1, PropertyState):
+            state_to_state = get_state_to_state_tuple('PropertyState')
+        elif isinstance(state1, TaxLotState):
+            state_to_state = get_state_to_state_tuple('TaxLotState')
+        else:
+            state_to_state = ()
+
+    for data_set_attr, can_attr in state_to_state:
+        # see get_attrs_with_mapping for the import_file
+        if can_attr == 'import_file':
+            can_attr = 'import_file_id'
+            values = state1.import_file_id, state2.import_file_id
+        else:
+            values = getattr(state1, data_set_attr), getattr(state2, data_set_attr)
 
-    default = state2
-    for attr in can_attrs:
         # Do we have any differences between these fields? - Check if not None instead of if value.
-        attr_values = [value for value in list(can_attrs[attr].values()) if value is not None]
-        attr_values = [v for v in attr_values if v is not None]
+        attr_values = [value for value in values if value is not None]
 
         attr_value = None
         # Two, differing values are set.
         if len(attr_values) > 1:
             # If we have more than one value for this field, choose based on the column priority
-            col_prior = priorities.get(attr, 'Favor New')
+            col_prior = priorities.get(can_attr, 'Favor New')
             if ignore_merge_protection or col_prior == 'Favor New':
-                attr_value = can_attrs[attr][state2]
+                attr_value = values[1]
             else:  # favor the existing field
-                attr_value = can_attrs[attr][state1]
+                attr_value = values[0]
 
         # No values are set
         elif len(attr_values) < 1:
@@ -148,11 +183,7 @@ def merge_state(merged_state, state1, state2, priorities, ignore_merge_protectio
         else:
             attr_value = attr_values.pop()
 
-        if callable(attr):
-            # This callable will be responsible for setting the attribute value, not just returning it.
-            attr(merged_state, default)
-        else:
-            setattr(merged_state, attr, attr_value)
+        setattr(merged_state, can_attr, attr_value)
 
     merged_state.extra_data = _merge_extra_data(
         state1.extra_data,
@@ -161,8 +192,4 @@ def merge_state(merged_state, state1, state2, priorities, ignore_merge_protectio
         ignore_merge_protection
     )
 
-    # merge measures, scenarios, simulations
-    if isinstance(merged_state, PropertyState):
-        PropertyState.merge_relationships(merged_state, state1, state2)
-
     return merged_state
@@ -0,0 +1,142 @@
+# !/usr/bin/env python
+# encoding: utf-8
+"""
+:copyright (c) 2014 - 2020, The Regents of the University of California, through Lawrence Berkeley National Laboratory (subject to receipt of any required approvals from the U.S. Department of Energy) and contributors. All rights reserved.  # NOQA
+:author
+"""
+import logging
+import pickle
+
+from django.conf import settings
+
+from seed.utils.cache import delete_cache, get_cache_raw, get_redis_client, set_cache
+
+_log = logging.getLogger(__name__)
+
+
+class CacheProgressBackend(object):
+    """
+    Store the progress data as a single pickled dictionary in the Django cache. Every step reads
+    the dictionary, updates it and writes it back.
+    """
+
+    def get(self, key):
+        """
+        Return the progress data
+
+        :param key: str, progress key
+        :return: dict or None if the key does not exist
+        """
+        return get_cache_raw(key)
+
+    def set(self, key, data):
+        """
+        Replace the progress data
+
+        :param key: str, progress key
+        :param data: dict, progress data
+        """
+        set_cache(key, data['status'], data)
+
+    def delete(self, key):
+        delete_cache(key)
+
+    def step(self, key, increment, updates):
+        """
+        Increment the progress and update the other fields of the progress data
+
+        :param key: str, progress key
+        :param increment: float, value to add to the progress
+        :param updates: dict, fields to set
+        :return: dict, the updated progress data
+        """
+        data = self.get(key) or {'status': 'parsing', 'progress': 0.0}
+        data['progress'] = min(data['progress'] + increment, 100.0)
+        data.update(updates)
+        self.set(key, data)
+        return data
+
+
+class RedisHashProgressBackend(object):
+    """
+    Store the progress data in a Redis hash with one field per item of the progress data. The
+    progress is advanced with HINCRBYFLOAT so that concurrent tasks do not lose steps, and a step
+    is written and read back in a single round trip.
+
+    The hash expires after SEED_PROGRESS_TIMEOUT seconds, counted from the last time it was
+    written or read, so that polling the progress keeps it alive during a long step.
+    """
+
+    # field that holds the progress as a plain number so that it can be incremented
+    PROGRESS_FIELD = 'progress'
+
+    def __init__(self, client, timeout):
+        self.client = client
+        self.timeout = timeout
+
+    def _encode(self, data):
+        return {
+            field: value if field == self.PROGRESS_FIELD else pickle.dumps(value)
+            for field, value in data.items()
+        }
+
+    def _decode(self, values):
+        if not values:
+            return None
+
+        data = {}
+        for field, value in values.items():
+            field = field.decode('utf-8')
+            if field == self.PROGRESS_FIELD:
+                # the progress is capped when read because concurrent steps may pass 100
+                data[field] = min(float(value), 100.0)
+            else:
+                data[field] = pickle.loads(value)
+        return data
+
+    def get(self, key):
+        pipe = self.client.pipeline()
+        pipe.hgetall(key)
+        if self.timeout is not None:
+            pipe.expire(key, self.timeout)
+        return self._decode(pipe.execute()[0])
+
+    def set(self, key, data):
+        pipe = self.client.pipeline()
+        pipe.delete(key)
+        pipe.hmset(key, self._encode(data))
+        if self.timeout is not None:
+            pipe.expire(key, self.timeout)
+        pipe.execute()
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def step(self, key, increment, updates):
+        pipe = self.client.pipeline()
+        pipe.hincrbyfloat(key, self.PROGRESS_FIELD, increment)
+        if updates:
+            pipe.hmset(key, self._encode(updates))
+        if self.timeout is not None:
+            pipe.expire(key, self.timeout)
+        pipe.hgetall(key)
+        return self._decode(pipe.execute()[-1])
+
+
+def get_progress_backend():
+    """
+    Return the backend for the progress data that is configured by SEED_PROGRESS_BACKEND. The
+    Redis hash backend requires the cache to be backed by Redis, otherwise the progress data are
+    stored in the cache. The Redis hashes expire after SEED_PROGRESS_TIMEOUT seconds instead of the
+    timeout of the cache, which is too short for the longest steps of some tasks.
+
+    :return: CacheProgressBackend or RedisHashProgressBackend
+    """
+    backend = getattr(settings, 'SEED_PROGRESS_BACKEND', 'cache')
+    if backend == 'redis_hash':
+        client = get_redis_client()
+        if client is not None:
+            return RedisHashProgressBackend(client, getattr(settings, 'SEED_PROGRESS_TIMEOUT', 86400))
+        _log.warning('SEED_PROGRESS_BACKEND is redis_hash but the cache is not Redis, using the cache')
+
+    return CacheProgressBackend()
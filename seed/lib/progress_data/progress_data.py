@@ -7,7 +7,7 @@
 import logging
 
 from seed.decorators import get_prog_key
-from seed.utils.cache import get_cache, set_cache, delete_cache
+from seed.lib.progress_data.backends import get_progress_backend
 
 _log = logging.getLogger(__name__)
 
@@ -20,15 +20,21 @@ class ProgressData(object):
         self.key = get_prog_key(func_name, unique_id)
         self.total = None
         self.increment_by = None
+        self.backend = get_progress_backend()
 
-        # Load in the initialized data, some of this may be overloaded based
-        # on the contents in the cache
-        self.initialize(init_data)
+        if init_data:
+            # the data were just read from the cache (see from_key), so there is no need to
+            # write them back or read them again
+            self.initialize(init_data, save=False)
+        else:
+            # Load in the initialized data, some of this may be overloaded based
+            # on the contents in the cache
+            self.initialize(init_data)
 
-        # read the data from the cache, if there is any
-        self.load()
+            # read the data from the cache, if there is any
+            self.load()
 
-    def initialize(self, init_data=None):
+    def initialize(self, init_data=None, save=True):
         if init_data:
             self.data = init_data
         else:
@@ -52,7 +58,9 @@ class ProgressData(object):
         if 'total' in self.data:
             self.total = self.data['total']
 
-        return self.save()
+        if save:
+            return self.save()
+        return self.data
 
     def delete(self):
         """
@@ -60,7 +68,7 @@ class ProgressData(object):
 
         :return: dict, re-initialized data
         """
-        delete_cache(self.key)
+        self.backend.delete(self.key)
 
         return self.initialize()
 
@@ -99,7 +107,7 @@ class ProgressData(object):
 
     @classmethod
     def from_key(cls, key):
-        data = get_cache(key)
+        data = get_progress_backend().get(key) or {}
         if 'func_name' in data and 'unique_id' in data:
             return cls(func_name=data['func_name'], unique_id=data['unique_id'], init_data=data)
         else:
@@ -110,15 +118,15 @@ class ProgressData(object):
         # save some member variables
         self.data['total'] = self.total
 
-        set_cache(self.key, self.data['status'], self.data)
+        self.backend.set(self.key, self.data)
 
-        return get_cache(self.key)
+        return self.result()
 
     def load(self):
         """Read in the data from the cache"""
 
         # Merge the existing data with items from the cache, favor cache items
-        self.data = dict(list(self.data.items()) + list(get_cache(self.key).items()))
+        self.data = dict(list(self.data.items()) + list(self.result().items()))
 
         # set some member variables
         if self.data['progress_key']:
@@ -128,27 +136,24 @@ class ProgressData(object):
             self.total = self.data['total']
 
     def step(self, status_message=None, new_summary=None):
-        """Step the function by increment_value and save back to the cache"""
-        # load the latest value out of the cache
-        self.load()
-
-        value = self.data['progress']
-        if value + self.increment_value() >= 100.0:
-            value = 100.0
-        else:
-            value += self.increment_value()
+        """
+        Step the function by increment_value and save back to the cache. The progress is
+        incremented by the backend so that steps of concurrent tasks are not lost.
+        """
+        updates = {'status': 'parsing'}
+        if self.total is not None:
+            updates['total'] = self.total
 
-        self.data['progress'] = value
-        self.data['status'] = 'parsing'
         if status_message is not None:
-            self.data['status_message'] = status_message
+            updates['status_message'] = status_message
 
         if new_summary is not None:
-            self.data['summary'] = new_summary
+            updates['summary'] = new_summary
 
-        self.save()
+        result = self.backend.step(self.key, self.increment_value(), updates)
+        self.data.update(result)
 
-        return self.result()
+        return result
 
     def result(self):
         """
@@ -156,7 +161,11 @@ class ProgressData(object):
 
         :return: dict
         """
-        return get_cache(self.key)
+        data = self.backend.get(self.key)
+        if data is None:
+            # Cache accessed before it was created
+            data = {'status': 'parsing', 'progress': 0.0}
+        return data
 
     def increment_value(self):
         """
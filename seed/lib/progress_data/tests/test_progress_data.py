@@ -9,6 +9,7 @@ import logging
 from django.test import TestCase
 
 from seed.lib.progress_data.progress_data import ProgressData
+from seed.utils.cache import get_redis_client
 
 logger = logging.getLogger(__name__)
 
@@ -94,3 +95,56 @@ class TestProgressData(TestCase):
 
         pd.step(new_summary=4815162342)
         self.assertEqual(pd.summary(), 4815162342)
+
+    def test_steps_from_multiple_tasks(self):
+        pd = ProgressData(func_name='test_func_7', unique_id='chunks')
+        pd.total = 4
+        pd.save()
+
+        # each chunk task steps its own instance of the progress data
+        tasks = [ProgressData.from_key(pd.key) for _ in range(4)]
+        for task in tasks:
+            task.step('Stepping')
+
+        self.assertEqual(pd.result()['progress'], 100)
+        self.assertEqual(pd.result()['status'], 'parsing')
+
+        # steps past the total do not go over 100
+        tasks[0].step()
+        self.assertEqual(pd.result()['progress'], 100)
+
+    def test_progress_backends(self):
+        for backend in ['cache', 'redis_hash']:
+            with self.settings(SEED_PROGRESS_BACKEND=backend):
+                pd = ProgressData(func_name='test_func_8', unique_id=backend)
+                pd.total = 2
+                pd.save()
+                result = pd.step('Halfway', new_summary={'rows': 1})
+                self.assertEqual(result['progress'], 50)
+                self.assertEqual(result['summary'], {'rows': 1})
+                self.assertEqual(pd.result(), result)
+
+                pd.finish_with_success('Done')
+                self.assertEqual(pd.result()['progress'], 100)
+                self.assertEqual(pd.result()['message'], 'Done')
+                self.assertEqual(pd.result()['total'], 2)
+
+    def test_redis_hash_timeout_is_refreshed_on_read(self):
+        client = get_redis_client()
+        if client is None:
+            self.skipTest('The cache is not backed by Redis')
+
+        with self.settings(SEED_PROGRESS_BACKEND='redis_hash', SEED_PROGRESS_TIMEOUT=3600):
+            pd = ProgressData(func_name='test_func_9', unique_id='timeout')
+            pd.total = 2
+            pd.save()
+            self.assertGreater(client.ttl(pd.key), 300)
+
+            # polling the progress during a long step keeps the progress data alive
+            client.expire(pd.key, 5)
+            self.assertEqual(ProgressData.from_key(pd.key).result()['status'], 'not-started')
+            self.assertGreater(client.ttl(pd.key), 5)
+
+            result = pd.step('Halfway')
+            self.assertEqual(result['func_name'], 'test_func_9')
+            self.assertEqual(result['progress'], 50)
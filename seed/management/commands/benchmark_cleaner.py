@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+:copyright (c) 2014 - 2020, The Regents of the University of California, through Lawrence Berkeley National Laboratory (subject to receipt of any required approvals from the U.S. Department of Energy) and contributors. All rights reserved.  # NOQA
+:author
+
+Times the column type lookup of the Cleaner with a large ontology, e.g.
+
+    ./manage.py benchmark_cleaner --columns 100
+
+The dispatch dict of Cleaner.column_cleaners is compared with a scan of the lists of columns of
+each type, which is how the columns were looked up before the dispatch dict.
+"""
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from seed.lib.mcm import cleaners
+
+COLUMN_TYPES = ['float', 'integer', 'string', 'date', 'datetime']
+
+
+class Command(BaseCommand):
+    help = 'Times the column type lookup and clean_row of the Cleaner'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--columns', type=int, default=40, help='Number of columns of each type')
+        parser.add_argument('--number', type=int, default=50, help='Number of rows per run')
+        parser.add_argument('--runs', type=int, default=3, help='Number of runs, the fastest is reported')
+
+    def handle(self, *args, **options):
+        types = {}
+        for column_type in COLUMN_TYPES:
+            for i in range(options['columns']):
+                types['{}_column_{}'.format(column_type, i)] = column_type
+        cleaner = cleaners.Cleaner({'types': types})
+        row = {
+            name: '1' for name, column_type in types.items()
+            if column_type in ('float', 'integer', 'string')
+        }
+
+        columns = {}
+        for name, column_type in types.items():
+            columns.setdefault(column_type, []).append(name)
+
+        def scan_lookup():
+            for name in row:
+                for column_type in ['float', 'datetime', 'date', 'string', 'integer', 'geometry']:
+                    if name in columns.get(column_type, []):
+                        break
+
+        def dispatch_lookup():
+            for name in row:
+                cleaner.column_cleaners.get(name)
+
+        for label, func in [
+            ('scan lookup', scan_lookup),
+            ('dispatch lookup', dispatch_lookup),
+            ('clean_row', lambda: cleaner.clean_row(row)),
+        ]:
+            seconds = min(timeit.repeat(func, number=options['number'], repeat=options['runs']))
+            self.stdout.write('%s of %s columns: %.3f ms per row' % (
+                label, len(row), seconds * 1000 / options['number']))
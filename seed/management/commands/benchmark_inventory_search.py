@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+:copyright (c) 2014 - 2020, The Regents of the University of California, through Lawrence Berkeley National Laboratory (subject to receipt of any required approvals from the U.S. Department of Energy) and contributors. All rights reserved.  # NOQA
+:author
+
+Times the inventory search on generated property views, e.g.
+
+    ./manage.py benchmark_inventory_search --views 1000000
+
+The views are generated in a new organization, which is deleted afterwards unless --keep is given.
+"""
+import statistics
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils.timezone import make_aware
+
+from seed.lib.superperms.orgs.models import Organization
+from seed.models import (
+    Cycle,
+    DATA_STATE_MATCHING,
+    Property,
+    PropertyState,
+    PropertyView,
+)
+from seed.search import search_inventory
+
+STREETS = ['Main', 'Elm', 'Oak', 'Pine', 'Maple', 'Cedar', 'Lake', 'Hill', 'Park', 'River']
+
+BATCH_SIZE = 10000
+
+
+class Command(BaseCommand):
+    help = 'Times search_inventory on generated property views'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--views', type=int, default=100000, help='Number of views to generate')
+        parser.add_argument('--query', nargs='+', default=['12345 Oak', 'maple st', '99999'],
+                            help='Searches to time')
+        parser.add_argument('--runs', type=int, default=10, help='Number of runs of each search')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated organization')
+
+    def _generate(self, org, cycle, count):
+        for start in range(0, count, BATCH_SIZE):
+            size = min(BATCH_SIZE, count - start)
+            states = PropertyState.objects.bulk_create([
+                PropertyState(
+                    organization=org,
+                    data_state=DATA_STATE_MATCHING,
+                    address_line_1='{} {} St'.format(start + i, STREETS[(start + i) % len(STREETS)]),
+                    pm_property_id=str(start + i),
+                    extra_data={},
+                ) for i in range(size)
+            ])
+            properties = Property.objects.bulk_create([Property(organization=org) for _ in range(size)])
+            PropertyView.objects.bulk_create([
+                PropertyView(property=prprty, cycle=cycle, state=state)
+                for prprty, state in zip(properties, states)
+            ])
+            self.stdout.write('  generated %s views' % (start + size))
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE seed_propertystate')
+            cursor.execute('ANALYZE seed_propertyview')
+
+    def _delete(self, org, cycle):
+        # the generated rows are deleted in SQL, collecting them in the ORM would take longer than
+        # the benchmark
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM seed_propertyview WHERE cycle_id = %s', [cycle.id])
+            cursor.execute('DELETE FROM seed_propertystate WHERE organization_id = %s', [org.id])
+            cursor.execute('DELETE FROM seed_property WHERE organization_id = %s', [org.id])
+        cycle.delete()
+        org.delete()
+
+    def handle(self, *args, **options):
+        org = Organization.objects.create(name='Inventory search benchmark')
+        cycle = Cycle.objects.create(
+            organization=org,
+            name='Inventory search benchmark',
+            start=make_aware(datetime(2019, 1, 1)),
+            end=make_aware(datetime(2019, 12, 31)),
+        )
+
+        try:
+            self.stdout.write('Generating %s views' % options['views'])
+            self._generate(org, cycle, options['views'])
+
+            views = PropertyView.objects.filter(property__organization=org, cycle=cycle).order_by('id')
+            for q in options['query']:
+                page = search_inventory('property_view', q, queryset=views).values_list('id', flat=True)[:100]
+
+                timings = []
+                for _ in range(options['runs']):
+                    start = time.time()
+                    # a clone of the queryset, the results of page itself are cached after the first run
+                    count = len(list(page.all()))
+                    timings.append((time.time() - start) * 1000)
+
+                self.stdout.write("Search '%s': %s views on the first page, median %.1f ms, max %.1f ms" % (
+                    q, count, statistics.median(timings), max(timings)))
+
+                sql, params = page.query.sql_with_params()
+                with connection.cursor() as cursor:
+                    cursor.execute('EXPLAIN ANALYZE ' + sql, params)
+                    for row in cursor.fetchall():
+                        self.stdout.write('    ' + row[0])
+        finally:
+            if options['keep']:
+                self.stdout.write('Kept organization %s' % org.id)
+            else:
+                self._delete(org, cycle)
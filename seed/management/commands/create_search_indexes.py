@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+:copyright (c) 2014 - 2020, The Regents of the University of California, through Lawrence Berkeley National Laboratory (subject to receipt of any required approvals from the U.S. Department of Energy) and contributors. All rights reserved.  # NOQA
+:author
+"""
+import hashlib
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from seed.search import SEARCH_EXTRA_DATA_KEYS
+
+STATE_TABLES = {
+    'property': 'seed_propertystate',
+    'taxlot': 'seed_taxlotstate',
+}
+
+
+class Command(BaseCommand):
+    help = 'Creates the trigram indexes of the extra data keys of SEED_SEARCH_EXTRA_DATA_KEYS'
+
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            for inventory_type, keys in SEARCH_EXTRA_DATA_KEYS.items():
+                table = STATE_TABLES[inventory_type]
+                for key in keys:
+                    name = '{}_search_{}'.format(table, hashlib.md5(key.encode('utf-8')).hexdigest()[:10])
+                    self.stdout.write("Creating index %s of %s '%s'" % (name, inventory_type, key))
+                    # the expression is the one of the icontains lookups of search_inventory
+                    cursor.execute(
+                        'CREATE INDEX IF NOT EXISTS {} ON {} '
+                        'USING gin (UPPER((extra_data ->> %s)::text) gin_trgm_ops)'.format(name, table),
+                        [key]
+                    )
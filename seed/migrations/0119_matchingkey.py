@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orgs', '0011_auto_20190714_2159'),
+        ('seed', '0118_match_merge_link_all_orgs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchingKey',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('state_class', models.CharField(max_length=16)),
+                ('columns_hash', models.CharField(max_length=32)),
+                ('criteria_hash', models.CharField(max_length=32, null=True)),
+                ('touched', models.BooleanField(default=True)),
+                ('cycle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='seed.Cycle')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='orgs.Organization')),
+                ('property_view', models.OneToOneField(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='matching_key', to='seed.PropertyView')),
+                ('taxlot_view', models.OneToOneField(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='matching_key', to='seed.TaxLotView')),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='matchingkey',
+            index_together={('organization', 'state_class', 'criteria_hash'), ('organization', 'state_class', 'touched')},
+        ),
+    ]
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+from seed.utils.match import build_matching_keys, matching_criteria_column_names
+
+
+def forwards(apps, schema_editor):
+    # 0118_match_merge_link_all_orgs merged and linked every organization before the MatchingKey
+    # table existed, so the keys are only built here, and are not flagged as touched.
+    Organization = apps.get_model("orgs", "organization")
+
+    for org in Organization.objects.all():
+        for state_class_name in ['PropertyState', 'TaxLotState']:
+            column_names = matching_criteria_column_names(org.id, state_class_name)
+            build_matching_keys(org.id, state_class_name, column_names, touched=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seed', '0119_matchingkey'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards),
+    ]
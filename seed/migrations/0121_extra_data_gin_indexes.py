@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seed', '0120_match_merge_link_all_orgs'),
+    ]
+
+    # The extra data keys are named by the users, so the GIN indexes cover the key checks (?) and
+    # containment (@>) of every key. The comparisons of a key that is filtered often can use an
+    # expression index on (extra_data ->> 'key') created for that key.
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX seed_propertystate_extra_data_gin ON seed_propertystate USING gin (extra_data);',
+            'DROP INDEX IF EXISTS seed_propertystate_extra_data_gin;',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX seed_taxlotstate_extra_data_gin ON seed_taxlotstate USING gin (extra_data);',
+            'DROP INDEX IF EXISTS seed_taxlotstate_extra_data_gin;',
+        ),
+    ]
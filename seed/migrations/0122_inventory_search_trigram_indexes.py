@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# fields of the states that are searched by seed.search.search_inventory
+SEARCH_FIELDS = [
+    ('seed_propertystate', 'address_line_1'),
+    ('seed_propertystate', 'pm_property_id'),
+    ('seed_propertystate', 'jurisdiction_property_id'),
+    ('seed_taxlotstate', 'jurisdiction_tax_lot_id'),
+    ('seed_taxlotstate', 'address_line_1'),
+]
+
+
+def index_operation(table, field):
+    # The expression is the one of the icontains lookups, UPPER("field"::text) LIKE UPPER(%q%),
+    # so that the trigram index serves them.
+    name = '{}_{}_trgm'.format(table, field)
+    return migrations.RunSQL(
+        'CREATE INDEX {} ON {} USING gin (UPPER({}::text) gin_trgm_ops);'.format(name, table, field),
+        'DROP INDEX IF EXISTS {};'.format(name),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seed', '0121_extra_data_gin_indexes'),
+    ]
+
+    operations = [TrigramExtension()] + [index_operation(table, field) for table, field in SEARCH_FIELDS]
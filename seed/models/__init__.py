@@ -24,6 +24,7 @@ from .meters import *  # noqa
 from .simulations import *  # noqa
 from .building_file import *  # noqa
 from .notes import *  # noqa
+from .matching_keys import *  # noqa
 
 
 from .certification import (    # noqa
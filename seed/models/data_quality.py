@@ -4,20 +4,27 @@
 :copyright (c) 2014 - 2020, The Regents of the University of California, through Lawrence Berkeley National Laboratory (subject to receipt of any required approvals from the U.S. Department of Energy) and contributors. All rights reserved.  # NOQA
 :author
 """
+import collections
+import functools
 import json
 import logging
+import operator
+import pickle
 import re
 from builtins import str
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from random import randint
 
 import pytz
 from django.apps import apps
 from django.db import models, IntegrityError
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
 from django.utils.timezone import get_current_timezone, make_aware, make_naive
 from past.builtins import basestring
 from pint.errors import DimensionalityError
 from quantityfield import ureg
+from quantityfield.fields import QuantityField
 
 from seed.lib.superperms.orgs.models import Organization
 from seed.models import (
@@ -29,12 +36,16 @@ from seed.models import (
 from seed.models import obj_to_dict
 from seed.serializers.pint import pretty_units
 from seed.utils.cache import (
-    set_cache_raw, get_cache_raw
+    set_cache_raw, get_cache_raw, get_redis_client
 )
 from seed.utils.time import convert_datestr
 
 _log = logging.getLogger(__name__)
 
+# Extra data values that PostgreSQL casts to the same float as Python. Other values, including
+# numbers that would overflow the cast, are checked in Python.
+SQL_NUMBER_REGEX = r'^[ \t\r\n]*[-+]?([0-9]{1,20}(\.[0-9]{0,20})?|\.[0-9]{1,20})([eE][-+]?[0-9]{1,2})?[ \t\r\n]*$'
+
 
 class ComparisonError(Exception):
     pass
@@ -502,6 +513,177 @@ class Rule(models.Model):
         return [f_min, f_max, f_value]
 
 
+class CompiledRule(object):
+    """
+    A data quality rule with the lookups that do not depend on the row resolved once, used by
+    DataQualityCheck.check_data_values.
+    """
+
+    def __init__(self, rule, is_field, column_lookup):
+        """
+        :param rule: Rule
+        :param is_field: bool, the field of the rule is a column of the state, otherwise the rule
+                         checks the extra data
+        :param column_lookup: dict, {(table_name, column_name): display_name}
+        """
+        self.rule = rule
+        self.is_field = is_field
+        self.in_column_lookup = (rule.table_name, rule.field) in column_lookup
+        # If the rule doesn't specify units only consider the value for the purposes of numerical comparison
+        self.drop_units = rule.units == ''
+
+        # Values that are in range only need a comparison against the bounds when there is no
+        # result or label to add for them, i.e. the field is known and the rule is not a valid rule.
+        # Footprint rules report every value.
+        self.fast_range = (
+            self.in_column_lookup and
+            rule.severity != Rule.SEVERITY_VALID and
+            (is_field or ' (Invalid Footprint)' not in rule.field)
+        )
+        # int values are compared with the bounds truncated to int, see Rule.minimum_valid
+        self.bounds = {
+            float: (
+                float('-inf') if rule.min is None else rule.min,
+                float('inf') if rule.max is None else rule.max,
+            ),
+            int: (
+                float('-inf') if rule.min is None else int(rule.min),
+                float('inf') if rule.max is None else int(rule.max),
+            ),
+        }
+
+    def in_range(self, value):
+        """
+        Return True if the value is an int or a float that passes the rule without a result,
+        False if the value needs the full check.
+
+        :param value: value of the field
+        :return: bool
+        """
+        if not self.fast_range:
+            return False
+        bounds = self.bounds.get(value.__class__)
+        return bounds is not None and bounds[0] <= value <= bounds[1]
+
+    def sql_filter(self, model_class, alias):
+        """
+        Build the filter of the rows that may have a result for the rule, so that the rule can be
+        checked in the database. The filter may select more rows than the rows with a result, e.g.
+        blank extra data values or datetimes within a day of the bounds, because the selected rows
+        are checked again in Python. The rows that are not selected pass the rule.
+
+        :param model_class: PropertyState or TaxLotState
+        :param alias: str, name of the annotation with the typed extra data value
+        :return: tuple, (annotations, scope, candidates) where scope is the Q of the rows the rule
+                 applies to and candidates the Q of the rows that may have a result, or None when
+                 no row can have a result. Returns None if the rule cannot be checked in SQL.
+        """
+        rule = self.rule
+        if rule.severity == Rule.SEVERITY_VALID:
+            return None
+
+        if self.is_field:
+            annotations = {}
+            scope = Q()
+            column = rule.field
+        else:
+            # only numbers in extra data are typed the same way in SQL and in Rule.str_to_data_type
+            if rule.data_type != Rule.TYPE_NUMBER or ' (Invalid Footprint)' in rule.field:
+                return None
+            extra_data = '"{}"."extra_data"'.format(model_class._meta.db_table)
+            annotations = {
+                alias: RawSQL(
+                    "CASE WHEN ({0} ->> %s) ~ %s THEN ({0} ->> %s)::float END".format(extra_data),
+                    (rule.field, SQL_NUMBER_REGEX, rule.field)
+                )
+            }
+            scope = Q(extra_data__has_key=rule.field)
+            column = alias
+
+        if not self.in_column_lookup:
+            # every row of a required field that is not mapped has a result, and the extra data
+            # values of a field that is not mapped are still checked for their type in Python
+            if rule.required or not self.is_field:
+                return None
+            return annotations, scope, None
+
+        terms = []
+        if self.is_field:
+            field = model_class._meta.get_field(rule.field)
+            bounds = self._sql_bounds(field)
+            if bounds is None:
+                return None
+            if rule.required or rule.not_null:
+                terms.append(Q(**{column + '__isnull': True}))
+                if isinstance(field, (models.CharField, models.TextField)):
+                    terms.append(Q(**{column: ''}))
+        else:
+            # extra data values that are blank or not numbers are checked in Python
+            bounds = rule.min, rule.max
+            terms.append(Q(**{column + '__isnull': True}))
+
+        if bounds[0] is not None:
+            terms.append(Q(**{column + '__lt': bounds[0]}))
+        if bounds[1] is not None:
+            terms.append(Q(**{column + '__gt': bounds[1]}))
+
+        if not terms:
+            return annotations, scope, None
+        return annotations, scope, functools.reduce(operator.or_, terms)
+
+    def _sql_bounds(self, field):
+        """
+        Return the bounds of the rule in the type of the database column, widened where the
+        comparison in Python is not exactly the same as in SQL.
+
+        :param field: Field of the state
+        :return: tuple, (min, max), or None if the rule cannot be checked in SQL
+        """
+        rule = self.rule
+        if isinstance(field, (models.CharField, models.TextField)):
+            # strings are only checked in SQL for being empty
+            if rule.min is not None or rule.max is not None or rule.text_match:
+                return None
+            return None, None
+        elif isinstance(field, QuantityField):
+            if self.drop_units:
+                return rule.min, rule.max
+            bounds = []
+            for bound, sign in [(rule.min, 1), (rule.max, -1)]:
+                if bound is None:
+                    bounds.append(None)
+                    continue
+                try:
+                    value = (bound * ureg(rule.units)).to(field.base_units).magnitude
+                except DimensionalityError:
+                    return None
+                # allow for the rounding of the unit conversion
+                bounds.append(value + sign * abs(value) * 1e-9)
+            return tuple(bounds)
+        elif isinstance(field, (models.IntegerField, models.FloatField)):
+            # int values compared to the bounds truncated to int fail only if they are out of the
+            # bounds themselves
+            return rule.min, rule.max
+        elif isinstance(field, (models.DateField, models.DateTimeField)):
+            bounds = []
+            for bound, sign in [(rule.min, 1), (rule.max, -1)]:
+                if bound is None:
+                    bounds.append(None)
+                    continue
+                try:
+                    value = datetime.strptime(str(int(bound)), '%Y%m%d')
+                except ValueError:
+                    return None
+                if isinstance(field, models.DateTimeField):
+                    # datetimes are compared in the local time of the server, which is within a
+                    # day of UTC
+                    bounds.append(make_aware(value, pytz.UTC) + sign * timedelta(days=1))
+                else:
+                    bounds.append(value.date())
+            return tuple(bounds)
+        return None
+
+
 class DataQualityCheck(models.Model):
     """
     Object that stores the high level configuration per organization of the DataQualityCheck
@@ -511,6 +693,9 @@ class DataQualityCheck(models.Model):
         'TaxLotState': ['address_line_1', 'custom_id_1', 'jurisdiction_tax_lot_id'],
     }
 
+    # How long the results of the checks are kept in the cache
+    RESULTS_TIMEOUT = 86400  # 24 hours
+
     organization = models.ForeignKey(Organization, on_delete=models.CASCADE)
     name = models.CharField(max_length=255, default='Default Data Quality Check')
 
@@ -555,6 +740,10 @@ class DataQualityCheck(models.Model):
         # set in check_data
         self.column_lookup = {}
 
+        # prefetched views, labels and parent organizations of the rows and the pending label
+        # changes when checking the data in batch mode, see check_data
+        self.label_batch = None
+
         super().__init__(*args, **kwargs)
 
     @staticmethod
@@ -573,6 +762,9 @@ class DataQualityCheck(models.Model):
         if identifier is None:
             identifier = randint(100, 100000)
         cache_key = DataQualityCheck.cache_key(identifier)
+        client = get_redis_client()
+        if client is not None:
+            client.delete(cache_key)
         set_cache_raw(cache_key, [])
         return cache_key, identifier
 
@@ -586,22 +778,25 @@ class DataQualityCheck(models.Model):
         """
         return "data_quality_results__%s" % identifier
 
-    def check_data(self, record_type, rows):
+    def check_data(self, record_type, rows, batch=False):
         """
         Send in data as a queryset from the Property/Taxlot ids.
 
+        In batch mode, the views, current labels and parent organizations of all the rows are
+        loaded up front and the label changes are written in bulk after all the rows have been
+        checked, instead of querying and updating the labels row by row.
+
         :param record_type: one of PropertyState | TaxLotState
         :param rows: rows of data to be checked for data quality
+        :param batch: bool, prefetch the label data and apply the label changes in bulk
         :return: None
         """
 
-        # grab the columns so we can grab the display names, create lookup tuple for display name
-        for c in Column.retrieve_all(self.organization, record_type, False):
-            self.column_lookup[(c['table_name'], c['column_name'])] = c['display_name']
+        rules = self._load_rules(record_type)
 
-        # grab all the rules once, save query time
-        rules = self.rules.filter(enabled=True, table_name=record_type).order_by('field',
-                                                                                 'severity')
+        if batch:
+            rows = list(rows)
+            self.label_batch = self._prefetch_label_batch(record_type, [row.id for row in rows])
 
         # Get the list of the field names that will show in every result
         fields = self.get_fieldnames(record_type)
@@ -617,11 +812,260 @@ class DataQualityCheck(models.Model):
             # Run the checks
             self._check(rules, row)
 
+        if batch:
+            self._apply_label_batch()
+            self.label_batch = None
+
+        self._prune_results()
+
+    def check_data_values(self, record_type, ids):
+        """
+        Check the PropertyStates or TaxLotStates with the given ids rule by rule instead of row by
+        row. The rules are compiled once, only the columns that the rules need are loaded with
+        values_list and every rule is evaluated over the whole column, with int and float values
+        in range checked by a plain comparison. The results and the label changes are the same as
+        check_data in batch mode, which is used instead if a rule cannot be compiled.
+
+        :param record_type: one of PropertyState | TaxLotState
+        :param ids: list, ids of the rows to check
+        :return: None
+        """
+        model_class = apps.get_model('seed', record_type)
+        rules = self._load_rules(record_type)
+        compiled_rules = self.compile_rules(model_class, rules)
+        if compiled_rules is None:
+            self.check_data(record_type, model_class.objects.filter(id__in=ids).iterator(), batch=True)
+            return
+
+        fields = self.get_fieldnames(record_type)
+        columns = fields + ['extra_data']
+        for compiled_rule in compiled_rules:
+            if compiled_rule.is_field and compiled_rule.rule.field not in columns:
+                columns.append(compiled_rule.rule.field)
+        column_index = {column: index for index, column in enumerate(columns)}
+        extra_data_index = column_index['extra_data']
+
+        rows = list(model_class.objects.filter(id__in=ids).values_list(*columns))
+        for row in rows:
+            if row[0] not in self.results:
+                self.results[row[0]] = {field: row[index] for index, field in enumerate(fields)}
+                self.results[row[0]]['data_quality_results'] = []
+
+        self.label_batch = self._prefetch_label_batch(record_type, [row[0] for row in rows])
+        label = self.label_batch['label_class']
+        all_model_labels = {}
+        for row in rows:
+            linked_id = self.label_batch['view_ids'].get(row[0])
+            all_model_labels[row[0]] = {
+                'linked_id': linked_id,
+                'label_ids': self.label_batch['label_ids'][linked_id] if linked_id is not None else [],
+            }
+
+        # the rules are ordered by field and severity, so evaluating rule by rule adds the results
+        # of each row in the same order as check_data
+        for compiled_rule in compiled_rules:
+            rule = compiled_rule.rule
+            if compiled_rule.is_field:
+                index = column_index[rule.field]
+                values = [(row[0], row[index]) for row in rows]
+            else:
+                values = [
+                    (row[0], row[extra_data_index][rule.field]) for row in rows
+                    if row[extra_data_index] and rule.field in row[extra_data_index]
+                ]
+
+            for row_id, value in values:
+                model_labels = all_model_labels[row_id]
+                if compiled_rule.is_field:
+                    if compiled_rule.drop_units and isinstance(value, ureg.Quantity):
+                        value = value.magnitude
+                    is_extra_data = False
+                elif compiled_rule.fast_range:
+                    try:
+                        value = rule.str_to_data_type(value)
+                        is_extra_data = False
+                    except DataQualityTypeCastError:
+                        # report the type error on the raw value
+                        is_extra_data = True
+                else:
+                    is_extra_data = True
+
+                if not is_extra_data and compiled_rule.in_range(value):
+                    if rule.status_label_id in model_labels['label_ids']:
+                        self.remove_status_label(label, rule, model_labels['linked_id'])
+                    continue
+
+                self._check_value(rule, row_id, value, label, model_labels, is_extra_data=is_extra_data)
+
+        self._apply_label_batch()
+        self.label_batch = None
+        self._prune_results()
+
+    def check_data_sql(self, record_type, rows):
+        """
+        Check the rules in the database and return the rows that may have a result, which still
+        need to be checked with check_data_values. The status labels of the rules are removed from
+        the views of the other rows, which pass every rule.
+
+        All the rows need to be checked in Python if one of the rules cannot be expressed in SQL
+        (text, valid and unit mismatch rules, extra data that are not numbers or not mapped) or
+        shares its status label with another rule, in which case the rows are returned as is.
+
+        :param record_type: one of PropertyState | TaxLotState
+        :param rows: queryset of the PropertyStates or TaxLotStates to check
+        :return: queryset, rows to check in Python
+        """
+        model_class = apps.get_model('seed', record_type)
+        rules = list(self._load_rules(record_type))
+        compiled_rules = self.compile_rules(model_class, rules)
+        if compiled_rules is None:
+            return rows
+
+        label_counts = collections.Counter(rule.status_label_id for rule in rules)
+        filters = []
+        for index, compiled_rule in enumerate(compiled_rules):
+            label_id = compiled_rule.rule.status_label_id
+            if label_id is not None and label_counts[label_id] > 1:
+                return rows
+            sql_filter = compiled_rule.sql_filter(model_class, '_dq_value_{}'.format(index))
+            if sql_filter is None:
+                return rows
+            filters.append((compiled_rule, sql_filter))
+
+        if record_type == 'PropertyState':
+            label_class, view_field = apps.get_model('seed', 'PropertyView_labels'), 'propertyview'
+        else:
+            label_class, view_field = apps.get_model('seed', 'TaxLotView_labels'), 'taxlotview'
+
+        # the rows are only selected as subqueries, the ids never leave the database
+        row_ids = rows.values('id')
+        for compiled_rule, (rule_annotations, scope, rule_candidates) in filters:
+            if compiled_rule.rule.status_label_id is None:
+                continue
+            passed = model_class.objects.filter(id__in=row_ids).annotate(**rule_annotations).filter(scope)
+            if rule_candidates is not None:
+                passed = passed.exclude(rule_candidates)
+            label_class.objects.filter(**{
+                'statuslabel_id': compiled_rule.rule.status_label_id,
+                '{}__state_id__in'.format(view_field): passed.values('id'),
+            }).delete()
+
+        annotations = {}
+        candidates = []
+        for compiled_rule, (rule_annotations, scope, rule_candidates) in filters:
+            annotations.update(rule_annotations)
+            if rule_candidates is not None:
+                candidates.append(scope & rule_candidates)
+        if not candidates:
+            return rows.none()
+
+        return rows.annotate(**annotations).filter(functools.reduce(operator.or_, candidates))
+
+    def compile_rules(self, model_class, rules):
+        """
+        Resolve the parts of the rules that do not depend on the rows once.
+
+        :param model_class: PropertyState or TaxLotState
+        :param rules: list, enabled rules of the table ordered by field and severity
+        :return: list of CompiledRule, or None if a rule checks an attribute of the model that is
+                 not a column, such as a related object
+        """
+        concrete_fields = {
+            f.name for f in model_class._meta.concrete_fields if not f.is_relation
+        }
+        compiled_rules = []
+        for rule in rules:
+            if hasattr(model_class, rule.field) and rule.field not in concrete_fields:
+                return None
+            compiled_rules.append(
+                CompiledRule(rule, rule.field in concrete_fields, self.column_lookup)
+            )
+        return compiled_rules
+
+    def _load_rules(self, record_type):
+        """
+        Load the display names of the columns and the enabled rules of the table
+
+        :param record_type: one of PropertyState | TaxLotState
+        :return: queryset of the rules ordered by field and severity
+        """
+        # grab the columns so we can grab the display names, create lookup tuple for display name
+        for c in Column.retrieve_all(self.organization, record_type, False):
+            self.column_lookup[(c['table_name'], c['column_name'])] = c['display_name']
+
+        # grab all the rules once, save query time
+        return self.rules.filter(enabled=True, table_name=record_type).select_related(
+            'status_label').order_by('field', 'severity')
+
+    def _prune_results(self):
         # Prune the results will remove any entries that have zero data_quality_results
         for k, v in self.results.copy().items():
             if not v['data_quality_results']:
                 del self.results[k]
 
+    def _prefetch_label_batch(self, record_type, state_ids):
+        """
+        Load the views, the current labels of the views and the parent organizations of the
+        views of the rows in a few queries.
+
+        :param record_type: one of PropertyState | TaxLotState
+        :param state_ids: list, ids of the PropertyStates or TaxLotStates
+        :return: dict
+        """
+        if record_type == 'PropertyState':
+            view_class, inventory, view_field = PropertyView, 'property', 'propertyview_id'
+            label_class = apps.get_model('seed', 'PropertyView_labels')
+        else:
+            view_class, inventory, view_field = TaxLotView, 'taxlot', 'taxlotview_id'
+            label_class = apps.get_model('seed', 'TaxLotView_labels')
+
+        view_ids = {}
+        parent_org_ids = {}
+        for state_id, view_id, org_id, parent_org_id in view_class.objects.filter(
+            state_id__in=state_ids
+        ).values_list(
+            'state_id', 'id', '{}__organization_id'.format(inventory),
+            '{}__organization__parent_org_id'.format(inventory)
+        ):
+            view_ids[state_id] = view_id
+            parent_org_ids[view_id] = parent_org_id or org_id
+
+        label_ids = collections.defaultdict(list)
+        for view_id, label_id in label_class.objects.filter(
+            **{'{}__in'.format(view_field): list(view_ids.values())}
+        ).values_list(view_field, 'statuslabel_id'):
+            label_ids[view_id].append(label_id)
+
+        return {
+            'label_class': label_class,
+            'view_field': view_field,
+            'view_ids': view_ids,
+            'label_ids': label_ids,
+            'parent_org_ids': parent_org_ids,
+            # {(view_id, label_id): True to add the label, False to remove it}, the last change wins
+            'changes': {},
+        }
+
+    def _apply_label_batch(self):
+        """Write the label changes that were collected in batch mode with bulk queries"""
+        batch = self.label_batch
+        label_class = batch['label_class']
+        view_field = batch['view_field']
+
+        new_labels = []
+        removed_labels = collections.defaultdict(list)
+        for (view_id, label_id), add in batch['changes'].items():
+            if add and label_id not in batch['label_ids'][view_id]:
+                new_labels.append(label_class(**{view_field: view_id, 'statuslabel_id': label_id}))
+            elif not add:
+                removed_labels[label_id].append(view_id)
+
+        label_class.objects.bulk_create(new_labels)
+        for label_id, view_ids in removed_labels.items():
+            label_class.objects.filter(
+                **{'statuslabel_id': label_id, '{}__in'.format(view_field): view_ids}
+            ).delete()
+
     def get_fieldnames(self, record_type):
         """Get fieldnames to apply to results."""
         field_names = ['id']
@@ -641,7 +1085,12 @@ class DataQualityCheck(models.Model):
         """
         # check if the row has any rules applied to it
         model_labels = {'linked_id': None, 'label_ids': []}
-        if row.__class__.__name__ == 'PropertyState':
+        if self.label_batch is not None:
+            label = self.label_batch['label_class']
+            model_labels['linked_id'] = self.label_batch['view_ids'].get(row.id)
+            if model_labels['linked_id'] is not None:
+                model_labels['label_ids'] = self.label_batch['label_ids'][model_labels['linked_id']]
+        elif row.__class__.__name__ == 'PropertyState':
             label = apps.get_model('seed', 'PropertyView_labels')
             if PropertyView.objects.filter(state=row).exists():
                 model_labels['linked_id'] = PropertyView.objects.get(state=row).id
@@ -667,118 +1116,131 @@ class DataQualityCheck(models.Model):
             is_extra_data = rule.field in row.extra_data
 
             # check if the field exists
-            if hasattr(row, rule.field) or is_extra_data:
-                value = None
-
-                label_applied = False
-                display_name = rule.field
-
-                if hasattr(row, rule.field):
-                    value = getattr(row, rule.field)
-                    # TODO cleanup after the cleaner is better able to handle fields with units on import
-                    # If the rule doesn't specify units only consider the value for the purposes of numerical comparison
-                    if isinstance(value, ureg.Quantity) and rule.units == '':
-                        value = value.magnitude
-                elif is_extra_data:
-                    value = row.extra_data[rule.field]
-
-                    if ' (Invalid Footprint)' in rule.field:
-                        self.add_invalid_geometry_entry_provided(row.id, rule, display_name, value)
-                        continue
-
-                    try:
-                        value = rule.str_to_data_type(value)
-                    except DataQualityTypeCastError:
-                        self.add_result_type_error(row.id, rule, display_name, value)
-                        continue
-
-                # get the display name of the rule
-                if (rule.table_name, rule.field) in self.column_lookup:
-                    display_name = self.column_lookup[(rule.table_name, rule.field)]
+            if hasattr(row, rule.field):
+                value = getattr(row, rule.field)
+                # TODO cleanup after the cleaner is better able to handle fields with units on import
+                # If the rule doesn't specify units only consider the value for the purposes of numerical comparison
+                if isinstance(value, ureg.Quantity) and rule.units == '':
+                    value = value.magnitude
+                self._check_value(rule, row.id, value, label, model_labels)
+            elif is_extra_data:
+                self._check_value(rule, row.id, row.extra_data[rule.field], label, model_labels,
+                                  is_extra_data=True)
+
+    def _check_value(self, rule, row_id, value, label, model_labels, is_extra_data=False):
+        """
+        Check the value of the field of a rule for one row and apply or remove the status label of
+        the rule.
+
+        :param rule: Rule
+        :param row_id: int, id of the PropertyState or TaxLotState
+        :param value: value of the field, extra data values are typed with the data type of the rule
+        :param label: PropertyView_labels or TaxLotView_labels class
+        :param model_labels: dict, {'linked_id': view id, 'label_ids': label ids of the view}
+        :param is_extra_data: bool, the value comes from the extra data of the row
+        :return: None
+        """
+        label_applied = False
+        display_name = rule.field
 
-                # get the status_labels for the linked properties and tax lots
-                linked_id = model_labels['linked_id']
+        if is_extra_data:
+            if ' (Invalid Footprint)' in rule.field:
+                self.add_invalid_geometry_entry_provided(row_id, rule, display_name, value)
+                return
 
-                if (rule.table_name, rule.field) not in self.column_lookup:
-                    # If the rule is not in the column lookup, then it may have been a required
-                    # field that wasn't mapped
-                    if rule.required:
-                        self.add_result_missing_req(row.id, rule, display_name, value)
-                        label_applied = self.update_status_label(label, rule, linked_id)
-                elif value is None or value == '':
-                    # Empty fields
-                    if rule.required:
-                        self.add_result_missing_and_none(row.id, rule, display_name, value)
-                        label_applied = self.update_status_label(label, rule, linked_id)
-                    elif rule.not_null:
-                        self.add_result_is_null(row.id, rule, display_name, value)
-                        label_applied = self.update_status_label(label, rule, linked_id)
-                elif not rule.valid_text(value):
-                    self.add_result_string_error(row.id, rule, display_name, value)
-                    label_applied = self.update_status_label(label, rule, linked_id)
-                else:
-                    # check the min and max values
-                    try:
-                        if not rule.minimum_valid(value):
-                            if rule.severity == Rule.SEVERITY_ERROR or rule.severity == Rule.SEVERITY_WARNING:
-                                s_min, s_max, s_value = rule.format_strings(value)
-                                self.add_result_min_error(row.id, rule, display_name, s_value, s_min)
-                                label_applied = self.update_status_label(label, rule, linked_id)
-                    except ComparisonError:
-                        s_min, s_max, s_value = rule.format_strings(value)
-                        self.add_result_comparison_error(row.id, rule, display_name, s_value, s_min)
-                        continue
-                    except DataQualityTypeCastError:
+            try:
+                value = rule.str_to_data_type(value)
+            except DataQualityTypeCastError:
+                self.add_result_type_error(row_id, rule, display_name, value)
+                return
+
+        # get the display name of the rule
+        if (rule.table_name, rule.field) in self.column_lookup:
+            display_name = self.column_lookup[(rule.table_name, rule.field)]
+
+        # get the status_labels for the linked properties and tax lots
+        linked_id = model_labels['linked_id']
+
+        if (rule.table_name, rule.field) not in self.column_lookup:
+            # If the rule is not in the column lookup, then it may have been a required
+            # field that wasn't mapped
+            if rule.required:
+                self.add_result_missing_req(row_id, rule, display_name, value)
+                label_applied = self.update_status_label(label, rule, linked_id)
+        elif value is None or value == '':
+            # Empty fields
+            if rule.required:
+                self.add_result_missing_and_none(row_id, rule, display_name, value)
+                label_applied = self.update_status_label(label, rule, linked_id)
+            elif rule.not_null:
+                self.add_result_is_null(row_id, rule, display_name, value)
+                label_applied = self.update_status_label(label, rule, linked_id)
+        elif not rule.valid_text(value):
+            self.add_result_string_error(row_id, rule, display_name, value)
+            label_applied = self.update_status_label(label, rule, linked_id)
+        else:
+            # check the min and max values
+            try:
+                if not rule.minimum_valid(value):
+                    if rule.severity == Rule.SEVERITY_ERROR or rule.severity == Rule.SEVERITY_WARNING:
                         s_min, s_max, s_value = rule.format_strings(value)
-                        self.add_result_type_error(row.id, rule, display_name, s_value)
-                        continue
-                    except UnitMismatchError:
-                        self.add_result_dimension_error(row.id, rule, display_name, value)
-                        continue
+                        self.add_result_min_error(row_id, rule, display_name, s_value, s_min)
+                        label_applied = self.update_status_label(label, rule, linked_id)
+            except ComparisonError:
+                s_min, s_max, s_value = rule.format_strings(value)
+                self.add_result_comparison_error(row_id, rule, display_name, s_value, s_min)
+                return
+            except DataQualityTypeCastError:
+                s_min, s_max, s_value = rule.format_strings(value)
+                self.add_result_type_error(row_id, rule, display_name, s_value)
+                return
+            except UnitMismatchError:
+                self.add_result_dimension_error(row_id, rule, display_name, value)
+                return
 
-                    try:
-                        if not rule.maximum_valid(value):
-                            if rule.severity == Rule.SEVERITY_ERROR or rule.severity == Rule.SEVERITY_WARNING:
-                                s_min, s_max, s_value = rule.format_strings(value)
-                                self.add_result_max_error(row.id, rule, display_name, s_value, s_max)
-                                label_applied = self.update_status_label(label, rule, linked_id)
-                    except ComparisonError:
+            try:
+                if not rule.maximum_valid(value):
+                    if rule.severity == Rule.SEVERITY_ERROR or rule.severity == Rule.SEVERITY_WARNING:
                         s_min, s_max, s_value = rule.format_strings(value)
-                        self.add_result_comparison_error(row.id, rule, display_name, s_value, s_max)
-                        continue
-                    except DataQualityTypeCastError:
+                        self.add_result_max_error(row_id, rule, display_name, s_value, s_max)
+                        label_applied = self.update_status_label(label, rule, linked_id)
+            except ComparisonError:
+                s_min, s_max, s_value = rule.format_strings(value)
+                self.add_result_comparison_error(row_id, rule, display_name, s_value, s_max)
+                return
+            except DataQualityTypeCastError:
+                s_min, s_max, s_value = rule.format_strings(value)
+                self.add_result_type_error(row_id, rule, display_name, s_value)
+                return
+            except UnitMismatchError:
+                self.add_result_dimension_error(row_id, rule, display_name, value)
+                return
+
+            # Check for mandatory label for valid data:
+            try:
+                if rule.minimum_valid(value) and rule.maximum_valid(value):
+                    if rule.severity == Rule.SEVERITY_VALID:
+                        '''
                         s_min, s_max, s_value = rule.format_strings(value)
-                        self.add_result_type_error(row.id, rule, display_name, s_value)
-                        continue
-                    except UnitMismatchError:
-                        self.add_result_dimension_error(row.id, rule, display_name, value)
-                        continue
+                        self.results[row_id]['data_quality_results'].append(
+                            {
+                                'field': rule.field,
+                                'formatted_field': display_name,
+                                'value': s_value,
+                                'table_name': rule.table_name,
+                                'message': display_name + ' is valid',
+                                'detailed_message': display_name + ' [' + s_value + '] is valid data',
+                                'severity': rule.get_severity_display(),
+                            }
+                        )
+                        '''
+                        label_applied = self.update_status_label(label, rule, linked_id)
+            except MissingLabelError:
+                self.add_result_missing_label(row_id, rule, display_name, value)
+                return
 
-                    # Check for mandatory label for valid data:
-                    try:
-                        if rule.minimum_valid(value) and rule.maximum_valid(value):
-                            if rule.severity == Rule.SEVERITY_VALID:
-                                '''
-                                s_min, s_max, s_value = rule.format_strings(value)
-                                self.results[row.id]['data_quality_results'].append(
-                                    {
-                                        'field': rule.field,
-                                        'formatted_field': display_name,
-                                        'value': s_value,
-                                        'table_name': rule.table_name,
-                                        'message': display_name + ' is valid',
-                                        'detailed_message': display_name + ' [' + s_value + '] is valid data',
-                                        'severity': rule.get_severity_display(),
-                                    }
-                                )
-                                '''
-                                label_applied = self.update_status_label(label, rule, linked_id)
-                    except MissingLabelError:
-                        self.add_result_missing_label(row.id, rule, display_name, value)
-                        continue
-
-                if not label_applied and rule.status_label_id in model_labels['label_ids']:
-                    self.remove_status_label(label, rule, linked_id)
+        if not label_applied and rule.status_label_id in model_labels['label_ids']:
+            self.remove_status_label(label, rule, linked_id)
 
     def save_to_cache(self, identifier):
         """
@@ -787,22 +1249,52 @@ class DataQualityCheck(models.Model):
         a dict of dict. This is important to remember because the data from the
         cache cannot be simply loaded into the above structure.
 
+        When the cache is Redis, the results are appended to a Redis list so that
+        the chunks that are checked in parallel do not overwrite each other's
+        results. Use retrieve_results to read them back.
+
         :param identifier: Import file primary key
         :return: None
         """
-
         # change the format of the data in the cache. Make this a list of
         # objects instead of object of objects.
-        existing_results = get_cache_raw(DataQualityCheck.cache_key(identifier)) or []
-
-        results = []
-        for key, value in self.results.items():
-            results.append(value)
+        results = list(self.results.values())
 
+        cache_key = DataQualityCheck.cache_key(identifier)
+        client = get_redis_client()
+        if client is not None:
+            if results:
+                pipe = client.pipeline()
+                pipe.rpush(cache_key, *[pickle.dumps(result) for result in results])
+                pipe.expire(cache_key, DataQualityCheck.RESULTS_TIMEOUT)
+                pipe.execute()
+            return
+
+        existing_results = get_cache_raw(cache_key) or []
         existing_results += results
 
         z = sorted(existing_results, key=lambda k: k['id'])
-        set_cache_raw(DataQualityCheck.cache_key(identifier), z, 86400)  # 24 hours
+        set_cache_raw(cache_key, z, DataQualityCheck.RESULTS_TIMEOUT)
+
+    @staticmethod
+    def retrieve_results(identifier):
+        """
+        Return the results that were saved to the cache by the data quality checks, sorted by
+        the ID of the record.
+
+        :param identifier: Import file primary key
+        :return: list of dicts, or None if the results do not exist
+        """
+        cache_key = DataQualityCheck.cache_key(identifier)
+        client = get_redis_client()
+        if client is not None:
+            results = [pickle.loads(result) for result in client.lrange(cache_key, 0, -1)]
+            if results:
+                return sorted(results, key=lambda k: k['id'])
+
+        # The results are either in the cache or the data quality checks have not found
+        # anything, in which case the cache holds the empty list from initialize_cache
+        return get_cache_raw(cache_key)
 
     def initialize_rules(self):
         """
@@ -1020,7 +1512,18 @@ class DataQualityCheck(models.Model):
         if rule.status_label_id is not None and linked_id is not None:
             label_org_id = rule.status_label.super_organization_id
 
-            if rule.table_name == 'PropertyState':
+            if self.label_batch is not None:
+                parent_org_id = self.label_batch['parent_org_ids'][linked_id]
+                if parent_org_id != label_org_id:
+                    raise IntegrityError(
+                        'Label with super_organization_id={} cannot be applied to a record with parent '
+                        'organization_id={}.'.format(
+                            label_org_id,
+                            parent_org_id
+                        )
+                    )
+                self.label_batch['changes'][(linked_id, rule.status_label_id)] = True
+            elif rule.table_name == 'PropertyState':
                 property_parent_org_id = PropertyView.objects.get(pk=linked_id).property.organization.get_parent().id
                 if property_parent_org_id == label_org_id:
                     label_class.objects.get_or_create(propertyview_id=linked_id,
@@ -1058,7 +1561,9 @@ class DataQualityCheck(models.Model):
         :return: boolean, if labeled was applied
         """
 
-        if rule.table_name == 'PropertyState':
+        if self.label_batch is not None:
+            self.label_batch['changes'][(linked_id, rule.status_label_id)] = False
+        elif rule.table_name == 'PropertyState':
             label_class.objects.filter(propertyview_id=linked_id,
                                        statuslabel_id=rule.status_label_id).delete()
         else:
@@ -0,0 +1,46 @@
+# !/usr/bin/env python
+# encoding: utf-8
+"""
+:copyright (c) 2014 - 2020, The Regents of the University of California, through Lawrence Berkeley National Laboratory (subject to receipt of any required approvals from the U.S. Department of Energy) and contributors. All rights reserved.  # NOQA
+:author
+"""
+
+from django.db import models
+
+from seed.lib.superperms.orgs.models import Organization
+from seed.models import (
+    Cycle,
+    PropertyView,
+    TaxLotView,
+)
+
+
+class MatchingKey(models.Model):
+    """
+    The hash of the matching criteria values of a -View's -State. -Views whose keys have the same
+    criteria_hash match each other, so the whole organization match merge link can read the
+    groups of matching -Views from this table instead of grouping every -State of the organization.
+
+    The keys are built by the first whole organization match merge link and are kept up to date
+    when -States are saved, merged and promoted (see seed.utils.match.refresh_matching_keys).
+    """
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE)
+    cycle = models.ForeignKey(Cycle, on_delete=models.CASCADE)
+    # PropertyState or TaxLotState, only one of the views is set
+    state_class = models.CharField(max_length=16)
+    property_view = models.OneToOneField(PropertyView, on_delete=models.CASCADE, null=True, related_name='matching_key')
+    taxlot_view = models.OneToOneField(TaxLotView, on_delete=models.CASCADE, null=True, related_name='matching_key')
+
+    # md5 of the matching criteria column names that the keys of the organization were built for
+    columns_hash = models.CharField(max_length=32)
+    # md5 of the matching criteria values, None if all of them are empty
+    criteria_hash = models.CharField(max_length=32, null=True)
+
+    # True if the key was added or changed since the last whole organization match merge link
+    touched = models.BooleanField(default=True)
+
+    class Meta:
+        index_together = [
+            ['organization', 'state_class', 'criteria_hash'],
+            ['organization', 'state_class', 'touched'],
+        ]
@@ -7,6 +7,7 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+import collections
 import copy
 import logging
 import re
@@ -21,6 +22,7 @@ from django.db import (
 )
 from django.db.models.signals import pre_delete, pre_save, post_save, m2m_changed
 from django.dispatch import receiver
+from django.utils import timezone
 from django.forms.models import model_to_dict
 from past.builtins import basestring
 from quantityfield.fields import QuantityField
@@ -280,6 +282,13 @@ class PropertyState(models.Model):
             ['analysis_state', 'organization'],
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The values as loaded, to tell whether the matching criteria changed when the state is saved
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def promote(self, cycle, property_id=None):
         """
         Promote the PropertyState to the view table for the given cycle
@@ -336,6 +345,79 @@ class PropertyState(models.Model):
 
             return None
 
+    @classmethod
+    def promote_states(cls, states, cycle):
+        """
+        Promote a list of PropertyStates to the view table for the given cycle. This does the
+        same as calling promote on each of the states, but the Property and PropertyView records are
+        created with bulk queries.
+
+        Args:
+            states: list of PropertyStates
+            cycle: Cycle to assign the views
+
+        Returns:
+            list, the resulting PropertyView of each state, or None where promote would return None
+
+        """
+        existing_views = collections.defaultdict(list)
+        for view in PropertyView.objects.filter(cycle=cycle, state__in=states):
+            existing_views[view.state_id].append(view)
+
+        new_states = [state for state in states if not existing_views[state.id]]
+        if any(state.organization_id is None for state in new_states):
+            _log.warn("organization is None")
+
+        properties = Property.objects.bulk_create(
+            [Property(organization_id=state.organization_id) for state in new_states]
+        )
+        new_views = PropertyView.objects.bulk_create([
+            PropertyView(property=prop, cycle=cycle, state=state)
+            for prop, state in zip(properties, new_states)
+        ])
+        # bulk_create does not send post_save, so touch the properties like post_save_property_view
+        now = timezone.now()
+        Property.objects.filter(pk__in=[prop.pk for prop in properties]).update(updated=now)
+
+        # This is legacy but still needed here to have the tests pass. Only the data_state changes
+        # unless the normalized address or the hash of a state is out of date, see save.
+        from seed.data_importer.tasks import hash_state_objects
+        for state in new_states:
+            state.data_state = DATA_STATE_MATCHING
+        for state, hash_object in zip(new_states, hash_state_objects(new_states)):
+            if state.address_line_1 is not None:
+                normalized_address = normalize_address_str(state.address_line_1)
+            else:
+                normalized_address = None
+            if normalized_address != state.normalized_address or hash_object != state.hash_object:
+                state.normalized_address = normalized_address
+                state.hash_object = hash_object
+                cls.objects.filter(pk=state.pk).update(
+                    normalized_address=normalized_address, hash_object=hash_object
+                )
+            state.updated = now
+        cls.objects.filter(pk__in=[state.pk for state in new_states]).update(
+            data_state=DATA_STATE_MATCHING, updated=now
+        )
+
+        # The keys of the new views are not added by post_save either
+        from seed.utils.match import refresh_matching_keys
+        refresh_matching_keys(cycle.organization_id, 'PropertyState', view_ids=[view.id for view in new_views])
+
+        new_views = dict(zip([state.id for state in new_states], new_views))
+        views = []
+        for state in states:
+            if state.id in new_views:
+                views.append(new_views[state.id])
+            elif len(existing_views[state.id]) == 1:
+                # PropertyView already exists for cycle and state. Nothing to do.
+                views.append(existing_views[state.id][0])
+            else:
+                _log.error("Found %s PropertyView" % len(existing_views[state.id]))
+                _log.error("This should never occur, famous last words?")
+                views.append(None)
+        return views
+
     def __str__(self):
         return 'Property State - %s' % self.pk
 
@@ -745,6 +827,13 @@ class PropertyView(models.Model):
         self._import_filename = kwargs.pop('import_filename', None)
         super().__init__(*args, **kwargs)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The values as loaded, to tell whether the state or the cycle changed when the view is saved
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def initialize_audit_logs(self, **kwargs):
         kwargs.update({
             'organization': self.property.organization,
@@ -804,6 +893,27 @@ def post_save_property_view(sender, **kwargs):
         kwargs['instance'].property.save()
 
 
+@receiver(post_save, sender=PropertyView)
+def post_save_property_view_matching_key(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Refresh the matching key of the PropertyView, if its PropertyState or Cycle changed
+    """
+    if not raw:
+        from seed.utils.match import refresh_view_matching_key
+        refresh_view_matching_key(instance, 'PropertyState', created=created)
+
+
+@receiver(post_save, sender=PropertyState)
+def post_save_property_state_matching_key(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    """
+    Refresh the matching keys of the views of an existing PropertyState, if its matching criteria
+    changed
+    """
+    if not created and not raw and instance.organization_id is not None:
+        from seed.utils.match import refresh_state_matching_keys
+        refresh_state_matching_keys(instance, 'PropertyState', update_fields=update_fields)
+
+
 class PropertyAuditLog(models.Model):
     organization = models.ForeignKey(Organization, on_delete=models.CASCADE)
     parent1 = models.ForeignKey('PropertyAuditLog', on_delete=models.CASCADE, blank=True, null=True,
@@ -269,9 +269,12 @@ class TaxLotProperty(models.Model):
 
         # Not sure what this code is really doing, but it only exists for TaxLotViews
         if lookups['obj_class'] == 'TaxLotView':
-            # Get whole taxlotstate table:
+            # Get the tax lots of the properties that are related to this page only. The related
+            # ids are property view ids here, so every pairing that is read below is included.
             tuple_prop_to_jurisdiction_tl = tuple(
-                TaxLotProperty.objects.values_list('property_view_id', 'taxlot_view__state__jurisdiction_tax_lot_id')
+                TaxLotProperty.objects.filter(property_view_id__in=related_ids).values_list(
+                    'property_view_id', 'taxlot_view__state__jurisdiction_tax_lot_id'
+                )
             )
 
             # create a mapping that defaults to an empty list
@@ -13,16 +13,29 @@ import operator
 
 from functools import reduce
 
-from django.db.models import Q
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import DecimalField, F, FloatField, IntegerField, Q
 from django.http.request import RawPostDataException
 from past.builtins import basestring
+from quantityfield import ureg
+from quantityfield.fields import QuantityField
 
 from seed.lib.superperms.orgs.models import Organization
+from seed.serializers.pint import display_unit_specs, get_dimensionality
+from seed.utils.search import (
+    JSONBKeyNumber,
+    JSONBKeyText,
+    build_filter,
+    is_positive_filter,
+)
 from .models import (
     Property,
     PropertyState,
     PropertyView,
     TaxLot,
+    TaxLotProperty,
     TaxLotState,
     TaxLotView,
     Column,
@@ -30,6 +43,30 @@ from .models import (
 
 _log = logging.getLogger(__name__)
 
+# extra data keys of the states that are searched along with the fields, by inventory type, e.g.
+# {'property': ['Building Name']}
+SEARCH_EXTRA_DATA_KEYS = getattr(settings, 'SEED_SEARCH_EXTRA_DATA_KEYS', {})
+
+# data types of the extra data columns that are filtered and sorted as numbers
+NUMERIC_DATA_TYPES = ['number', 'float', 'double', 'integer', 'area', 'eui']
+
+INVENTORY_VIEW_LOOKUPS = {
+    'property': {
+        'state_class': 'PropertyState',
+        'canonical_class': 'Property',
+        'canonical': 'property',
+        'view_id': 'property_view_id',
+        'view': 'property_view',
+    },
+    'taxlot': {
+        'state_class': 'TaxLotState',
+        'canonical_class': 'TaxLot',
+        'canonical': 'taxlot',
+        'view_id': 'taxlot_view_id',
+        'view': 'taxlot_view',
+    },
+}
+
 
 def _search(q, fieldnames, queryset):
     """returns a queryset for matching objects
@@ -188,23 +225,36 @@ def get_orgs_w_public_fields():
 
 
 def get_inventory_fieldnames(inventory_type):
-    """returns a list of field names that will be searched against
+    """returns a list of the fields of the states that will be searched against. The fields are
+    covered by the trigram indexes of the 0122_inventory_search_trigram_indexes migration.
     """
     return {
         'property': [
             'address_line_1', 'pm_property_id',
-            'jurisdiction_property_identifier'
+            'jurisdiction_property_id'
         ],
-        'taxlot': ['jurisdiction_taxlot_id', 'address'],
-        'property_view': ['property_id', 'cycle_id', 'state_id'],
-        'taxlot_view': ['taxlot_id', 'cycle_id', 'state_id'],
-    }[inventory_type]
+        'taxlot': ['jurisdiction_tax_lot_id', 'address_line_1'],
+    }[inventory_type.split('_')[0]]
+
+
+# the ids of the views that a search of views also matches
+VIEW_ID_FIELDNAMES = {
+    'property_view': ['property_id', 'cycle_id', 'state_id'],
+    'taxlot_view': ['taxlot_id', 'cycle_id', 'state_id'],
+}
 
 
 def search_inventory(inventory_type, q, fieldnames=None, queryset=None):
     """returns a queryset for matching Taxlot(View)/Property(View)
+
+    The fields of the states of the views and the extra data keys of SEED_SEARCH_EXTRA_DATA_KEYS
+    are matched with icontains, which the trigram indexes of the fields (and of the keys, see the
+    create_search_indexes command) serve instead of scanning the states. Searches of views also
+    match the ids of VIEW_ID_FIELDNAMES, but only when the search is a number, so that other
+    searches are still served by the indexes alone.
+
     :param str or unicode q: search string
-    :param list fieldnames: list of  model fieldnames
+    :param list fieldnames: list of the fields of the states
     :param queryset: optional queryset to filter from
     :returns: :queryset: queryset of matching buildings
     """
@@ -212,16 +262,35 @@ def search_inventory(inventory_type, q, fieldnames=None, queryset=None):
         'property': Property, 'property_view': PropertyView,
         'taxlot': TaxLot, 'taxlot_view': TaxLotView,
     }[inventory_type]
+    state_type = inventory_type.split('_')[0]
     if not fieldnames:
         fieldnames = get_inventory_fieldnames(inventory_type)
     if queryset is None:
         queryset = Model.objects.none()
     if q == '':
         return queryset
+
+    if inventory_type.endswith('view'):
+        views = queryset
+    else:
+        views = {'property': PropertyView, 'taxlot': TaxLotView}[state_type].objects.all()
+
     qgroup = reduce(operator.or_, (
-        Q(**{fieldname + '__icontains': q}) for fieldname in fieldnames
+        Q(**{'state__' + fieldname + '__icontains': q}) for fieldname in fieldnames
     ))
-    return queryset.filter(qgroup)
+    for i, key in enumerate(SEARCH_EXTRA_DATA_KEYS.get(state_type, [])):
+        alias = '_search_{}'.format(i)
+        views = views.annotate(**{alias: JSONBKeyText('state__extra_data', key)})
+        qgroup |= Q(**{alias + '__icontains': q})
+    if inventory_type in VIEW_ID_FIELDNAMES and q.isdigit():
+        for fieldname in VIEW_ID_FIELDNAMES[inventory_type]:
+            qgroup |= Q(**{fieldname + '__icontains': q})
+    views = views.filter(qgroup)
+
+    if inventory_type.endswith('view'):
+        return views
+    # search the views of the properties/taxlots without joining them to the queryset
+    return queryset.filter(id__in=views.values(state_type + '_id'))
 
 
 def create_inventory_queryset(inventory_type, orgs, exclude, order_by, other_orgs=None):
@@ -294,10 +363,116 @@ def inventory_search_filter_sort(inventory_type, params, user):
         other_orgs=other_orgs,
     )
 
-    if inventory:
+    if inventory_type:
         # full text search across a couple common fields
         inventory = search_inventory(
             inventory_type, params['q'], queryset=inventory
         )
 
     return inventory
+
+
+def _column_expression(column, prefix, org):
+    """
+    Return the field or expression of the views for a column, whether it is numeric and the
+    function that converts the numbers of its filters to values of the field.
+    """
+    lookups = INVENTORY_VIEW_LOOKUPS['property' if column['table_name'].startswith('Property') else 'taxlot']
+
+    if column['is_extra_data']:
+        numeric = column['data_type'] in NUMERIC_DATA_TYPES
+        expression_class = JSONBKeyNumber if numeric else JSONBKeyText
+        return expression_class(prefix + 'state__extra_data', column['column_name']), numeric, None
+
+    if column['table_name'] == lookups['state_class']:
+        model = apps.get_model('seed', lookups['state_class'])
+        path = prefix + 'state__'
+    elif column['table_name'] == lookups['canonical_class']:
+        model = apps.get_model('seed', lookups['canonical_class'])
+        path = prefix + lookups['canonical'] + '__'
+    else:
+        raise ValueError('Cannot filter or sort by {}'.format(column['name']))
+
+    try:
+        field = model._meta.get_field(column['column_name'])
+    except FieldDoesNotExist:
+        raise ValueError('Cannot filter or sort by {}'.format(column['name']))
+
+    to_value = None
+    if isinstance(field, QuantityField):
+        # the filters are typed in the display units of the organization
+        unit_spec = display_unit_specs(org)[get_dimensionality(ureg(field.base_units))]
+
+        def to_base_units(value):
+            return ureg.Quantity(float(value), unit_spec).to(field.base_units).magnitude
+
+        to_value = to_base_units
+
+    numeric = isinstance(field, (DecimalField, FloatField, IntegerField, QuantityField))
+    return F(path + field.name), numeric, to_value
+
+
+def filter_sort_inventory_views(inventory_type, views, columns_from_database, filters, order_by, org):
+    """
+    Filter and sort PropertyViews or TaxLotViews by the columns of the inventory list, so that
+    only the requested page has to leave the database. The filters are compiled with
+    build_filter, the extra data keys are read with ->> and the keys that must have a value are
+    checked with the GIN index of the extra data.
+
+    :param inventory_type: str, 'property' or 'taxlot'
+    :param views: QuerySet of PropertyViews or TaxLotViews
+    :param columns_from_database: list, columns from Column.retrieve_all for the inventory type
+    :param filters: dict, filters keyed by the names of the columns (the keys of the rows)
+    :param order_by: list, names of the columns to sort by, prefixed with - for the descending order
+    :param org: Organization, organization whose display units are used for the unit columns
+    :return: QuerySet
+    :raises ValueError: if a column or a filter is invalid
+    """
+    columns = {column['name']: column for column in columns_from_database}
+    lookups = INVENTORY_VIEW_LOOKUPS[inventory_type]
+    related_lookups = INVENTORY_VIEW_LOOKUPS['taxlot' if inventory_type == 'property' else 'property']
+
+    def get_column(name):
+        try:
+            return columns[name]
+        except KeyError:
+            raise ValueError('Unknown column {}'.format(name))
+
+    for i, (name, q) in enumerate(sorted((filters or {}).items())):
+        column = get_column(name)
+        if not isinstance(q, basestring) or not q.strip():
+            continue
+
+        if column['related']:
+            # filter the pairings and keep the views that have a matching related view
+            queryset = TaxLotProperty.objects.all()
+            prefix = related_lookups['view'] + '__'
+        else:
+            queryset = views
+            prefix = ''
+
+        expression, numeric, to_value = _column_expression(column, prefix, org)
+        alias = '_filter_{}'.format(i)
+        queryset = queryset.annotate(**{alias: expression}).filter(build_filter(alias, q, numeric, to_value))
+        if column['is_extra_data'] and is_positive_filter(q):
+            queryset = queryset.filter(**{prefix + 'state__extra_data__has_key': column['column_name']})
+
+        if column['related']:
+            views = views.filter(id__in=queryset.values(lookups['view_id']))
+        else:
+            views = queryset
+
+    ordering = []
+    for i, name in enumerate(order_by or []):
+        descending = name.startswith('-')
+        column = get_column(name.lstrip('-'))
+        if column['related']:
+            raise ValueError('Cannot sort by the related column {}'.format(column['name']))
+
+        expression, _numeric, _to_value = _column_expression(column, '', org)
+        alias = '_order_{}'.format(i)
+        views = views.annotate(**{alias: expression})
+        ordering.append(F(alias).desc(nulls_last=True) if descending else F(alias).asc(nulls_last=True))
+
+    # the id keeps the order of the pages stable
+    return views.order_by(*(ordering + ['id']))
@@ -0,0 +1,333 @@
+# !/usr/bin/env python
+# encoding: utf-8
+"""
+:copyright (c) 2014 - 2020, The Regents of the University of California, through Lawrence Berkeley National Laboratory (subject to receipt of any required approvals from the U.S. Department of Energy) and contributors. All rights reserved.  # NOQA
+:author
+"""
+from itertools import chain
+
+from django.apps import apps
+from django.contrib.gis.db.models import GeometryField
+from django.contrib.gis.geos import GEOSGeometry
+from django.contrib.postgres.fields import JSONField
+from django.db.models import Count
+from django.db.models.expressions import RawSQL
+from django.utils.encoding import force_text
+from django.utils.timezone import make_naive
+from quantityfield import ureg
+from quantityfield.fields import QuantityField
+
+from seed.models import (
+    Column,
+    Note,
+    TaxLotProperty,
+)
+from seed.serializers.pint import (
+    display_unit_specs,
+    get_dimensionality,
+)
+
+# names of the audit logs that flag a state as merged
+MERGED_AUDIT_LOG_NAMES = ['Manual Match', 'System Match', 'Merge current state in migration']
+
+# time stamps of the states that are returned as naive ISO strings
+NAIVE_DATETIME_FIELDS = ['recent_sale_date', 'release_date', 'generation_date', 'analysis_start_time',
+                         'analysis_end_time']
+
+# fields of the states that are always returned as WKT
+GIS_FIELDS = ['bounding_box', 'long_lat', 'centroid']
+
+INVENTORY_LOOKUPS = {
+    'property': {
+        'view_class': 'PropertyView',
+        'state_class': 'PropertyState',
+        'audit_log_class': 'PropertyAuditLog',
+        'view_id': 'property_view_id',
+        'state_id': 'property_state_id',
+        'id': 'property_id',
+        'canonical': 'property',
+        'canonical_fields': ['campus', 'created', 'updated'],
+    },
+    'taxlot': {
+        'view_class': 'TaxLotView',
+        'state_class': 'TaxLotState',
+        'audit_log_class': 'TaxLotAuditLog',
+        'view_id': 'taxlot_view_id',
+        'state_id': 'taxlot_state_id',
+        'id': 'taxlot_id',
+        'canonical': 'taxlot',
+        'canonical_fields': ['created', 'updated'],
+    },
+}
+
+
+def _naive_isoformat(value):
+    return make_naive(value).isoformat()
+
+
+def _wkt(value):
+    return GEOSGeometry(value, srid=4326).wkt
+
+
+class InventoryRowSerializer(object):
+    """
+    Serialize a page of PropertyViews or TaxLotViews, with their related views, to the rows of the
+    inventory list. The rows are the ones of TaxLotProperty.get_related once the units are
+    collapsed with apply_display_unit_preferences, but only the columns that are shown are read
+    with values(), the extra data keys are read with SQL projections instead of loading the whole
+    extra data, and the name mapping and unit conversions are compiled once per request.
+    """
+
+    def __init__(self, org, inventory_type, show_columns, columns_from_database):
+        """
+        :param org: Organization, organization whose unit preferences are used
+        :param inventory_type: str, 'property' or 'taxlot'
+        :param show_columns: list, ids of the columns to return, or None to return all the columns
+            excluding extra data
+        :param columns_from_database: list, columns from Column.retrieve_all for the inventory type
+        """
+        self.org = org
+        self.show_extra_data = show_columns is not None
+        self.unit_specs = display_unit_specs(org)
+
+        self.obj = INVENTORY_LOOKUPS[inventory_type]
+        self.related = INVENTORY_LOOKUPS['taxlot' if inventory_type == 'property' else 'property']
+
+        related_columns = []
+        related_mapping = {}
+        obj_columns = []
+        obj_mapping = {}
+        for column in columns_from_database:
+            if column['related']:
+                related_columns.append(column)
+                related_mapping[column['column_name']] = column['name']
+            else:
+                obj_columns.append(column)
+                obj_mapping[column['column_name']] = column['name']
+
+        show_columns = set(show_columns) if show_columns is not None else None
+        self.obj_plan = self._compile(self.obj, obj_columns, obj_mapping, show_columns)
+        self.related_plan = self._compile(self.related, related_columns, related_mapping, show_columns)
+
+    def _compile(self, lookups, columns, mapping, show_columns):
+        """
+        Return the plan to read and serialize the states of one inventory type: the fields to
+        read with their key in the rows and their conversion, the extra data keys to project and
+        the keys that hold Quantities with the units to display them in.
+        """
+        state_class = apps.get_model('seed', lookups['state_class'])
+
+        if show_columns is None:
+            selected = set(col['column_name'] for col in columns if not col['is_extra_data'])
+            extra_data_fields = []
+        else:
+            selected = set(col['column_name'] for col in columns if not col['is_extra_data'] and
+                           col['id'] in show_columns)
+            extra_data_fields = sorted(set(col['column_name'] for col in columns if col['is_extra_data'] and
+                                           col['id'] in show_columns))
+
+        fields = []
+        quantity_keys = []
+        # many to many fields are not returned, TaxLotProperty.get_related cannot serialize them
+        # under a mapped name either
+        for f in chain(state_class._meta.concrete_fields, state_class._meta.private_fields):
+            if not getattr(f, 'editable', False) or f.name not in selected or f.name == 'extra_data':
+                continue
+            if f.name in Column.EXCLUDED_COLUMN_RETURN_FIELDS:
+                continue
+
+            key = mapping.get(f.name, f.name)
+            if f.name in NAIVE_DATETIME_FIELDS:
+                convert = _naive_isoformat
+            elif isinstance(f, GeometryField):
+                convert = _wkt
+            else:
+                convert = None
+            fields.append((f.attname, key, convert))
+
+            if isinstance(f, QuantityField):
+                quantity_keys.append((key, self.unit_specs[get_dimensionality(ureg(f.base_units))]))
+
+        return {
+            'state_class': state_class,
+            'selected': selected,
+            'mapping': mapping,
+            'fields': fields,
+            'extra_data': [
+                ('_extra_data_%s' % i, field, mapping.get(field, field))
+                for i, field in enumerate(extra_data_fields)
+            ],
+            'quantity_keys': quantity_keys,
+            'analysis_state_choices': dict(state_class._meta.get_field('analysis_state').flatchoices)
+            if lookups['state_class'] == 'PropertyState' else {},
+        }
+
+    def _read_views(self, lookups, view_ids):
+        """Return the views with their canonical fields, keyed by id"""
+        canonical = lookups['canonical']
+        values = ['id', 'state_id', lookups['id']]
+        values += ['%s__%s' % (canonical, field) for field in lookups['canonical_fields']]
+        view_class = apps.get_model('seed', lookups['view_class'])
+        return {view['id']: view for view in view_class.objects.filter(pk__in=view_ids).values(*values)}
+
+    def _read_states(self, plan, state_ids):
+        """Return the values of the planned fields and extra data keys of the states, keyed by id"""
+        state_class = plan['state_class']
+        attnames = ['id'] + GIS_FIELDS
+        for attname, _key, _convert in plan['fields']:
+            if attname not in attnames:
+                attnames.append(attname)
+        if 'analysis_state' in plan['selected'] and plan['analysis_state_choices']:
+            attnames.append('analysis_state')
+
+        # project the extra data keys with -> so that only the requested keys are read. The keys
+        # are passed as parameters since they are named by the users.
+        extra_data_sql = '"%s"."extra_data" -> %%s' % state_class._meta.db_table
+        projections = {
+            alias: RawSQL(extra_data_sql, (field,), output_field=JSONField())
+            for alias, field, _key in plan['extra_data']
+        }
+        qs = state_class.objects.filter(pk__in=state_ids).annotate(**projections)
+        return {state['id']: state for state in qs.values(*(attnames + list(projections)))}
+
+    def _state_dict(self, plan, state):
+        data = {}
+        for attname, key, convert in plan['fields']:
+            value = state[attname]
+            if convert is not None and value:
+                value = convert(value)
+            data[key] = value
+        return data
+
+    def _add_extra_data(self, plan, data, state):
+        if self.show_extra_data:
+            for alias, _field, key in plan['extra_data']:
+                data[key] = state[alias]
+
+    def _add_analysis_state(self, plan, data, state):
+        if 'analysis_state' in plan['selected'] and plan['analysis_state_choices']:
+            value = state['analysis_state']
+            data[plan['mapping']['analysis_state']] = force_text(
+                plan['analysis_state_choices'].get(value, value), strings_only=True)
+
+    def _collapse_units(self, plan, data):
+        for key, unit_spec in plan['quantity_keys']:
+            value = data.get(key)
+            if isinstance(value, ureg.Quantity):
+                data[key] = round(value.to(unit_spec).magnitude, self.org.display_significant_figures)
+
+    def _note_counts(self, lookups, view_ids):
+        view_id = lookups['view_id']
+        return dict(Note.objects.filter(**{view_id + '__in': view_ids})
+                    .values_list(view_id).order_by().annotate(Count(view_id)))
+
+    def _merged_state_ids(self, lookups, state_ids):
+        audit_log_class = apps.get_model('seed', lookups['audit_log_class'])
+        return set(audit_log_class.objects.filter(
+            name__in=MERGED_AUDIT_LOG_NAMES, state_id__in=state_ids
+        ).values_list('state_id', flat=True))
+
+    def _related_rows(self, view_ids):
+        """Return the rows of the related views of the views, keyed by view id"""
+        obj, related, plan = self.obj, self.related, self.related_plan
+        canonical = related['canonical']
+
+        joins = list(TaxLotProperty.objects.filter(**{obj['view_id'] + '__in': view_ids})
+                     .order_by('id').values_list('id', obj['view_id'], related['view_id']))
+        related_ids = [related_id for _id, _view_id, related_id in joins]
+        related_views = self._read_views(related, related_ids)
+        states = self._read_states(plan, [view['state_id'] for view in related_views.values()])
+
+        related_map = {}
+        for pk, view in related_views.items():
+            state = states[view['state_id']]
+            data = self._state_dict(plan, state)
+            data[related['state_id']] = view['state_id']
+            for field in GIS_FIELDS:
+                data[field] = _wkt(state[field]) if state[field] else None
+
+            if 'campus' in related['canonical_fields'] and 'campus' in plan['selected']:
+                data[plan['mapping']['campus']] = view[canonical + '__campus']
+            # Do not make these timestamps naive. They persist correctly.
+            if 'updated' in plan['selected']:
+                data[plan['mapping']['updated']] = view[canonical + '__updated']
+            if 'created' in plan['selected']:
+                data[plan['mapping']['created']] = view[canonical + '__created']
+            self._add_analysis_state(plan, data, state)
+
+            self._add_extra_data(plan, data, state)
+            data['id'] = view[related['id']]
+            self._collapse_units(plan, data)
+            related_map[pk] = data
+
+        note_counts = self._note_counts(related, related_ids)
+        merged_state_ids = self._merged_state_ids(
+            related, [view['state_id'] for view in related_views.values()])
+
+        join_map = {}
+        for join_id, view_id, related_id in joins:
+            join_dict = related_map[related_id].copy()
+            join_dict[related['view_id']] = related_id
+            # TaxLotProperty.get_related looks the note counts of the related views up by the id
+            # of the pairing, keep the same rows
+            join_dict['notes_count'] = note_counts.get(join_id, 0)
+            join_dict['merged_indicator'] = related_views[related_id]['state_id'] in merged_state_ids
+            join_map.setdefault(view_id, []).append(join_dict)
+        return join_map
+
+    def serialize(self, view_ids):
+        """
+        Return the rows of the views, in the order of the ids
+
+        :param view_ids: list, ids of the PropertyViews or TaxLotViews
+        :return: list of dict
+        """
+        if not view_ids:
+            return []
+
+        obj, plan = self.obj, self.obj_plan
+        canonical = obj['canonical']
+
+        views = self._read_views(obj, view_ids)
+        states = self._read_states(plan, [view['state_id'] for view in views.values()])
+        note_counts = self._note_counts(obj, view_ids)
+        merged_state_ids = self._merged_state_ids(obj, [view['state_id'] for view in views.values()])
+        join_map = self._related_rows(view_ids)
+
+        results = []
+        for view_id in view_ids:
+            view = views[view_id]
+            state = states[view['state_id']]
+
+            data = self._state_dict(plan, state)
+            self._add_extra_data(plan, data, state)
+
+            data['id'] = view[obj['id']]
+            data['notes_count'] = note_counts.get(view_id, 0)
+            data[obj['state_id']] = view['state_id']
+            data[obj['view_id']] = view_id
+            data['merged_indicator'] = view['state_id'] in merged_state_ids
+            data['bounding_box'] = _wkt(state['bounding_box']) if state['bounding_box'] else None
+            data['long_lat'] = _wkt(state['long_lat']) if state['long_lat'] else None
+
+            if canonical == 'property':
+                data['centroid'] = _wkt(state['centroid']) if state['centroid'] else None
+                if 'campus' in plan['selected']:
+                    data[plan['mapping']['campus']] = view['property__campus']
+                # Do not make these timestamps naive. They persist correctly.
+                if 'created' in plan['selected']:
+                    data[plan['mapping']['created']] = view['property__created']
+                if 'updated' in plan['selected']:
+                    data[plan['mapping']['updated']] = view['property__updated']
+                self._add_analysis_state(plan, data, state)
+            else:
+                if 'updated' in plan['selected']:
+                    data[plan['mapping']['updated']] = view['taxlot__updated']
+                if 'created' in plan['selected']:
+                    data[plan['mapping']['created']] = view['taxlot__created']
+
+            self._collapse_units(plan, data)
+            data['related'] = join_map.get(view_id, [])
+            results.append(data)
+
+        return results
@@ -27,23 +27,29 @@ def get_dimensionality(quantity_object):
     return str(quantity_object.dimensionality)
 
 
-def collapse_unit(org, x):
+def display_unit_specs(org):
     """
-    Collapse a Quantity object present down to a straight Float, per the
-    preferences of the organization supplied (or the base units). Generally
-    used to hide the fact of Quantities from Angular.
+    Return the units in which the organization displays the Quantities, keyed by their
+    dimensionality.
     """
     # make extensible / field name agnostic by just branching on the dimensionality
     # and not the field name (eg. 'gross_floor_area') ... the dimensionality gets
     # enforced separately by the django pint column type
-    pint_specs = {
+    return {
         EUI_DIMENSIONALITY: org.display_units_eui or EUI_DEFAULT_UNITS,
         AREA_DIMENSIONALITY: org.display_units_area or AREA_DEFAULT_UNITS
     }
 
+
+def collapse_unit(org, x):
+    """
+    Collapse a Quantity object present down to a straight Float, per the
+    preferences of the organization supplied (or the base units). Generally
+    used to hide the fact of Quantities from Angular.
+    """
     if isinstance(x, ureg.Quantity):
         dimensionality = get_dimensionality(x)
-        pint_spec = pint_specs[dimensionality]
+        pint_spec = display_unit_specs(org)[dimensionality]
         converted_value = x.to(pint_spec).magnitude
         return round(converted_value, org.display_significant_figures)
     elif isinstance(x, list):
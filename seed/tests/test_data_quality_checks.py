@@ -13,6 +13,7 @@ from seed.models.data_quality import (
     DataQualityTypeCastError,
     UnitMismatchError,
 )
+from seed.models import Column, PropertyState, PropertyView, StatusLabel
 from seed.models.models import ASSESSED_RAW
 from seed.test_helpers.fake import (
     FakePropertyFactory,
@@ -54,6 +55,24 @@ class DataQualityCheckTests(DataMappingBaseTestCase):
         )
         self.assertDictContainsSubset(ex_rule, model_to_dict(rule.first()))
 
+    def test_save_results_from_chunks(self):
+        DataQualityCheck.initialize_cache('test_chunks')
+        self.assertEqual(DataQualityCheck.retrieve_results('test_chunks'), [])
+
+        # each chunk of the checks saves its own results
+        for ids in [[5, 2], [3]]:
+            dq = DataQualityCheck.retrieve(self.org.id)
+            dq.results = {i: {'id': i, 'data_quality_results': [{'field': 'site_eui'}]} for i in ids}
+            dq.save_to_cache('test_chunks')
+
+        results = DataQualityCheck.retrieve_results('test_chunks')
+        self.assertEqual([r['id'] for r in results], [2, 3, 5])
+
+        # initializing the cache again removes the results
+        DataQualityCheck.initialize_cache('test_chunks')
+        self.assertEqual(DataQualityCheck.retrieve_results('test_chunks'), [])
+        self.assertIsNone(DataQualityCheck.retrieve_results('never_initialized'))
+
     def test_remove_rules(self):
         dq = DataQualityCheck.retrieve(self.org.id)
         self.assertEqual(dq.rules.count(), 22)
@@ -129,6 +148,155 @@ class DataQualityCheckTests(DataMappingBaseTestCase):
 
         self.assertEqual(error_found, True)
 
+    def test_check_data_batch_labels(self):
+        dq = DataQualityCheck.retrieve(self.org.id)
+        label = StatusLabel.objects.create(name='EUI out of range', super_organization=self.org)
+        rule = dq.rules.get(table_name='PropertyState', field='site_eui', severity=Rule.SEVERITY_ERROR)
+        rule.status_label = label
+        rule.save()
+
+        ps = self.property_state_factory.get_property_state(
+            no_default_data=True, address_line_1='742 Evergreen Terrace', site_eui=525600)
+        ps_valid = self.property_state_factory.get_property_state(
+            no_default_data=True, address_line_1='1 Main St', site_eui=50)
+        pv = self.property_view_factory.get_property_view(state=ps)
+        pv_valid = self.property_view_factory.get_property_view(state=ps_valid)
+
+        dq = DataQualityCheck.retrieve(self.org.id)
+        dq.check_data('PropertyState', PropertyState.objects.filter(pk__in=[ps.id, ps_valid.id]), batch=True)
+        self.assertIn(ps.id, dq.results)
+        self.assertEqual(list(pv.labels.all()), [label])
+        self.assertEqual(list(pv_valid.labels.all()), [])
+
+        # fixing the data removes the label
+        ps.site_eui = 500
+        ps.save()
+        dq = DataQualityCheck.retrieve(self.org.id)
+        dq.check_data('PropertyState', PropertyState.objects.filter(pk=ps.id), batch=True)
+        self.assertEqual(list(pv.labels.all()), [])
+
+    def test_check_data_values_matches_check_data(self):
+        dq = DataQualityCheck.retrieve(self.org.id)
+        label = StatusLabel.objects.create(name='EUI out of range', super_organization=self.org)
+        rule = dq.rules.get(table_name='PropertyState', field='site_eui', severity=Rule.SEVERITY_ERROR)
+        rule.status_label = label
+        rule.save()
+        Column.objects.create(
+            column_name='meters', table_name='PropertyState', organization=self.org, is_extra_data=True)
+        dq.add_rule({
+            'table_name': 'PropertyState',
+            'field': 'meters',
+            'data_type': Rule.TYPE_NUMBER,
+            'rule_type': Rule.RULE_TYPE_CUSTOM,
+            'min': 1,
+            'max': 10,
+            'severity': Rule.SEVERITY_WARNING,
+        })
+
+        ids = []
+        for site_eui, energy_score, meters in [
+            (525600, 5, '20'), (50, 50, '5'), (None, None, 'many'), (-1, 150, ''), (1000, 10, 3),
+        ]:
+            ps = self.property_state_factory.get_property_state(
+                no_default_data=True, address_line_1='742 Evergreen Terrace', site_eui=site_eui,
+                energy_score=energy_score, extra_data={'meters': meters})
+            self.property_view_factory.get_property_view(state=ps)
+            ids.append(ps.id)
+
+        dq = DataQualityCheck.retrieve(self.org.id)
+        dq.check_data('PropertyState', PropertyState.objects.filter(pk__in=ids), batch=True)
+        expected = dq.results
+        expected_labels = list(
+            PropertyView.labels.through.objects.order_by('propertyview_id').values_list(
+                'propertyview_id', 'statuslabel_id')
+        )
+        PropertyView.labels.through.objects.all().delete()
+
+        dq = DataQualityCheck.retrieve(self.org.id)
+        dq.check_data_values('PropertyState', ids)
+        self.assertEqual(dq.results, expected)
+        self.assertEqual(len(dq.results), 5)
+        self.assertEqual(
+            list(PropertyView.labels.through.objects.order_by('propertyview_id').values_list(
+                'propertyview_id', 'statuslabel_id')),
+            expected_labels
+        )
+        self.assertEqual(len(expected_labels), 2)
+
+    def test_check_data_sql(self):
+        dq = DataQualityCheck.retrieve(self.org.id)
+        label = StatusLabel.objects.create(name='EUI out of range', super_organization=self.org)
+        rule = dq.rules.get(table_name='PropertyState', field='site_eui', severity=Rule.SEVERITY_ERROR)
+        rule.status_label = label
+        rule.save()
+        Column.objects.create(
+            column_name='meters', table_name='PropertyState', organization=self.org, is_extra_data=True)
+        dq.add_rule({
+            'table_name': 'PropertyState',
+            'field': 'meters',
+            'data_type': Rule.TYPE_NUMBER,
+            'rule_type': Rule.RULE_TYPE_CUSTOM,
+            'min': 1,
+            'max': 10,
+            'severity': Rule.SEVERITY_WARNING,
+        })
+
+        states = {}
+        views = {}
+        for name, site_eui, extra_data in [
+            ('eui', 525600, {'meters': '5'}), ('valid', 50, {'meters': ' 5 '}), ('no_meters', 50, {}),
+            ('many_meters', 50, {'meters': 'many'}), ('few_meters', 50, {'meters': 0}),
+        ]:
+            states[name] = self.property_state_factory.get_property_state(
+                no_default_data=True, address_line_1='742 Evergreen Terrace', pm_property_id='PMID',
+                custom_id_1='abcd', site_eui=site_eui, extra_data=extra_data)
+            views[name] = self.property_view_factory.get_property_view(state=states[name])
+            views[name].labels.add(label)
+        ids = [state.id for state in states.values()]
+        rows = PropertyState.objects.filter(id__in=ids)
+
+        dq = DataQualityCheck.retrieve(self.org.id)
+        candidate_ids = list(dq.check_data_sql('PropertyState', rows).order_by('id').values_list('id', flat=True))
+        self.assertEqual(
+            candidate_ids, [states['eui'].id, states['many_meters'].id, states['few_meters'].id])
+
+        # the labels are removed from the views that pass every rule
+        self.assertEqual(list(views['valid'].labels.all()), [])
+        self.assertEqual(list(views['no_meters'].labels.all()), [])
+
+        dq = DataQualityCheck.retrieve(self.org.id)
+        dq.check_data_values('PropertyState', candidate_ids)
+        expected = DataQualityCheck.retrieve(self.org.id)
+        expected.check_data_values('PropertyState', ids)
+        self.assertEqual(dq.results, expected.results)
+        self.assertEqual(list(views['eui'].labels.all()), [label])
+        self.assertEqual(list(views['few_meters'].labels.all()), [])
+
+        # the values of extra data that are not mapped are still checked for their type in Python
+        dq.add_rule({
+            'table_name': 'PropertyState',
+            'field': 'unmapped_meters',
+            'data_type': Rule.TYPE_NUMBER,
+            'rule_type': Rule.RULE_TYPE_CUSTOM,
+            'min': 1,
+            'severity': Rule.SEVERITY_WARNING,
+        })
+        dq = DataQualityCheck.retrieve(self.org.id)
+        self.assertIs(dq.check_data_sql('PropertyState', rows), rows)
+        dq.rules.filter(field='unmapped_meters').delete()
+
+        # rules that cannot be checked in SQL leave all the rows to Python
+        dq.add_rule({
+            'table_name': 'PropertyState',
+            'field': 'address_line_1',
+            'data_type': Rule.TYPE_STRING,
+            'rule_type': Rule.RULE_TYPE_CUSTOM,
+            'text_match': 'Main',
+            'severity': Rule.SEVERITY_ERROR,
+        })
+        dq = DataQualityCheck.retrieve(self.org.id)
+        self.assertIs(dq.check_data_sql('PropertyState', rows), rows)
+
     def test_text_match(self):
         dq = DataQualityCheck.retrieve(self.org.id)
         dq.remove_all_rules()
@@ -11,6 +11,7 @@ from django.urls import reverse
 from django.test import TestCase
 
 from seed.landing.models import SEEDUser as User
+from seed.models.data_quality import DataQualityCheck
 from seed.utils.organizations import create_organization
 
 
@@ -33,3 +34,21 @@ class DataQualityViewTests(TestCase):
         self.assertEqual(jdata['status'], 'success')
         self.assertEqual(len(jdata['rules']['taxlots']), 2)
         self.assertEqual(len(jdata['rules']['properties']), 20)
+
+    def test_results_pagination(self):
+        DataQualityCheck.initialize_cache('test_results')
+        dq = DataQualityCheck.retrieve(self.org.id)
+        dq.results = {i: {'id': i, 'data_quality_results': []} for i in [3, 1, 2]}
+        dq.save_to_cache('test_results')
+
+        url = reverse('api:v2:data_quality_checks-results')
+        response = self.client.get(url, {'organization_id': self.org.pk, 'data_quality_id': 'test_results'})
+        self.assertEqual([r['id'] for r in response.json()['data']], [1, 2, 3])
+
+        response = self.client.get(url, {'organization_id': self.org.pk, 'data_quality_id': 'test_results',
+                                         'page': 2, 'per_page': 2})
+        jdata = response.json()
+        self.assertEqual([r['id'] for r in jdata['data']], [3])
+        self.assertEqual(jdata['pagination']['total'], 3)
+        self.assertEqual(jdata['pagination']['num_pages'], 2)
+        self.assertFalse(jdata['pagination']['has_next'])
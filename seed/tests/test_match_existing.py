@@ -12,6 +12,8 @@ from config.settings.common import TIME_ZONE
 from datetime import datetime
 
 from django.contrib.postgres.aggregates.general import ArrayAgg
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.db.models.aggregates import Count
 from django.db.models import Subquery
@@ -25,6 +27,7 @@ from seed.models import (
     ASSESSED_RAW,
     DATA_STATE_MAPPING,
     Column,
+    MatchingKey,
     Meter,
     MeterReading,
     Property,
@@ -39,7 +42,9 @@ from seed.models import (
 )
 from seed.utils.match import (
     match_merge_link,
+    match_merge_link_views,
     whole_org_match_merge_link,
+    whole_org_match_merge_link_counts,
 )
 from seed.test_helpers.fake import (
     FakeColumnListSettingsFactory,
@@ -1227,6 +1232,71 @@ class TestMatchMergeLink(DataMappingBaseTestCase):
         self.assertEqual(initial_linked_id, view_21.taxlot_id)
         self.assertEqual(initial_linked_id, view_31.taxlot_id)
 
+    def test_match_merge_link_views_links_properties_in_bulk(self):
+        """
+        3 Cycles - 3 Property Sets in Cycle 1 and 3, 2 in Cycle 2. The Sets of
+        Cycle 3 are linked together in one batch:
+            - The 1st matches 2 linked Sets and uses their canonical record.
+            - The 2nd matches 2 unlinked Sets and gets a new canonical record with them.
+            - The 3rd no longer matches the Set it was linked to and is unlinked.
+        """
+        base_property_details = {
+            'import_file_id': self.import_file_1.id,
+            'data_state': DATA_STATE_MAPPING,
+            'no_default_data': False,
+        }
+        state_ids = {}
+        for import_file, names in [(self.import_file_1, ['11', '12', '13']),
+                                   (self.import_file_2, ['21', '22']),
+                                   (self.import_file_3, ['31', '32', '33'])]:
+            base_property_details['import_file_id'] = import_file.id
+            for name in names:
+                base_property_details['pm_property_id'] = 'Unmatched - ' + name
+                state_ids[name] = self.property_state_factory.get_property_state(**base_property_details).id
+
+            import_file.mapping_done = True
+            import_file.save()
+            match_buildings(import_file.id)
+
+        self.assertEqual(8, Property.objects.count())
+        views = {name: PropertyView.objects.get(state_id=state_id) for name, state_id in state_ids.items()}
+
+        # Link Sets 11 and 21, then Sets 13 and 33
+        PropertyState.objects.filter(id__in=[state_ids['11'], state_ids['21']]).update(pm_property_id='Linked Set')
+        match_merge_link(views['21'].id, 'PropertyState')
+        linking_id = PropertyView.objects.get(pk=views['11'].id).property_id
+
+        PropertyState.objects.filter(id__in=[state_ids['13'], state_ids['33']]).update(pm_property_id='Old Link')
+        match_merge_link(views['33'].id, 'PropertyState')
+        old_link_id = PropertyView.objects.get(pk=views['13'].id).property_id
+        self.assertEqual(old_link_id, PropertyView.objects.get(pk=views['33'].id).property_id)
+
+        PropertyState.objects.filter(id=state_ids['31']).update(pm_property_id='Linked Set')
+        PropertyState.objects.filter(id__in=[state_ids['12'], state_ids['22'], state_ids['32']]).update(pm_property_id='New Link')
+        PropertyState.objects.filter(id=state_ids['33']).update(pm_property_id='No longer matches')
+
+        target_view_ids = match_merge_link_views(
+            [views['31'].id, views['32'].id, views['33'].id], 'PropertyState'
+        )
+        self.assertEqual({views['31'].id: None, views['32'].id: None, views['33'].id: None}, target_view_ids)
+
+        refreshed_views = {name: PropertyView.objects.get(pk=view.id) for name, view in views.items()}
+
+        # 1st Set uses the existing link
+        self.assertEqual(linking_id, refreshed_views['31'].property_id)
+        self.assertEqual(3, PropertyView.objects.filter(property_id=linking_id).count())
+
+        # 2nd Set is linked with a new canonical record
+        new_link_id = refreshed_views['32'].property_id
+        self.assertNotIn(new_link_id, [views['12'].property_id, views['22'].property_id, views['32'].property_id])
+        self.assertEqual(new_link_id, refreshed_views['12'].property_id)
+        self.assertEqual(new_link_id, refreshed_views['22'].property_id)
+
+        # 3rd Set is unlinked
+        self.assertEqual(old_link_id, refreshed_views['13'].property_id)
+        self.assertNotEqual(old_link_id, refreshed_views['33'].property_id)
+        self.assertEqual(1, PropertyView.objects.filter(property_id=refreshed_views['33'].property_id).count())
+
     def test_match_merge_link_for_properties_meters_persist_in_different_situations(self):
         """
         In the following order, check that meters persist in each scenario:
@@ -1675,6 +1745,91 @@ class TestMatchingExistingViewFullOrgMatchingProperties(DataMappingBaseTestCase)
             expected_summary['PropertyState']['linked_sets_count']
         )
 
+    def test_properties_whole_org_match_merge_link_counts(self):
+        # Make the same matches as test_properties_whole_org_match_merge_link
+        PropertyState.objects.filter(pk=self.ps_12.id).update(pm_property_id='1st Match Set')
+        PropertyState.objects.filter(pk=self.ps_14.id).update(pm_property_id='2nd Match Set')
+        PropertyState.objects.filter(pk__in=[self.ps_21.id, self.ps_22.id, self.ps_23.id]).update(pm_property_id='1st Match Set')
+        PropertyState.objects.filter(pk=self.ps_26.id).update(pm_property_id='Single to be Linked!')
+
+        view_links = list(PropertyView.objects.order_by('id').values_list('id', 'state_id', 'property_id'))
+
+        counts = whole_org_match_merge_link_counts(self.org.id, 'PropertyState')
+
+        # Nothing was merged or linked
+        self.assertEqual(view_links, list(PropertyView.objects.order_by('id').values_list('id', 'state_id', 'property_id')))
+        self.assertEqual(12, PropertyState.objects.count())
+
+        # The counts are those of an actual run
+        summary = whole_org_match_merge_link(self.org.id, 'PropertyState')
+        self.assertEqual(summary, counts)
+        self.assertEqual(7, counts['PropertyState']['merged_count'])
+        self.assertEqual(2, counts['PropertyState']['linked_sets_count'])
+
+    def test_properties_whole_org_match_merge_link_only_examines_touched_keys(self):
+        whole_org_match_merge_link(self.org.id, 'PropertyState')
+
+        # The first run builds the matching keys of every -View
+        keys = MatchingKey.objects.filter(organization_id=self.org.id, state_class='PropertyState')
+        self.assertEqual(PropertyView.objects.count(), keys.count())
+        self.assertFalse(keys.filter(touched=True).exists())
+
+        # Saving a -State refreshes the key of its -View
+        property_26 = PropertyState.objects.get(id=self.ps_26.id)
+        property_26.pm_property_id = 'Single to be Linked!'
+        property_26.save()
+
+        view_26 = PropertyView.objects.get(state_id=self.ps_26.id)
+        self.assertEqual([view_26.id], list(keys.filter(touched=True).values_list('property_view_id', flat=True)))
+
+        view_16 = PropertyView.objects.get(state_id=self.ps_16.id)
+        other_canonical_ids = set(
+            PropertyView.objects.exclude(id__in=[view_16.id, view_26.id]).values_list('property_id', flat=True)
+        )
+
+        summary = whole_org_match_merge_link(self.org.id, 'PropertyState')
+
+        # Only the touched key was linked
+        self.assertEqual(0, summary['PropertyState']['merged_count'])
+        self.assertEqual(1, summary['PropertyState']['linked_sets_count'])
+        self.assertFalse(keys.filter(touched=True).exists())
+
+        # The other -Views keep their canonical records
+        view_16 = PropertyView.objects.get(state_id=self.ps_16.id)
+        view_26 = PropertyView.objects.get(state_id=self.ps_26.id)
+        self.assertEqual(view_16.property_id, view_26.property_id)
+        self.assertEqual(
+            other_canonical_ids,
+            set(PropertyView.objects.exclude(id__in=[view_16.id, view_26.id]).values_list('property_id', flat=True))
+        )
+
+    def test_properties_saving_a_state_only_refreshes_the_matching_keys_when_the_criteria_change(self):
+        whole_org_match_merge_link(self.org.id, 'PropertyState')
+        keys = MatchingKey.objects.filter(organization_id=self.org.id, state_class='PropertyState')
+
+        property_26 = PropertyState.objects.get(id=self.ps_26.id)
+        property_26.property_name = 'Not a matching criteria'
+        with CaptureQueriesContext(connection) as captured_queries:
+            property_26.save()
+        upserts = [query for query in captured_queries if 'INSERT INTO ' + MatchingKey._meta.db_table in query['sql']]
+        self.assertEqual([], upserts)
+
+        property_26.pm_property_id = 'Single to be Linked!'
+        property_26.save()
+        view_26 = PropertyView.objects.get(state_id=self.ps_26.id)
+        self.assertEqual([view_26.id], list(keys.filter(touched=True).values_list('property_view_id', flat=True)))
+
+    def test_properties_whole_org_match_merge_link_preview_keeps_the_matching_keys(self):
+        whole_org_match_merge_link(self.org.id, 'PropertyState')
+
+        keys = MatchingKey.objects.filter(organization_id=self.org.id, state_class='PropertyState').order_by('id')
+        key_values = list(keys.values_list('id', 'columns_hash', 'criteria_hash', 'touched'))
+
+        # The keys of the proposed columns are built in a temporary table
+        whole_org_match_merge_link(self.org.id, 'PropertyState', ['property_name'])
+
+        self.assertEqual(key_values, list(keys.values_list('id', 'columns_hash', 'criteria_hash', 'touched')))
+
 
 class TestMatchingExistingViewFullOrgMatchingTaxLots(DataMappingBaseTestCase):
     def setUp(self):
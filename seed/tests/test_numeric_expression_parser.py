@@ -9,6 +9,7 @@ import itertools
 from django.test import TestCase
 
 from seed.utils.search import (
+    build_filter,
     is_numeric_expression,
     parse_expression,
     NUMERIC_EXPRESSION_REGEX,
@@ -72,6 +73,9 @@ class IsNumericExpressionTests(TestCase):
         ('less_than_or_equal', "<=1234", True),
         ('greater_than', ">1234", True),
         ('greater_than_or_equal', ">=1234", True),
+        ('decimal_1', ">10.5", True),
+        ('decimal_2', "<.5", True),
+        ('exponent', ">=-1.5e3", True),
         # Whitespace
         ('whitespace_1', "=  1234", True),
         ('whitespace_2', " == 1234 ", True),
@@ -141,9 +145,32 @@ class ExpressionParserTests(TestCase):
         # complex expressions
         ("complex_1", "!=1234,<1234", [(True, "field", "1234"), (False, "field__lt", "1234")]),
         ("complex_2", ">1234,<4567", [(False, "field__gt", "1234"), (False, "field__lt", "4567")]),
+        ("complex_3", ">=50, <100.25", [(False, "field__gte", "50"), (False, "field__lt", "100.25")]),
+        # decimals and exponents
+        ("decimal", ">10.5", [(False, "field__gt", "10.5")]),
+        ("exponent", "<1e3", [(False, "field__lt", "1e3")]),
         # invalid
         ("invalid_null_1", ">null", []),
         ("invalid_null_2", ">=null", []),
         ("invalid_null_3", "<null", []),
         ("invalid_null_4", "<=null", []),
     ]
+
+
+class BuildFilterTests(TestCase):
+    def test_build_filter_numeric_decimals(self):
+        self.assertEqual(
+            [(False, 'field__gt', '10.5')],
+            query_to_child_tuples(build_filter('field', '>10.5', numeric=True))
+        )
+        self.assertEqual(
+            [(False, 'field__gte', 50.0), (False, 'field__lt', 100.25)],
+            query_to_child_tuples(build_filter('field', '>=50, <100.25', numeric=True, to_value=float))
+        )
+
+    def test_build_filter_numeric_rejects_partial_expressions(self):
+        # the upper bound is not a number, it must not be dropped silently
+        with self.assertRaises(ValueError):
+            build_filter('field', '>=50, <abc', numeric=True)
+        with self.assertRaises(ValueError):
+            build_filter('field', '>123,<', numeric=True)
@@ -268,6 +268,48 @@ class TestOrganizationPreviewViews(DataMappingBaseTestCase):
         # Check that preview shows links would be created
         self.assertEqual(summary[str(self.cycle_1.id)][0]['id'], summary[str(self.cycle_2.id)][0]['id'])
 
+    def test_whole_org_match_merge_link_preview_endpoint_counts_only(self):
+        # Cycle 1 / ImportFile 1 and Cycle 2 / ImportFile 2 - Create 1 unlinked property in each
+        base_property_details = {
+            'pm_property_id': '1st Non-Match Set',
+            'city': 'City 1',
+            'property_name': 'Match Set',
+            'import_file_id': self.import_file_1.id,
+            'data_state': DATA_STATE_MAPPING,
+            'no_default_data': False,
+        }
+        ps_1 = self.property_state_factory.get_property_state(**base_property_details)
+        self.import_file_1.mapping_done = True
+        self.import_file_1.save()
+        match_buildings(self.import_file_1.id)
+
+        base_property_details['pm_property_id'] = '2nd Non-Match Set'
+        base_property_details['import_file_id'] = self.import_file_2.id
+        ps_2 = self.property_state_factory.get_property_state(**base_property_details)
+        self.import_file_2.mapping_done = True
+        self.import_file_2.save()
+        match_buildings(self.import_file_2.id)
+
+        url = reverse('api:v2:organizations-match-merge-link-preview', args=[self.org.id])
+        post_params = json.dumps({
+            "inventory_type": "properties",
+            "add": ['property_name'],
+            "remove": ['pm_property_id'],
+            "counts_only": True,
+        })
+        raw_result = self.client.post(url, post_params, content_type='application/json')
+        self.assertEqual(200, raw_result.status_code)
+
+        # Check there *still* doesn't exist links
+        self.assertNotEqual(ps_1.propertyview_set.first().property_id, ps_2.propertyview_set.first().property_id)
+
+        identifier = ProgressData.from_key(json.loads(raw_result.content)['progress_key']).data['unique_id']
+        get_result_url = reverse('api:v2:organizations-match-merge-link-result', args=[self.org.id]) + '?match_merge_link_id=' + str(identifier)
+        summary = json.loads(self.client.get(get_result_url).content)
+
+        # Check that preview counts the link that would be created
+        self.assertEqual({'merged_count': 0, 'linked_sets_count': 1}, summary['PropertyState'])
+
     def test_whole_org_match_merge_link_preview_endpoint_taxlots(self):
         # Cycle 1 / ImportFile 1 - Create 1 taxlot
         base_taxlot_details = {
@@ -227,6 +227,68 @@ class PropertyViewTests(DataMappingBaseTestCase):
         self.assertTrue('merged_indicator' in related)
         self.assertFalse(related['merged_indicator'])
 
+    def test_filter_endpoint_cursor_pagination(self):
+        view_ids = [
+            self.property_view_factory.get_property_view(cycle=self.cycle).id
+            for _ in range(3)
+        ]
+
+        url = reverse('api:v2:properties-filter') + '?cycle={}&organization_id={}&per_page=2&cursor=&count=exact'.format(self.cycle.pk, self.org.pk)
+        data = json.loads(self.client.post(url).content)
+
+        self.assertEqual(view_ids[:2], [result['property_view_id'] for result in data['results']])
+        self.assertTrue(data['pagination']['has_next'])
+        self.assertEqual(3, data['pagination']['total'])
+
+        url = reverse('api:v2:properties-filter') + '?cycle={}&organization_id={}&per_page=2&cursor={}'.format(
+            self.cycle.pk, self.org.pk, data['pagination']['next_cursor'])
+        data = json.loads(self.client.post(url).content)
+
+        self.assertEqual(view_ids[2:], [result['property_view_id'] for result in data['results']])
+        self.assertFalse(data['pagination']['has_next'])
+        self.assertIsNone(data['pagination']['next_cursor'])
+        self.assertNotIn('total', data['pagination'])
+
+        url = reverse('api:v2:properties-filter') + '?cycle={}&organization_id={}&per_page=2&cursor=invalid'.format(self.cycle.pk, self.org.pk)
+        self.assertEqual(400, self.client.post(url).status_code)
+
+    def test_filter_endpoint_filters_and_sorts_in_the_database(self):
+        self.org.display_units_area = 'm**2'
+        self.org.save()
+        Column.objects.create(organization=self.org, table_name='PropertyState', column_name='Floors',
+                              is_extra_data=True, data_type='number')
+        view_ids = []
+        for address, floors, area in [('1 Main St', '3', 1000), ('2 Elm St', '10', 2000), ('3 Main Ave', 'x', 3000)]:
+            state = self.property_state_factory.get_property_state(
+                address_line_1=address, gross_floor_area=area, extra_data={'Floors': floors})
+            view_ids.append(PropertyView.objects.create(
+                property=self.property_factory.get_property(), cycle=self.cycle, state=state).id)
+
+        names = {c['column_name']: c['name'] for c in Column.retrieve_all(self.org.id, 'property', False)}
+        url = reverse('api:v2:properties-filter') + '?cycle={}&organization_id={}&page=1&per_page=10'.format(self.cycle.pk, self.org.pk)
+
+        def post(body):
+            return self.client.post(url, data=json.dumps(body), content_type='application/json')
+
+        def result_ids(body):
+            return [result['property_view_id'] for result in post(body).json()['results']]
+
+        # numeric extra data, the values that are not numbers do not match
+        self.assertEqual([view_ids[1]], result_ids({'filters': {names['Floors']: '>5'}}))
+        self.assertEqual([view_ids[1], view_ids[0], view_ids[2]], result_ids({'order_by': ['-' + names['Floors']]}))
+
+        # the unit columns are filtered in the display units of the organization, 150 m**2 is about 1615 ft**2
+        self.assertEqual(view_ids[1:], result_ids({'filters': {names['gross_floor_area']: '>150'}}))
+
+        self.assertEqual([view_ids[2], view_ids[0]], result_ids({
+            'filters': {names['address_line_1']: 'main'},
+            'order_by': '-' + names['address_line_1'],
+        }))
+        self.assertEqual([view_ids[0], view_ids[2]], result_ids({'filters': {names['address_line_1']: '!=2 Elm St'}}))
+
+        self.assertEqual(400, post({'filters': {'not_a_column': '>5'}}).status_code)
+        self.assertEqual(400, post({'filters': {names['Floors']: 'many'}}).status_code)
+
     def test_list_properties_with_profile_id(self):
         state = self.property_state_factory.get_property_state(extra_data={"field_1": "value_1"})
         prprty = self.property_factory.get_property()
@@ -0,0 +1,83 @@
+# !/usr/bin/env python
+# encoding: utf-8
+"""
+:copyright (c) 2014 - 2020, The Regents of the University of California, through Lawrence Berkeley National Laboratory (subject to receipt of any required approvals from the U.S. Department of Energy) and contributors. All rights reserved.  # NOQA
+:author
+"""
+import mock
+from django.db import connection
+from django.test import TestCase
+
+from seed import search
+from seed.landing.models import SEEDUser as User
+from seed.models import (
+    Property,
+    PropertyView,
+)
+from seed.test_helpers.fake import (
+    FakeCycleFactory,
+    FakePropertyFactory,
+    FakePropertyStateFactory,
+)
+from seed.utils.organizations import create_organization
+
+
+class InventorySearchTests(TestCase):
+    def setUp(self):
+        user_details = {
+            'username': 'test_user@demo.com',
+            'password': 'test_pass',
+            'email': 'test_user@demo.com'
+        }
+        self.user = User.objects.create_superuser(**user_details)
+        self.org, _, _ = create_organization(self.user)
+        self.cycle = FakeCycleFactory(organization=self.org, user=self.user).get_cycle()
+        self.property_factory = FakePropertyFactory(organization=self.org)
+        self.property_state_factory = FakePropertyStateFactory(organization=self.org)
+
+        self.views = []
+        for i, (address, building) in enumerate([('1 Main St', 'Library'), ('2 Elm St', 'City Hall'), ('3 Main Ave', 'Pool')]):
+            state = self.property_state_factory.get_property_state(
+                address_line_1=address, pm_property_id=str(i), jurisdiction_property_id=None,
+                extra_data={'Building': building})
+            self.views.append(PropertyView.objects.create(
+                property=self.property_factory.get_property(), cycle=self.cycle, state=state))
+
+    def test_search_inventory_matches_the_fields_of_the_states(self):
+        views = PropertyView.objects.filter(cycle=self.cycle).order_by('id')
+        self.assertEqual(
+            [self.views[0], self.views[2]],
+            list(search.search_inventory('property_view', 'main', queryset=views))
+        )
+
+        properties = Property.objects.filter(organization=self.org).order_by('id')
+        self.assertEqual(
+            [self.views[1].property],
+            list(search.search_inventory('property', 'elm st', queryset=properties))
+        )
+
+        # the extra data keys are only searched when they are configured
+        self.assertEqual([], list(search.search_inventory('property_view', 'hall', queryset=views)))
+        with mock.patch.object(search, 'SEARCH_EXTRA_DATA_KEYS', {'property': ['Building']}):
+            self.assertEqual(
+                [self.views[1]],
+                list(search.search_inventory('property_view', 'hall', queryset=views))
+            )
+
+    def test_search_inventory_matches_the_ids_of_the_views(self):
+        views = PropertyView.objects.filter(cycle=self.cycle).order_by('id')
+        view = self.views[1]
+        self.assertIn(view, list(search.search_inventory('property_view', str(view.property_id), queryset=views)))
+        self.assertIn(view, list(search.search_inventory('property_view', str(view.state_id), queryset=views)))
+
+    def test_search_inventory_uses_the_trigram_indexes(self):
+        views = PropertyView.objects.filter(cycle=self.cycle)
+        sql, params = search.search_inventory('property_view', 'main', queryset=views).query.sql_with_params()
+
+        with connection.cursor() as cursor:
+            # the test tables are too small for the planner to prefer the indexes otherwise
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + sql, params)
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+
+        self.assertIn('seed_propertystate_address_line_1_trgm', plan)
@@ -6,6 +6,7 @@
 """
 import json
 
+from django.core.serializers.json import DjangoJSONEncoder
 from django.urls import reverse_lazy
 
 from seed.landing.models import SEEDUser as User
@@ -15,12 +16,16 @@ from seed.models import (
     TaxLotProperty,
     Column,
     Note,
+    TaxLotView,
 )
+from seed.serializers.inventory import InventoryRowSerializer
+from seed.serializers.pint import apply_display_unit_preferences
 from seed.test_helpers.fake import (
     FakePropertyFactory,
     FakePropertyStateFactory,
     FakePropertyViewFactory,
-    FakeStatusLabelFactory
+    FakeStatusLabelFactory,
+    FakeTaxLotViewFactory,
 )
 from seed.tests.util import DataMappingBaseTestCase
 from seed.utils.organizations import create_organization
@@ -222,3 +227,52 @@ class TestTaxLotProperty(DataMappingBaseTestCase):
     def tearDown(self):
         for x in self.properties:
             PropertyView.objects.get(pk=x).delete()
+
+    def test_inventory_row_serializer_matches_get_related(self):
+        self.org.display_units_area = 'm**2'
+        self.org.save()
+        Column.objects.create(organization=self.org, table_name='PropertyState',
+                              column_name='Property Extra', is_extra_data=True)
+        Column.objects.create(organization=self.org, table_name='TaxLotState',
+                              column_name='2015', is_extra_data=True)
+
+        taxlot_view_factory = FakeTaxLotViewFactory(organization=self.org, user=self.user)
+        for i in range(5):
+            p = self.property_view_factory.get_property_view(
+                cycle=self.cycle, extra_data={'Property Extra': 'value %s' % i, 'Not Shown': i}
+            )
+            self.properties.append(p.id)
+            if i % 2:
+                t = taxlot_view_factory.get_taxlot_view(cycle=self.cycle, extra_data={'2015': i})
+                TaxLotProperty.objects.create(property_view=p, taxlot_view=t, cycle=self.cycle)
+        p.notes.create(name='Manually Created', note_type=Note.NOTE, text='note')
+
+        def expected(views, show_columns, columns_from_database):
+            rows = TaxLotProperty.get_related(views, show_columns, columns_from_database)
+            return json.loads(json.dumps(
+                [apply_display_unit_preferences(self.org, row) for row in rows], cls=DjangoJSONEncoder
+            ))
+
+        def serialized(inventory_type, view_ids, show_columns, columns_from_database):
+            rows = InventoryRowSerializer(
+                self.org, inventory_type, show_columns, columns_from_database
+            ).serialize(view_ids)
+            return json.loads(json.dumps(rows, cls=DjangoJSONEncoder))
+
+        property_views = PropertyView.objects.filter(pk__in=self.properties).order_by('id')
+        columns_from_database = Column.retrieve_all(self.org.id, 'property', False)
+        all_columns = [c['id'] for c in columns_from_database]
+        for show_columns in [None, all_columns, all_columns[:10]]:
+            self.assertEqual(
+                serialized('property', self.properties, show_columns, columns_from_database),
+                expected(property_views, show_columns, columns_from_database)
+            )
+
+        taxlot_views = TaxLotView.objects.filter(cycle=self.cycle).order_by('id')
+        columns_from_database = Column.retrieve_all(self.org.id, 'taxlot', False)
+        all_columns = [c['id'] for c in columns_from_database]
+        for show_columns in [None, all_columns]:
+            self.assertEqual(
+                serialized('taxlot', [view.id for view in taxlot_views], show_columns, columns_from_database),
+                expected(taxlot_views, show_columns, columns_from_database)
+            )
@@ -8,6 +8,8 @@ import json
 
 from datetime import datetime
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils.timezone import get_current_timezone
 
@@ -191,6 +193,51 @@ class TaxLotViewTests(DataMappingBaseTestCase):
         self.assertTrue('merged_indicator' in related)
         self.assertFalse(related['merged_indicator'])
 
+    def test_filter_endpoint_work_stays_flat_as_other_orgs_pairings_grow(self):
+        property_factory = FakePropertyFactory(organization=self.org)
+        property_state_factory = FakePropertyStateFactory(organization=self.org)
+
+        def pair(organization, cycle):
+            taxlot_view = TaxLotView.objects.create(
+                taxlot=self.taxlot_factory.get_taxlot(organization=organization),
+                cycle=cycle,
+                state=self.taxlot_state_factory.get_taxlot_state(organization=organization)
+            )
+            property_view = PropertyView.objects.create(
+                property=property_factory.get_property(organization=organization),
+                cycle=cycle,
+                state=property_state_factory.get_property_state(organization=organization)
+            )
+            TaxLotProperty.objects.create(
+                primary=True, cycle=cycle, property_view=property_view, taxlot_view=taxlot_view
+            )
+
+        pair(self.org, self.cycle)
+
+        url = reverse('api:v2:taxlots-filter') + '?cycle_id={}&organization_id={}&page=1&per_page=10'.format(self.cycle.pk, self.org.pk)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url)
+        results = json.loads(response.content)['results']
+
+        # grow the pairings of another organization
+        other_org, _, _ = create_organization(self.user, 'other org')
+        other_cycle = FakeCycleFactory(organization=other_org, user=self.user).get_cycle(
+            start=datetime(2011, 10, 10, tzinfo=get_current_timezone()))
+        for _ in range(5):
+            pair(other_org, other_cycle)
+
+        with CaptureQueriesContext(connection) as other_queries:
+            response = self.client.post(url)
+
+        self.assertEqual(json.loads(response.content)['results'], results)
+        self.assertEqual(len(other_queries), len(queries))
+
+        # every read of the pairings is scoped to the page
+        pairing_queries = [q['sql'] for q in other_queries if 'FROM "seed_taxlotproperty"' in q['sql']]
+        self.assertTrue(pairing_queries)
+        for sql in pairing_queries:
+            self.assertIn('WHERE', sql)
+
     def test_taxlot_match_merge_link(self):
         base_details = {
             'jurisdiction_tax_lot_id': '123MatchID',
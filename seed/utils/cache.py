@@ -12,6 +12,14 @@ def make_key(key):
     return str(django_cache.make_key(key))
 
 
+def get_redis_client():
+    """Return the Redis client of the cache, or None if the cache is not backed by Redis"""
+    get_master_client = getattr(django_cache, 'get_master_client', None)
+    if get_master_client is None:
+        return None
+    return get_master_client()
+
+
 def set_cache_raw(key, data, timeout=DEFAULT_TIMEOUT):
     django_cache.set(key, data, timeout)
 
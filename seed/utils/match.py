@@ -5,16 +5,27 @@
 :author
 """
 
+import collections
+import hashlib
+import itertools
+
 from celery import shared_task
+from celery.signals import task_prerun
 
 from django.contrib.postgres.aggregates.general import ArrayAgg
-from django.db import transaction
-from django.db.models import Subquery
+from django.core.signals import request_started
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Q, Subquery, When
 from django.db.models.aggregates import Count
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
 
 from seed.models import (
     Column,
     Cycle,
+    MatchingKey,
+    Meter,
     Property,
     PropertyState,
     PropertyView,
@@ -49,6 +60,31 @@ def matching_filter_criteria(state, column_names):
     }
 
 
+def matching_criteria_key(state, column_names):
+    """
+    For a given -State, returns a tuple of it's matching criteria values in the
+    order of column_names. Two -States match if their keys are equal.
+    """
+    return tuple(getattr(state, column_name, None) for column_name in column_names)
+
+
+def states_by_matching_criteria(states, column_names):
+    """
+    Group the given -States by their matching criteria values with a single
+    query. This is the in-memory equivalent of filtering the -States with
+    matching_filter_criteria once for every key.
+
+    :param states: QuerySet of -States
+    :param column_names: list, matching criteria column names
+    :return: dict, {matching criteria key: [state_id, ...]}
+    """
+    column_names = list(column_names)
+    result = collections.defaultdict(list)
+    for values in states.values_list('id', *column_names).iterator():
+        result[tuple(values[1:])].append(values[0])
+    return result
+
+
 def matching_criteria_column_names(organization_id, table_name):
     """
     Collect matching criteria columns while replacing address_line_1 with
@@ -67,6 +103,245 @@ def matching_criteria_column_names(organization_id, table_name):
     }
 
 
+MATCHING_KEY_UPSERT_SQL = """
+    INSERT INTO {key_table} (organization_id, cycle_id, state_class, {view_id_col}, columns_hash, criteria_hash, touched)
+    SELECT %s, v.cycle_id, %s, v.id, %s, {criteria_hash}, %s
+    FROM {view_table} v JOIN {state_table} s ON s.id = v.state_id
+    WHERE {where}
+    ON CONFLICT ({view_id_col}) DO UPDATE SET
+        cycle_id = EXCLUDED.cycle_id,
+        columns_hash = EXCLUDED.columns_hash,
+        criteria_hash = EXCLUDED.criteria_hash,
+        touched = EXCLUDED.touched
+    WHERE {key_table}.columns_hash <> EXCLUDED.columns_hash
+        OR {key_table}.criteria_hash IS DISTINCT FROM EXCLUDED.criteria_hash
+"""
+
+# The MatchingKey table as a temporary table, which shadows the table of the model until the end of
+# the transaction. The unique view ids are needed by the ON CONFLICT of MATCHING_KEY_UPSERT_SQL.
+TEMPORARY_MATCHING_KEY_TABLE_SQL = """
+    CREATE TEMPORARY TABLE IF NOT EXISTS {key_table} (
+        id serial PRIMARY KEY,
+        organization_id integer NOT NULL,
+        cycle_id integer NOT NULL,
+        state_class varchar(16) NOT NULL,
+        property_view_id integer UNIQUE,
+        taxlot_view_id integer UNIQUE,
+        columns_hash varchar(32) NOT NULL,
+        criteria_hash varchar(32),
+        touched boolean NOT NULL DEFAULT true
+    ) ON COMMIT DROP
+"""
+
+
+def matching_columns_hash(column_names):
+    """
+    Return the md5 of the given matching criteria column names, which
+    identifies the criteria that MatchingKeys were built for.
+    """
+    return hashlib.md5(','.join(sorted(column_names)).encode('utf-8')).hexdigest()
+
+
+def _matching_criteria_hash_sql(StateClass, column_names):
+    """
+    Return the SQL expression of the md5 of the matching criteria values of
+    the -State aliased as s, or NULL if all of them are empty. The values
+    are hashed in the database so that equal values always give equal hashes.
+    """
+    columns = [
+        's.' + connection.ops.quote_name(StateClass._meta.get_field(column_name).column)
+        for column_name
+        in sorted(column_names)
+    ]
+    if not columns:
+        return 'NULL'
+
+    return 'CASE WHEN {} THEN NULL ELSE md5(json_build_array({})::text) END'.format(
+        ' AND '.join(column + ' IS NULL' for column in columns),
+        ', '.join(columns)
+    )
+
+
+def _upsert_matching_keys(org_id, state_class_name, column_names, where, params, touched=True):
+    """
+    Insert or update the MatchingKeys of the -Views (aliased as v, with their
+    -States aliased as s) selected by the where clause. Keys that are new or
+    changed are flagged as touched, unless touched is False.
+    """
+    if state_class_name == 'PropertyState':
+        StateClass = PropertyState
+        ViewClass = PropertyView
+        view_id_col = 'property_view_id'
+    elif state_class_name == 'TaxLotState':
+        StateClass = TaxLotState
+        ViewClass = TaxLotView
+        view_id_col = 'taxlot_view_id'
+
+    sql = MATCHING_KEY_UPSERT_SQL.format(
+        key_table=MatchingKey._meta.db_table,
+        view_table=ViewClass._meta.db_table,
+        state_table=StateClass._meta.db_table,
+        view_id_col=view_id_col,
+        criteria_hash=_matching_criteria_hash_sql(StateClass, column_names),
+        where=where,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [org_id, state_class_name, matching_columns_hash(column_names), touched] + params)
+
+
+def build_matching_keys(org_id, state_class_name, column_names, touched=True):
+    """
+    Build the MatchingKeys of all the -Views of the organization for the
+    given matching criteria columns, with a single INSERT ... SELECT.
+    """
+    _upsert_matching_keys(
+        org_id, state_class_name, column_names,
+        'v.cycle_id IN (SELECT id FROM {} WHERE organization_id = %s)'.format(Cycle._meta.db_table),
+        [org_id],
+        touched=touched
+    )
+
+
+def update_matching_keys(org_id, state_class_name, column_names):
+    """
+    Return a QS of the MatchingKeys of the organization for the given
+    matching criteria columns. If the organization has no keys yet, or they
+    were built for other columns, they are (re)built for all of its -Views.
+    """
+    keys = MatchingKey.objects.filter(organization_id=org_id, state_class=state_class_name)
+
+    if keys.values_list('columns_hash', flat=True).first() != matching_columns_hash(column_names):
+        keys.delete()
+        build_matching_keys(org_id, state_class_name, column_names)
+        clear_matching_key_settings()
+
+    return keys
+
+
+def use_temporary_matching_keys():
+    """
+    Replace the MatchingKeys with an empty temporary table until the end of
+    the current transaction. PostgreSQL looks up temporary tables first, so
+    the MatchingKey queries and the key upserts of the -Views saved meanwhile
+    use the temporary keys, and the persisted keys are left untouched. This
+    also works before the MatchingKey table was created by its migration.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(TEMPORARY_MATCHING_KEY_TABLE_SQL.format(key_table=MatchingKey._meta.db_table))
+    clear_matching_key_settings()
+
+
+def matching_keys_table_exists():
+    """
+    Return whether the MatchingKey table exists, which it does not during the
+    migrations before 0119_matchingkey, such as 0118_match_merge_link_all_orgs.
+    """
+    return MatchingKey._meta.db_table in connection.introspection.table_names()
+
+
+# {(org_id, state_class_name): (columns_hash, column_names)}, see matching_key_settings
+_matching_key_settings = {}
+
+
+def matching_key_settings(org_id, state_class_name):
+    """
+    Return the columns hash of the MatchingKeys of the organization (None if
+    it has no keys) and its matching criteria column names. Both are read
+    once per request or task, since they are needed for every -State and
+    -View that is saved.
+    """
+    settings_key = (org_id, state_class_name)
+    if settings_key not in _matching_key_settings:
+        columns_hash = MatchingKey.objects.\
+            filter(organization_id=org_id, state_class=state_class_name).\
+            values_list('columns_hash', flat=True).\
+            first()
+        _matching_key_settings[settings_key] = (
+            columns_hash, matching_criteria_column_names(org_id, state_class_name)
+        )
+    return _matching_key_settings[settings_key]
+
+
+@receiver(request_started)
+@receiver([post_save, post_delete], sender=Column)
+def clear_matching_key_settings(**kwargs):
+    """
+    Forget the matching key settings at the start of every request and task,
+    and when the matching criteria or the keys change.
+    """
+    _matching_key_settings.clear()
+
+
+task_prerun.connect(clear_matching_key_settings)
+
+
+def refresh_matching_keys(org_id, state_class_name, view_ids=None, state_ids=None):
+    """
+    Recompute the MatchingKeys of the given -Views, or of the -Views of the
+    given -States, after -States were saved, merged or promoted.
+
+    Nothing is done for an organization without keys. Those are built by its
+    first whole organization match merge link, as are keys that were built for
+    other matching criteria.
+    """
+    if not (view_ids or state_ids):
+        return
+
+    columns_hash, column_names = matching_key_settings(org_id, state_class_name)
+    if columns_hash is None or matching_columns_hash(column_names) != columns_hash:
+        return
+
+    if view_ids:
+        _upsert_matching_keys(org_id, state_class_name, column_names, 'v.id = ANY(%s)', [list(view_ids)])
+    if state_ids:
+        _upsert_matching_keys(org_id, state_class_name, column_names, 'v.state_id = ANY(%s)', [list(state_ids)])
+
+
+def refresh_state_matching_keys(state, state_class_name, update_fields=None):
+    """
+    Refresh the MatchingKeys of the -Views of a saved -State, unless none of
+    its matching criteria values were saved (update_fields) or changed since
+    they were loaded from the database (see the from_db of the -States).
+    """
+    columns_hash, column_names = matching_key_settings(state.organization_id, state_class_name)
+    if columns_hash is None or matching_columns_hash(column_names) != columns_hash:
+        return
+
+    if update_fields is not None and not set(update_fields) & set(column_names):
+        return
+
+    loaded_values = getattr(state, '_loaded_values', None)
+    values = {column_name: getattr(state, column_name, None) for column_name in column_names}
+    if loaded_values is not None and all(
+        column_name in loaded_values and loaded_values[column_name] == value
+        for column_name, value in values.items()
+    ):
+        return
+
+    _upsert_matching_keys(
+        state.organization_id, state_class_name, column_names, 'v.state_id = ANY(%s)', [[state.id]]
+    )
+    state._loaded_values = values
+
+
+def refresh_view_matching_key(view, state_class_name, created=False):
+    """
+    Refresh the MatchingKey of a saved -View, unless it still has the -State
+    and the Cycle it was loaded from the database with (see the from_db of the
+    -Views).
+    """
+    loaded_values = getattr(view, '_loaded_values', None)
+    values = {'state_id': view.state_id, 'cycle_id': view.cycle_id}
+    if not created and loaded_values is not None and all(
+        column_name in loaded_values and loaded_values[column_name] == value
+        for column_name, value in values.items()
+    ):
+        return
+
+    refresh_matching_keys(view.state.organization_id, state_class_name, view_ids=[view.id])
+    view._loaded_values = values
+
+
 def _merge_matches_across_cycles(matching_views, org_id, given_state_id, StateClass):
     """
     This is a helper method for match_merge_link().
@@ -243,6 +518,188 @@ def match_merge_link(view_id, StateClassName):
         return 0, link_count, None
 
 
+def match_merge_link_views(view_ids, StateClassName):
+    """
+    This is the batched version of match_merge_link() for the -Views of an
+    import. The matching criteria values of all of the given -Views and of the
+    -Views matching them across Cycles are loaded with one query, the links are
+    worked out in memory, and the new canonical records and the -View updates
+    are written with bulk queries.
+
+    -Views whose matches need merges first (more than one matching -View in a
+    Cycle, or another given -View with the same criteria) are passed through
+    match_merge_link() one at a time.
+
+    Returns a dict of the given -View IDs and, if merges did occur, the ID of
+    the target -View or otherwise None.
+    """
+    if StateClassName == 'PropertyState':
+        ViewClass = PropertyView
+        CanonicalClass = Property
+        canonical_id_col = 'property_id'
+    elif StateClassName == 'TaxLotState':
+        ViewClass = TaxLotView
+        CanonicalClass = TaxLot
+        canonical_id_col = 'taxlot_id'
+
+    target_view_ids = {view_id: None for view_id in view_ids}
+
+    org_ids = ViewClass.objects.\
+        filter(pk__in=view_ids).\
+        values_list('state__organization_id', flat=True).\
+        distinct()
+
+    for org_id in list(org_ids):
+        column_names = sorted(matching_criteria_column_names(org_id, StateClassName))
+        if not column_names:
+            continue
+
+        state_appended_col_names = ['state__' + col_name for col_name in column_names]
+
+        # -Views with empty matching criteria are left as they are
+        given_views = [
+            (values[0], values[1], tuple(values[2:]))
+            for values
+            in ViewClass.objects.
+            filter(pk__in=view_ids, state__organization_id=org_id).
+            values_list('id', canonical_id_col, *state_appended_col_names)
+            if any(value is not None for value in values[2:])
+        ]
+        if not given_views:
+            continue
+
+        # Get all matching views (across Cycles in this Organization) with one query. Each column
+        # is filtered by all of the given values so the rows are grouped by their full key after.
+        given_keys = collections.Counter(key for _view_id, _canonical_id, key in given_views)
+        matching_criteria = Q(state__organization_id=org_id)
+        for i, col_name in enumerate(state_appended_col_names):
+            values = {key[i] for key in given_keys}
+            col_criteria = Q(**{col_name + '__in': [value for value in values if value is not None]})
+            if None in values:
+                col_criteria |= Q(**{col_name + '__isnull': True})
+            matching_criteria &= col_criteria
+
+        matching_views = collections.defaultdict(list)
+        for values in ViewClass.objects.\
+                filter(matching_criteria).\
+                values_list('id', 'cycle_id', canonical_id_col, *state_appended_col_names).\
+                iterator():
+            key = tuple(values[3:])
+            if key in given_keys:
+                matching_views[key].append(values[:3])
+
+        views_to_link = []
+        for view_id, canonical_id, key in given_views:
+            cycle_counts = collections.Counter(cycle_id for _id, cycle_id, _canonical_id in matching_views[key])
+            if given_keys[key] > 1 or any(count > 1 for count in cycle_counts.values()):
+                _merge_count, _link_count, target_view_ids[view_id] = match_merge_link(view_id, StateClassName)
+            else:
+                views_to_link.append((view_id, canonical_id, key))
+
+        if views_to_link:
+            _link_matches_in_bulk(views_to_link, matching_views, org_id, ViewClass, CanonicalClass, canonical_id_col)
+
+    return target_view_ids
+
+
+def _link_matches_in_bulk(link_views, matching_views, org_id, ViewClass, CanonicalClass, canonical_id_col):
+    """
+    This is a helper method for match_merge_link_views() and applies the same
+    three cases as _link_matches() to each of the given -Views, which have at
+    most one match in any Cycle.
+
+    The cases are worked out in order with the number of -Views using each
+    canonical record kept up to date in memory, so that the check for previous
+    links sees the links made for earlier -Views. Then the new canonical records
+    are created in bulk, meters are copied, and the -Views are updated with one
+    query per chunk.
+    """
+    canonical_use_counts = collections.Counter(dict(
+        ViewClass.objects.
+        filter(**{canonical_id_col + '__in': [canonical_id for _id, canonical_id, _key in link_views]}).
+        values(canonical_id_col).
+        annotate(use_count=Count('id')).
+        values_list(canonical_id_col, 'use_count')
+    ))
+
+    new_records = []
+    new_canonical_ids = {}
+    meter_copies = []
+    linking_ids = set()
+
+    def relink(view_id, old_canonical_id, new_canonical_id):
+        new_canonical_ids[view_id] = new_canonical_id
+        canonical_use_counts[old_canonical_id] -= 1
+        if not isinstance(new_canonical_id, CanonicalClass):
+            canonical_use_counts[new_canonical_id] += 1
+
+    for view_id, canonical_id, key in link_views:
+        unique_canonical_ids = sorted({
+            matching_canonical_id
+            for matching_view_id, _cycle_id, matching_canonical_id
+            in matching_views[key]
+            if matching_view_id != view_id
+        })
+
+        if not unique_canonical_ids:
+            # If no matches found - check for past links and diassociate if necessary
+            if canonical_use_counts[canonical_id] > 1:
+                new_record = CanonicalClass(organization_id=org_id)
+                new_records.append(new_record)
+                meter_copies.append((new_record, canonical_id))
+                relink(view_id, canonical_id, new_record)
+        elif len(unique_canonical_ids) == 1:
+            # If all matches are linked already - use the linking ID. Copying the meters of a record
+            # onto itself changes nothing, so that is skipped.
+            linking_id = unique_canonical_ids[0]
+            if linking_id != canonical_id:
+                meter_copies.append((linking_id, canonical_id))
+                relink(view_id, canonical_id, linking_id)
+            linking_ids.add(linking_id)
+        else:
+            # In this case, all matches are NOT linked already - use new canonical record to link
+            new_record = CanonicalClass(organization_id=org_id)
+            new_records.append(new_record)
+            # Copy meters by highest ID order and lastly for the given -View's record
+            for source_id in unique_canonical_ids + [canonical_id]:
+                meter_copies.append((new_record, source_id))
+            for matching_view_id, _cycle_id, matching_canonical_id in matching_views[key]:
+                relink(matching_view_id, matching_canonical_id, new_record)
+
+    with transaction.atomic():
+        CanonicalClass.objects.bulk_create(new_records)
+
+        if CanonicalClass == Property:
+            # copy_meters() does nothing for a source without meters, so only those with meters are copied
+            with_meters = set(
+                Meter.objects.
+                filter(property_id__in={source_id for _target, source_id in meter_copies}).
+                values_list('property_id', flat=True)
+            )
+            for target, source_id in meter_copies:
+                if source_id in with_meters:
+                    target = target if isinstance(target, Property) else Property.objects.get(pk=target)
+                    target.copy_meters(source_id)
+                    with_meters.add(target.id)
+
+        new_canonical_ids = [
+            (view_id, getattr(target, 'id', target))
+            for view_id, target
+            in new_canonical_ids.items()
+        ]
+        for i in range(0, len(new_canonical_ids), 1000):
+            chunk = new_canonical_ids[i:i + 1000]
+            ViewClass.objects.filter(pk__in=[view_id for view_id, _target_id in chunk]).update(**{
+                canonical_id_col: Case(
+                    *[When(pk=view_id, then=target_id) for view_id, target_id in chunk],
+                    output_field=IntegerField()
+                )
+            })
+
+        # The -Views were saved one by one before, which touched their linked canonical records
+        CanonicalClass.objects.filter(pk__in=linking_ids).update(updated=timezone.now())
+
+
 @shared_task(serializer='pickle', ignore_result=True)
 def whole_org_match_merge_link(org_id, state_class_name, proposed_columns=[]):
     """
@@ -253,6 +710,14 @@ def whole_org_match_merge_link(org_id, state_class_name, proposed_columns=[]):
     record, and -View records associated by the -View.
 
     Algorithm - Run for either Property Sets or for TaxLot Sets:
+        Read the groups of matching -Views from the organization's
+        MatchingKeys, building them first if needed. Only the groups with keys
+        touched since the last run are considered in the steps below.
+
+        A preview with proposed columns, or a run before the MatchingKey table
+        exists, builds all the keys in a temporary table instead, so the
+        persisted keys are neither rebuilt nor locked.
+
         For each Cycle, run match and merges.
             - Focus on -States associated with -Views in this Cycle.
             - Ignore -States where all matching criteria is None.
@@ -316,48 +781,51 @@ def whole_org_match_merge_link(org_id, state_class_name, proposed_columns=[]):
         column_names = matching_criteria_column_names(org_id, state_class_name)
         preview_run = False
 
-    empty_matching_criteria = empty_criteria_filter(StateClass, column_names)
+    view_col = 'property_view' if StateClass == PropertyState else 'taxlot_view'
+    canonical_id_col = 'property_id' if StateClass == PropertyState else 'taxlot_id'
 
     with transaction.atomic():
+        if preview_run or not matching_keys_table_exists():
+            use_temporary_matching_keys()
+
+        # Read the groups of matching -Views from their MatchingKeys. Only the keys that were touched
+        # since the last run are examined, the others were merged and linked by that run already.
+        keys = update_matching_keys(org_id, state_class_name, column_names)
+        touched_hashes = keys.\
+            filter(touched=True, criteria_hash__isnull=False).\
+            values('criteria_hash')
+
         # Match merge within each Cycle
-        for cycle_id in cycle_ids:
-            view_in_cycle = ViewClass.objects.filter(cycle_id=cycle_id)
-
-            matched_id_groups = StateClass.objects.\
-                filter(id__in=Subquery(view_in_cycle.values('state_id'))).\
-                exclude(**empty_matching_criteria).\
-                values(*column_names).\
-                annotate(matched_ids=ArrayAgg('id'), matched_count=Count('id')).\
-                values_list('matched_ids', flat=True).\
-                filter(matched_count__gt=1)
-
-            for state_ids in matched_id_groups:
-                ordered_ids = list(
-                    StateClass.objects.
-                    filter(id__in=state_ids).
-                    order_by('updated').
-                    values_list('id', flat=True)
-                )
+        matched_id_groups = list(
+            keys.
+            filter(criteria_hash__in=Subquery(touched_hashes)).
+            values('cycle_id', 'criteria_hash').
+            annotate(matched_ids=ArrayAgg(view_col + '__state_id'), matched_count=Count('id')).
+            values_list('matched_ids', flat=True).
+            filter(matched_count__gt=1)
+        )
 
-                merge_states_with_views(ordered_ids, org_id, 'System Match', StateClass)
+        merged_state_ids = []
+        for state_ids in matched_id_groups:
+            ordered_ids = list(
+                StateClass.objects.
+                filter(id__in=state_ids).
+                order_by('updated').
+                values_list('id', flat=True)
+            )
 
-                summary[StateClass.__name__]['merged_count'] += len(state_ids)
+            merged_state = merge_states_with_views(ordered_ids, org_id, 'System Match', StateClass)
+            merged_state_ids.append(merged_state.id)
 
-        # Match link across the whole Organization
-        # Append 'state__' to dict keys used for filtering so that filtering can be done across associations
-        state_appended_col_names = {'state__' + col_name for col_name in column_names}
-        state_appended_empty_matching_criteria = {
-            'state__' + col_name: v
-            for col_name, v
-            in empty_matching_criteria.items()
-        }
+            summary[StateClass.__name__]['merged_count'] += len(state_ids)
 
-        canonical_id_col = 'property_id' if StateClass == PropertyState else 'taxlot_id'
+        # The keys of the merged -Views are added here as well, since the temporary keys of a
+        # preview with proposed columns aren't kept up to date when -Views are saved.
+        _upsert_matching_keys(org_id, state_class_name, column_names, 'v.state_id = ANY(%s)', [merged_state_ids])
 
+        # Match link across the whole Organization
         # Looking at all -Views in Org across Cycles
-        org_views = ViewClass.objects.\
-            filter(cycle_id__in=cycle_ids).\
-            select_related('state')
+        org_views = ViewClass.objects.filter(cycle_id__in=cycle_ids)
 
         # Identify all canonical_ids that are currently used once and are potentially reusable
         reusable_canonical_ids = org_views.\
@@ -366,13 +834,13 @@ def whole_org_match_merge_link(org_id, state_class_name, proposed_columns=[]):
             values_list(canonical_id_col, flat=True).\
             filter(use_count=1)
 
-        # Ignoring -Views associated to -States with empty matching critieria, group by columns
-        link_groups = org_views.\
-            exclude(**state_appended_empty_matching_criteria).\
-            values(*state_appended_col_names).\
+        # Ignoring -Views associated to -States with empty matching critieria, group by key
+        link_groups = keys.\
+            filter(criteria_hash__in=Subquery(touched_hashes)).\
+            values('criteria_hash').\
             annotate(
-                canonical_ids=ArrayAgg(canonical_id_col),
-                view_ids=ArrayAgg('id'),
+                canonical_ids=ArrayAgg(view_col + '__' + canonical_id_col),
+                view_ids=ArrayAgg(view_col + '_id'),
                 link_count=Count('id')
             ).\
             values_list('canonical_ids', 'view_ids', 'link_count')
@@ -397,10 +865,9 @@ def whole_org_match_merge_link(org_id, state_class_name, proposed_columns=[]):
 
             unused_canonical_ids += canonical_ids
 
-        # For records with empty criteria and without reusable canonical IDs, apply a new ID.
+        # For touched records with empty criteria and without reusable canonical IDs, apply a new ID.
         empty_criteria_views = ViewClass.objects.\
-            select_related('state').\
-            filter(cycle_id__in=cycle_ids, **state_appended_empty_matching_criteria).\
+            filter(id__in=Subquery(keys.filter(touched=True, criteria_hash__isnull=True).values(view_col + '_id'))).\
             exclude(**{canonical_id_col + "__in": reusable_canonical_ids})
 
         for view in empty_criteria_views:
@@ -416,6 +883,8 @@ def whole_org_match_merge_link(org_id, state_class_name, proposed_columns=[]):
         # Also delete these unusable canonical records
         unused_canonical_ids += empty_criteria_views.values_list(canonical_id_col, flat=True)
 
+        keys.filter(touched=True).update(touched=False)
+
         # Delete canonical records that are no longer used.
         CanonicalClass.objects.filter(id__in=unused_canonical_ids).delete()
 
@@ -428,4 +897,100 @@ def whole_org_match_merge_link(org_id, state_class_name, proposed_columns=[]):
 
             transaction.set_rollback(True)
 
+    # The settings may have been read from temporary or rolled back keys
+    clear_matching_key_settings()
+
+    return summary
+
+
+@shared_task(serializer='pickle', ignore_result=True)
+def whole_org_match_merge_link_counts(org_id, state_class_name, proposed_columns=[]):
+    """
+    Dry run of whole_org_match_merge_link() that only counts the -States that
+    would be merged and the sets that would be linked, and returns them in
+    the same summary format. Nothing is written.
+
+    The -Views of the organization are streamed with a server-side cursor
+    ordered by their matching criteria values, so each group of matching
+    -Views is counted as it is read. Only the canonical records used by more
+    than one -View are kept in memory, since any other canonical record of an
+    unmatched -View would be reused.
+    """
+    summary = {
+        'PropertyState': {
+            'merged_count': 0,
+            'linked_sets_count': 0,
+        },
+        'TaxLotState': {
+            'merged_count': 0,
+            'linked_sets_count': 0,
+        },
+    }
+
+    if state_class_name == 'PropertyState':
+        ViewClass = PropertyView
+        canonical_id_col = 'property_id'
+    elif state_class_name == 'TaxLotState':
+        ViewClass = TaxLotView
+        canonical_id_col = 'taxlot_id'
+
+    if proposed_columns:
+        # Use column names as given (replacing address_line_1 with normalized_address)
+        column_names = [
+            column_name if column_name != 'address_line_1' else 'normalized_address'
+            for column_name
+            in proposed_columns
+        ]
+    else:
+        column_names = matching_criteria_column_names(org_id, state_class_name)
+    state_appended_col_names = ['state__' + col_name for col_name in sorted(column_names)]
+
+    cycle_ids = Cycle.objects.filter(organization_id=org_id).values_list('id', flat=True)
+    org_views = ViewClass.objects.filter(cycle_id__in=cycle_ids)
+
+    shared_canonical_use_counts = dict(
+        org_views.
+        order_by().
+        values(canonical_id_col).
+        annotate(use_count=Count('id')).
+        filter(use_count__gt=1).
+        values_list(canonical_id_col, 'use_count')
+    )
+
+    merged_canonical_use_counts = collections.Counter()
+    unmatched_shared_canonical_ids = []
+    rows = org_views.\
+        order_by(*state_appended_col_names).\
+        values_list('cycle_id', canonical_id_col, *state_appended_col_names).\
+        iterator()
+    for key, group in itertools.groupby(rows, key=lambda values: values[2:]):
+        # -Views with empty matching criteria are neither merged nor linked
+        if all(value is None for value in key):
+            continue
+
+        group = [values[:2] for values in group]
+        cycle_counts = collections.Counter(cycle_id for cycle_id, _canonical_id in group)
+
+        # Matches within a Cycle are merged into a -View with a new canonical record
+        for cycle_id, canonical_id in group:
+            if cycle_counts[cycle_id] > 1:
+                merged_canonical_use_counts[canonical_id] += 1
+        summary[state_class_name]['merged_count'] += sum(
+            count for count in cycle_counts.values() if count > 1
+        )
+
+        if len(cycle_counts) > 1:
+            summary[state_class_name]['linked_sets_count'] += 1
+        elif len(group) == 1 and group[0][1] in shared_canonical_use_counts:
+            # Whether the canonical record is still shared after the merges is known at the end
+            unmatched_shared_canonical_ids.append(group[0][1])
+
+    # An unmatched -View gets a new canonical record if its current one is still used by another -View
+    summary[state_class_name]['linked_sets_count'] += sum(
+        1
+        for canonical_id
+        in unmatched_shared_canonical_ids
+        if shared_canonical_use_counts[canonical_id] - merged_canonical_use_counts[canonical_id] > 1
+    )
+
     return summary
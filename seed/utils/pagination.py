@@ -9,10 +9,22 @@ required approvals from the U.S. Department of Energy) and contributors.
 All rights reserved.  # NOQA
 :author
 """
+import hashlib
+import json
 from collections import OrderedDict
+
+from django.conf import settings
+from django.core import signing
+from django.db import connection
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 
+from seed.utils.cache import get_cache_raw, set_cache_raw
+
+INVENTORY_COUNT_CACHE_TIMEOUT = getattr(settings, 'SEED_INVENTORY_COUNT_CACHE_TIMEOUT', 60)
+
+CURSOR_SALT = 'seed.utils.pagination.cursor'
+
 
 class ResultsListPagination(PageNumberPagination):
     page_size_query_param = 'per_page'
@@ -30,3 +42,104 @@ class ResultsListPagination(PageNumberPagination):
             ('total', self.page.paginator.count),
             ('results', data)
         ]))
+
+
+def encode_cursor(last_id):
+    """
+    Return the opaque cursor of the page that follows the record with the given id
+
+    :param last_id: int, id of the last record of a page
+    :return: str
+    """
+    return signing.dumps({'id': last_id}, salt=CURSOR_SALT)
+
+
+def decode_cursor(cursor):
+    """
+    Return the id of the last record before the page of a cursor
+
+    :param cursor: str, cursor returned by encode_cursor, or empty for the first page
+    :return: int or None for the first page
+    :raises ValueError: if the cursor was not returned by encode_cursor
+    """
+    if not cursor:
+        return None
+
+    try:
+        return int(signing.loads(cursor, salt=CURSOR_SALT)['id'])
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        raise ValueError('Invalid cursor')
+
+
+def exact_count(queryset):
+    """
+    Return the number of records of a queryset. The count is cached for
+    INVENTORY_COUNT_CACHE_TIMEOUT seconds so that paging through a list only counts it once.
+    """
+    sql, params = queryset.query.sql_with_params()
+    key = 'inventory_count__%s' % hashlib.md5((sql + repr(params)).encode('utf-8')).hexdigest()
+
+    count = get_cache_raw(key)
+    if count is None:
+        count = queryset.count()
+        set_cache_raw(key, count, INVENTORY_COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def estimated_count(queryset):
+    """
+    Return the number of records of a queryset as estimated by the query planner of PostgreSQL,
+    which does not read the records.
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def paginate_by_cursor(queryset, cursor, per_page, count=None):
+    """
+    Return the page of a queryset that follows a cursor, using the id of the last record of the
+    previous page instead of an offset so that the cost of a page does not grow with its depth.
+
+    :param queryset: QuerySet
+    :param cursor: str, next_cursor of the previous page, or empty for the first page
+    :param per_page: int, number of records per page
+    :param count: str, 'exact' or 'estimate' to add the total number of records, otherwise the
+        records are not counted
+    :return: list, records of the page, and dict, pagination of the page
+    :raises ValueError: if the cursor, per_page or count is invalid
+    """
+    try:
+        per_page = int(per_page)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid per_page')
+    if per_page < 1:
+        raise ValueError('Invalid per_page')
+
+    last_id = decode_cursor(cursor)
+    page_queryset = queryset if last_id is None else queryset.filter(id__gt=last_id)
+
+    # read one more record to know if there is a next page
+    records = list(page_queryset.order_by('id')[:per_page + 1])
+    has_next = len(records) > per_page
+    records = records[:per_page]
+
+    pagination = {
+        'per_page': per_page,
+        'has_next': has_next,
+        'next_cursor': encode_cursor(records[-1].id) if has_next else None,
+    }
+
+    if count == 'exact':
+        pagination['total'] = exact_count(queryset)
+    elif count == 'estimate':
+        pagination['total'] = estimated_count(queryset)
+    elif count:
+        raise ValueError('Invalid count, use exact or estimate')
+
+    return records, pagination
@@ -8,12 +8,18 @@ import operator
 import re
 from functools import reduce
 
-from django.db.models import Q
+from django.db.models import F, FloatField, Func, Q, TextField, Value
 from past.builtins import basestring
 
 SUFFIXES = ['__lt', '__gt', '__lte', '__gte', '__isnull']
 DATE_FIELDS = ['year_ending']
 
+# text of a jsonb value cast to a number when it looks like one, otherwise NULL
+JSONB_NUMBER_SQL = (
+    "(CASE WHEN {sql} ~ '^\\s*-?[0-9]+(\\.[0-9]+)?([eE][-+]?[0-9]+)?\\s*$' "
+    "THEN ({sql})::double precision END)"
+)
+
 
 def strip_suffix(k, suffix):
     match = k.find(suffix)
@@ -91,7 +97,7 @@ NUMERIC_EXPRESSION_REGEX = re.compile((
     r'('  # open expression grp
     r'(?P<operator>==|=|>|>=|<|<=|<>|!|!=)'  # operator
     r'\s*'  # whitespace
-    r'(?P<value>(?:-?[0-9]+)|(?:null))\s*(?:,|$)'  # numeric value or the string null
+    r'(?P<value>(?:-?(?:[0-9]+(?:\.[0-9]*)?|\.[0-9]+)(?:[eE][-+]?[0-9]+)?)|(?:null))\s*(?:,|$)'  # numeric value or the string null
     r')'  # close expression grp
 ))
 
@@ -184,3 +190,118 @@ def parse_expression(k, parts):
         else:
             query_filters.append(q_object)
     return reduce(operator.and_, query_filters, Q())
+
+
+def _normalize_string_expression_parts(parts):
+    # the empty string is written as matching quotes in the expressions
+    return [
+        (src, op, '' if val.strip() in ("''", '""') else val.strip())
+        for src, op, val in parts
+    ]
+
+
+def is_positive_filter(q):
+    """
+    Checks whether a filter can only match records that have a value, meaning that it is neither
+    negated nor a test for null or empty values.
+    """
+    if not is_string_query(q):
+        return False
+
+    parts = is_numeric_expression(q) or is_string_expression(q)
+    if parts:
+        return all(op in OPERATOR_MAP and not OPERATOR_MAP[op][1] and val.strip() not in ('null', "''", '""')
+                   for src, op, val in parts)
+    return not (is_empty_match(q) or is_not_empty_match(q) or is_exact_exclude_filter(q) or
+                is_exclude_filter(q))
+
+
+def build_filter(k, q, numeric=False, to_value=None):
+    """
+    Compile the filter of a column of the inventory list into a Q object.
+
+    Numeric columns accept numeric expressions (``>10, <=20``, ``!=null``), numbers, and the
+    empty (``""``) and not empty (``!""``) matches. Other columns accept string expressions
+    (``=abc``, ``!abc, !null``), the quoted exact (``"abc"``, ``!"abc"``) and case insensitive
+    (``^"abc"``) matches, the exclude filter (``!abc``), and otherwise match the values that
+    contain the filter.
+
+    :param k: str, field or annotation to filter
+    :param q: str, filter as typed in the inventory list
+    :param numeric: bool, whether the values of the column are numbers
+    :param to_value: function, converts the numbers of a numeric filter to values of the field
+    :return: Q
+    :raises ValueError: if the filter of a numeric column is not numeric, or has a part that is
+                        not a numeric expression
+    """
+    q = q.strip()
+
+    if numeric:
+        if is_empty_match(q):
+            return Q(**{k + '__isnull': True})
+        if is_not_empty_match(q):
+            return Q(**{k + '__isnull': False})
+
+        parts = is_numeric_expression(q)
+        if parts:
+            # the expressions that are not understood would otherwise be dropped from the filter
+            if re.sub(r'[\s,]', '', ''.join(src for src, op, val in parts)) != re.sub(r'[\s,]', '', q):
+                raise ValueError('Invalid numeric filter {}'.format(q))
+        else:
+            try:
+                float(q)
+            except ValueError:
+                raise ValueError('Invalid numeric filter {}'.format(q))
+            parts = [(q, '=', q)]
+        if to_value is not None:
+            parts = [(src, op, val if val == 'null' else to_value(val)) for src, op, val in parts]
+        return parse_expression(k, parts)
+
+    parts = is_string_expression(q)
+    if parts:
+        return parse_expression(k, _normalize_string_expression_parts(parts))
+
+    empty = Q(**{k + '__isnull': True}) | Q(**{k: ''})
+    if is_empty_match(q):
+        return empty
+    if is_not_empty_match(q):
+        return ~empty
+
+    match = is_case_insensitive_match(q)
+    if match:
+        return Q(**{k + '__iexact': match.group(2)})
+    match = is_exact_exclude_filter(q)
+    if match:
+        return ~Q(**{k: match.group(2)})
+    match = is_exact_match(q)
+    if match:
+        return Q(**{k: match.group(2)})
+    match = is_exclude_filter(q)
+    if match:
+        return ~Q(**{k + '__icontains': match.group(1)})
+    return Q(**{k + '__icontains': q})
+
+
+class JSONBKeyText(Func):
+    """
+    The text of the value of a key of a jsonb field, ``field ->> key``. The key is passed as a
+    parameter so that the keys named by the users are not written into the SQL, and so that the
+    keys that look like numbers are not read as array indexes.
+    """
+    template = '(%(expressions)s)'
+    arg_joiner = ' ->> '
+    output_field = TextField()
+
+    def __init__(self, field, key, **extra):
+        super().__init__(F(field), Value(key), **extra)
+
+
+class JSONBKeyNumber(JSONBKeyText):
+    """
+    The value of a key of a jsonb field as a number, NULL when the value is not a number
+    """
+    output_field = FloatField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sql, params = super().as_sql(compiler, connection, **extra_context)
+        return JSONB_NUMBER_SQL.format(sql=sql), params + params
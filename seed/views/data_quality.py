@@ -8,6 +8,7 @@
 import csv
 
 from celery.utils.log import get_task_logger
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
 from django.http import JsonResponse, HttpResponse
 from rest_framework import viewsets, serializers, status
 from rest_framework.decorators import list_route, detail_route
@@ -24,7 +25,6 @@ from seed.models.data_quality import (
     DataQualityCheck,
 )
 from seed.utils.api import api_endpoint_class
-from seed.utils.cache import get_cache_raw
 
 logger = get_task_logger(__name__)
 
@@ -157,7 +157,7 @@ class DataQualityViews(viewsets.ViewSet):
               required: true
               paramType: path
         """
-        data_quality_results = get_cache_raw(DataQualityCheck.cache_key(pk))
+        data_quality_results = DataQualityCheck.retrieve_results(pk)
         response = HttpResponse(content_type='text/csv')
         response['Content-Disposition'] = 'attachment; filename="Data Quality Check Results.csv"'
 
@@ -427,11 +427,64 @@ class DataQualityViews(viewsets.ViewSet):
         Return the result of the data quality based on the ID that was given during the
         creation of the data quality task. Note that it is not related to the object in the
         database, since the results are stored in redis!
+
+        The results are sorted by the ID of the record. If page is passed, then only that page
+        of results is returned along with the pagination details.
+        ---
+        parameters:
+            - name: organization_id
+              description: Organization ID
+              type: integer
+              required: true
+              paramType: query
+            - name: data_quality_id
+              description: ID of the data quality task
+              type: integer
+              required: true
+              paramType: query
+            - name: page
+              description: Page of results to return
+              type: integer
+              required: false
+              paramType: query
+            - name: per_page
+              description: Number of results per page, default is 100
+              type: integer
+              required: false
+              paramType: query
         """
         Organization.objects.get(pk=request.query_params['organization_id'])
 
         data_quality_id = request.query_params['data_quality_id']
-        data_quality_results = get_cache_raw(DataQualityCheck.cache_key(data_quality_id))
+        data_quality_results = DataQualityCheck.retrieve_results(data_quality_id)
+
+        page = request.query_params.get('page', None)
+        if page is None or data_quality_results is None:
+            return JsonResponse({
+                'data': data_quality_results
+            })
+
+        per_page = request.query_params.get('per_page', 100)
+        paginator = Paginator(data_quality_results, per_page)
+        try:
+            results = paginator.page(page)
+            page = int(page)
+        except PageNotAnInteger:
+            results = paginator.page(1)
+            page = 1
+        except EmptyPage:
+            results = paginator.page(paginator.num_pages)
+            page = paginator.num_pages
+
         return JsonResponse({
-            'data': data_quality_results
+            'data': results.object_list,
+            'pagination': {
+                'page': page,
+                'start': results.start_index(),
+                'end': results.end_index(),
+                'num_pages': paginator.num_pages,
+                'has_next': results.has_next(),
+                'has_previous': results.has_previous(),
+                'total': paginator.count
+            }
         })
@@ -37,6 +37,7 @@ from seed.tasks import invite_to_organization
 from seed.utils.api import api_endpoint_class
 from seed.utils.match import (
     whole_org_match_merge_link,
+    whole_org_match_merge_link_counts,
     matching_criteria_column_names,
 )
 from seed.utils.organizations import create_organization, create_suborganization
@@ -232,7 +233,8 @@ class OrganizationUsersSerializer(serializers.Serializer):
 class OrganizationViewSet(viewsets.ViewSet):
     raise_exception = True
 
-    def _start_whole_org_match_merge_link(self, org_id, state_class_name, proposed_columns=[]):
+    def _start_whole_org_match_merge_link(self, org_id, state_class_name, proposed_columns=[],
+                                          task=whole_org_match_merge_link):
         identifier = randint(100, 100000)
         result_key = _get_match_merge_link_key(identifier)
         set_cache_raw(result_key, {})
@@ -240,7 +242,7 @@ class OrganizationViewSet(viewsets.ViewSet):
         progress_data = ProgressData(func_name='org_match_merge_link', unique_id=identifier)
         progress_data.delete()
 
-        whole_org_match_merge_link.apply_async(
+        task.apply_async(
             args=(org_id, state_class_name, proposed_columns),
             link=cache_match_merge_link_result.s(identifier, progress_data.key)
         )
@@ -934,6 +936,11 @@ class OrganizationViewSet(viewsets.ViewSet):
               description: Organization ID (primary key)
               required: true
               paramType: path
+            - name: counts_only
+              type: boolean
+              description: Only count the merges and links that would be made, without running them
+              required: false
+              paramType: body
         """
         inventory_type = request.data.get('inventory_type', None)
         if inventory_type not in ['properties', 'taxlots']:
@@ -967,7 +974,11 @@ class OrganizationViewSet(viewsets.ViewSet):
 
         proposed_columns = current_columns.union(add).difference(remove)
 
-        progress_key = self._start_whole_org_match_merge_link(org.id, state_class_name, list(proposed_columns))
+        if request.data.get('counts_only', False):
+            task = whole_org_match_merge_link_counts
+        else:
+            task = whole_org_match_merge_link
+        progress_key = self._start_whole_org_match_merge_link(org.id, state_class_name, list(proposed_columns), task)
 
         return JsonResponse({'progress_key': progress_key})
 
@@ -49,9 +49,10 @@ from seed.models import (
     VIEW_LIST_PROPERTY
 )
 from seed.models import Property as PropertyModel
+from seed.search import filter_sort_inventory_views
+from seed.serializers.inventory import InventoryRowSerializer
 from seed.serializers.pint import PintJSONEncoder
 from seed.serializers.pint import (
-    apply_display_unit_preferences,
     add_pint_unit_suffix
 )
 from seed.serializers.properties import (
@@ -64,6 +65,7 @@ from seed.serializers.taxlots import (
     TaxLotViewSerializer,
 )
 from seed.utils.api import ProfileIdMixin, api_endpoint_class
+from seed.utils.pagination import paginate_by_cursor
 from seed.utils.properties import (
     get_changed_fields,
     pair_unpair_property_taxlot,
@@ -239,32 +241,75 @@ class PropertyViewSet(GenericViewSet, ProfileIdMixin):
 
         # Return property views limited to the 'inventory_ids' list.  Otherwise, if selected is empty, return all
         if 'inventory_ids' in request.data and request.data['inventory_ids']:
-            property_views_list = PropertyView.objects.select_related('property', 'state', 'cycle') \
+            property_views_list = PropertyView.objects \
                 .filter(property_id__in=request.data['inventory_ids'],
                         property__organization_id=org_id, cycle=cycle) \
-                .order_by('id')  # TODO: test adding .only(*fields['PropertyState'])
+                .order_by('id')
         else:
-            property_views_list = PropertyView.objects.select_related('property', 'state', 'cycle') \
+            property_views_list = PropertyView.objects \
                 .filter(property__organization_id=org_id, cycle=cycle) \
-                .order_by('id')  # TODO: test adding .only(*fields['PropertyState'])
+                .order_by('id')
 
-        paginator = Paginator(property_views_list, per_page)
-
-        try:
-            property_views = paginator.page(page)
-            page = int(page)
-        except PageNotAnInteger:
-            property_views = paginator.page(1)
-            page = 1
-        except EmptyPage:
-            property_views = paginator.page(paginator.num_pages)
-            page = paginator.num_pages
+        # only the ids of the page are needed, the rows are read by the InventoryRowSerializer
+        property_views_list = property_views_list.only('id')
 
         org = Organization.objects.get(pk=org_id)
 
         # Retrieve all the columns that are in the db for this organization
         columns_from_database = Column.retrieve_all(org_id, 'property', False)
 
+        # Filter and sort by the columns of the list in the database
+        filters = request.data.get('filters')
+        order_by = request.data.get('order_by')
+        if isinstance(order_by, str):
+            order_by = [order_by]
+        if filters or order_by:
+            if 'cursor' in request.query_params and order_by:
+                return JsonResponse({'status': 'error', 'message': 'Cannot use a cursor with order_by'},
+                                    status=status.HTTP_400_BAD_REQUEST)
+            try:
+                property_views_list = filter_sort_inventory_views(
+                    'property', property_views_list, columns_from_database, filters, order_by, org
+                )
+            except ValueError as e:
+                return JsonResponse({'status': 'error', 'message': str(e)},
+                                    status=status.HTTP_400_BAD_REQUEST)
+
+        if 'cursor' in request.query_params:
+            # Keyset pagination, the total is only counted if requested
+            try:
+                property_views, pagination = paginate_by_cursor(
+                    property_views_list,
+                    request.query_params['cursor'],
+                    per_page,
+                    count=request.query_params.get('count')
+                )
+            except ValueError as e:
+                return JsonResponse({'status': 'error', 'message': str(e)},
+                                    status=status.HTTP_400_BAD_REQUEST)
+        else:
+            paginator = Paginator(property_views_list, per_page)
+
+            try:
+                property_views = paginator.page(page)
+                page = int(page)
+            except PageNotAnInteger:
+                property_views = paginator.page(1)
+                page = 1
+            except EmptyPage:
+                property_views = paginator.page(paginator.num_pages)
+                page = paginator.num_pages
+
+            pagination = {
+                'page': page,
+                'start': property_views.start_index(),
+                'end': property_views.end_index(),
+                'num_pages': paginator.num_pages,
+                'has_next': property_views.has_next(),
+                'has_previous': property_views.has_previous(),
+                'total': paginator.count
+            }
+
         # This uses an old method of returning the show_columns. There is a new method that
         # is prefered in v2.1 API with the ProfileIdMixin.
         if profile_id is None:
@@ -287,23 +332,13 @@ class PropertyViewSet(GenericViewSet, ProfileIdMixin):
             except ColumnListSetting.DoesNotExist:
                 show_columns = None
 
-        related_results = TaxLotProperty.get_related(property_views, show_columns,
-                                                     columns_from_database)
-
-        # collapse units here so we're only doing the last page; we're already a
-        # realized list by now and not a lazy queryset
-        unit_collapsed_results = [apply_display_unit_preferences(org, x) for x in related_results]
+        # the units are collapsed by the serializer, only for the rows of the page
+        unit_collapsed_results = InventoryRowSerializer(
+            org, 'property', show_columns, columns_from_database
+        ).serialize([view.id for view in property_views])
 
         response = {
-            'pagination': {
-                'page': page,
-                'start': paginator.page(page).start_index(),
-                'end': paginator.page(page).end_index(),
-                'num_pages': paginator.num_pages,
-                'has_next': paginator.page(page).has_next(),
-                'has_previous': paginator.page(page).has_previous(),
-                'total': paginator.count
-            },
+            'pagination': pagination,
             'cycle_id': cycle.id,
             'results': unit_collapsed_results
         }
@@ -425,9 +460,26 @@ class PropertyViewSet(GenericViewSet, ProfileIdMixin):
               description: The number of items per page to return
               required: false
               paramType: query
+            - name: cursor
+              description: Use keyset pagination instead of pages. Empty for the first page, then the
+                           next_cursor of the previous page
+              required: false
+              paramType: query
+            - name: count
+              description: With cursor, exact or estimate to include the total number of records
+              required: false
+              paramType: query
             - name: profile_id
               description: Either an id of a list settings profile, or undefined
               paramType: body
+            - name: filters
+              description: Filters keyed by the names of the columns, e.g. {"site_eui_12": ">100"}
+              required: false
+              paramType: body
+            - name: order_by
+              description: Names of the columns to sort by, prefixed with - for the descending order
+              required: false
+              paramType: body
         """
         if 'profile_id' not in request.data:
             profile_id = None